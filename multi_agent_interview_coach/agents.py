@@ -2,9 +2,27 @@
 from __future__ import annotations 
 
 import os 
-from typing import List ,Dict ,Optional ,Any 
+from typing import List ,Dict ,Optional ,Any ,Tuple ,Iterator ,AsyncIterator ,Callable 
 import re 
 import importlib 
+import asyncio 
+import functools 
+import time 
+
+from .cache import ResponseCache ,get_response_cache 
+from .jsonstream import IncrementalJSONParser 
+from .rules import RuleEngine ,get_rule_engine 
+from .scoring import LexicalScorer ,get_lexical_scorer 
+from .routing import get_model_router 
+from .metrics import inc ,instrumentation_enabled ,instrumented ,record_usage ,span 
+from .resilience import LLMResponseError ,LLMUnavailableError ,get_call_executor ,get_resilience ,is_retryable 
+from .prefetch import QuestionPrefetcher ,result_or_none ,aresult_or_none 
+from .turn_store import ColumnView ,TurnStore 
+from .estimator import AbilityEstimator 
+from .dedup import QuestionIndex ,get_shared_question_index ,make_question_index 
+from .prompts import SYSTEM_PROMPTS ,count_prompt_tokens ,get_prompt_builder 
+from .ratelimit import current_priority ,estimate_tokens ,get_rate_limiter 
+from .singleflight import SingleFlight ,get_single_flight ,make_flight_key 
 
 
 
@@ -58,14 +76,28 @@ def _get_mistral_client ():
     )
 
 
-def call_llm (
+def _resolve_model (model :Optional [str ],kind :Optional [str ]=None )->str :
+    if model :
+        return model 
+    if kind :
+        return get_model_router ().model_for (kind )
+    return os .getenv ("MISTRAL_MODEL","mistral-medium-latest")
+
+
+def _extract_content (resp :Any )->Optional [str ]:
+    try :
+        return resp .choices [0 ].message .content .strip ()
+    except Exception :
+        return None 
+
+
+def _complete (
 system_prompt :str ,
 messages :List [Dict [str ,str ]],
-temperature :float =0.2 ,
-model :Optional [str ]=None ,
+temperature :float ,
+chosen_model :str ,
 )->str :
     client =_get_mistral_client ()
-    chosen_model =model or os .getenv ("MISTRAL_MODEL","mistral-medium-latest")
 
     chat_messages =[{"role":"system","content":system_prompt }]+messages 
 
@@ -78,11 +110,10 @@ model :Optional [str ]=None ,
             messages =chat_messages ,
             temperature =float (temperature ),
             )
-
-            try :
-                return resp .choices [0 ].message .content .strip ()
-            except Exception :
-                pass 
+            record_usage (chosen_model ,getattr (resp ,"usage",None ))
+            content =_extract_content (resp )
+            if content is not None :
+                return content 
 
         if callable (chat ):
             resp =chat (
@@ -90,14 +121,393 @@ model :Optional [str ]=None ,
             messages =chat_messages ,
             temperature =float (temperature ),
             )
-            try :
-                return resp .choices [0 ].message .content .strip ()
-            except Exception :
-                pass 
+            record_usage (chosen_model ,getattr (resp ,"usage",None ))
+            content =_extract_content (resp )
+            if content is not None :
+                return content 
 
     raise RuntimeError ("Mistral returned an empty/unsupported response format.")
 
 
+async def _acomplete (
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float ,
+chosen_model :str ,
+)->str :
+    client =_get_mistral_client ()
+
+    chat_messages =[{"role":"system","content":system_prompt }]+messages 
+
+    chat =getattr (client ,"chat",None )
+    if chat is not None and hasattr (chat ,"complete_async"):
+        resp =await chat .complete_async (
+        model =chosen_model ,
+        messages =chat_messages ,
+        temperature =float (temperature ),
+        )
+        record_usage (chosen_model ,getattr (resp ,"usage",None ))
+        content =_extract_content (resp )
+        if content is not None :
+            return content 
+        raise RuntimeError ("Mistral returned an empty/unsupported response format.")
+
+    loop =asyncio .get_running_loop ()
+    return await loop .run_in_executor (
+    None ,
+    functools .partial (_complete ,system_prompt ,messages ,temperature ,chosen_model ),
+    )
+
+
+def _record_prompt (
+kind :Optional [str ],
+chosen_model :str ,
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+)->None :
+    if instrumentation_enabled ():
+        inc ("llm_prompt_tokens_estimated_total",count_prompt_tokens (system_prompt ,messages ),kind =kind ,model =chosen_model )
+
+
+def _throttle (system_prompt :str ,messages :List [Dict [str ,str ]],priority :Optional [str ]=None )->None :
+    limiter =get_rate_limiter ()
+    if limiter .enabled :
+        limiter .acquire (estimate_tokens (count_prompt_tokens (system_prompt ,messages )),priority =priority )
+
+
+async def _athrottle (system_prompt :str ,messages :List [Dict [str ,str ]])->None :
+    limiter =get_rate_limiter ()
+    if limiter .enabled :
+        await limiter .aacquire (estimate_tokens (count_prompt_tokens (system_prompt ,messages )))
+
+
+def _throttled_complete (
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float ,
+chosen_model :str ,
+priority :Optional [str ]=None ,
+)->str :
+    _throttle (system_prompt ,messages ,priority )
+    return _complete (system_prompt ,messages ,temperature ,chosen_model )
+
+
+async def _athrottled_complete (
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float ,
+chosen_model :str ,
+)->str :
+    await _athrottle (system_prompt ,messages )
+    return await _acomplete (system_prompt ,messages ,temperature ,chosen_model )
+
+
+def _cache_key (
+use_cache :bool ,
+chosen_model :str ,
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float ,
+)->Tuple [Optional [ResponseCache ],Optional [str ]]:
+    if not use_cache or float (temperature )!=0 :
+        return None ,None 
+    cache =get_response_cache ()
+    if cache is None :
+        return None ,None 
+    return cache ,cache .make_key (chosen_model ,system_prompt ,messages ,temperature )
+
+
+def _flight_key (
+use_cache :bool ,
+chosen_model :str ,
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float ,
+)->Tuple [Optional [SingleFlight ],Optional [str ]]:
+    if not use_cache or float (temperature )!=0 :
+        return None ,None 
+    group =get_single_flight ()
+    if group is None :
+        return None ,None 
+    return group ,make_flight_key (chosen_model ,system_prompt ,messages ,temperature )
+
+
+def _fetch (
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float ,
+chosen_model :str ,
+kind :Optional [str ],
+cache :Optional [ResponseCache ],
+key :Optional [str ],
+)->str :
+    _record_prompt (kind ,chosen_model ,system_prompt ,messages )
+    started =time .perf_counter ()
+    with span ("llm.call",kind =kind ,model =chosen_model ):
+        content =get_resilience ().call (
+        functools .partial (_throttled_complete ,system_prompt ,messages ,temperature ,chosen_model ,priority =current_priority ()),
+        chosen_model ,
+        )
+    get_model_router ().record_call (kind ,chosen_model ,time .perf_counter ()-started )
+    if key is not None :
+        cache .put (key ,content )
+    return content 
+
+
+async def _afetch (
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float ,
+chosen_model :str ,
+kind :Optional [str ],
+cache :Optional [ResponseCache ],
+key :Optional [str ],
+)->str :
+    _record_prompt (kind ,chosen_model ,system_prompt ,messages )
+    started =time .perf_counter ()
+    with span ("llm.call",kind =kind ,model =chosen_model ):
+        content =await get_resilience ().acall (
+        functools .partial (_athrottled_complete ,system_prompt ,messages ,temperature ,chosen_model ),
+        chosen_model ,
+        )
+    get_model_router ().record_call (kind ,chosen_model ,time .perf_counter ()-started )
+    if key is not None :
+        cache .put (key ,content )
+    return content 
+
+
+def call_llm (
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float =0.2 ,
+model :Optional [str ]=None ,
+use_cache :bool =True ,
+kind :Optional [str ]=None ,
+)->str :
+    chosen_model =_resolve_model (model ,kind )
+    cache ,key =_cache_key (use_cache ,chosen_model ,system_prompt ,messages ,temperature )
+    if key is not None :
+        cached =cache .get (key )
+        inc ("llm_cache_lookups_total",kind =kind ,outcome ="hit"if cached is not None else "miss")
+        if cached is not None :
+            return cached 
+
+    fetch =functools .partial (_fetch ,system_prompt ,messages ,temperature ,chosen_model ,kind ,cache ,key )
+    group ,flight_key =_flight_key (use_cache ,chosen_model ,system_prompt ,messages ,temperature )
+    if flight_key is None :
+        return fetch ()
+    content ,shared =group .do (flight_key ,fetch )
+    if shared :
+        inc ("llm_coalesced_total",kind =kind )
+    return content 
+
+
+async def acall_llm (
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float =0.2 ,
+model :Optional [str ]=None ,
+use_cache :bool =True ,
+kind :Optional [str ]=None ,
+)->str :
+    chosen_model =_resolve_model (model ,kind )
+    cache ,key =_cache_key (use_cache ,chosen_model ,system_prompt ,messages ,temperature )
+    if key is not None :
+        cached =cache .get (key )
+        inc ("llm_cache_lookups_total",kind =kind ,outcome ="hit"if cached is not None else "miss")
+        if cached is not None :
+            return cached 
+
+    fetch =functools .partial (_afetch ,system_prompt ,messages ,temperature ,chosen_model ,kind ,cache ,key )
+    group ,flight_key =_flight_key (use_cache ,chosen_model ,system_prompt ,messages ,temperature )
+    if flight_key is None :
+        return await fetch ()
+    content ,shared =await group .ado (flight_key ,fetch )
+    if shared :
+        inc ("llm_coalesced_total",kind =kind )
+    return content 
+
+
+def _extract_delta (event :Any )->str :
+    data =getattr (event ,"data",event )
+    try :
+        return data .choices [0 ].delta .content or ""
+    except Exception :
+        return ""
+
+
+def stream_llm (
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float =0.2 ,
+model :Optional [str ]=None ,
+use_cache :bool =True ,
+kind :Optional [str ]=None ,
+)->Iterator [str ]:
+    chosen_model =_resolve_model (model ,kind )
+    cache ,key =_cache_key (use_cache ,chosen_model ,system_prompt ,messages ,temperature )
+    if key is not None :
+        cached =cache .get (key )
+        inc ("llm_cache_lookups_total",kind =kind ,outcome ="hit"if cached is not None else "miss")
+        if cached is not None :
+            yield cached 
+            return 
+
+    _record_prompt (kind ,chosen_model ,system_prompt ,messages )
+    resilience =get_resilience ()
+    chat =getattr (_get_mistral_client (),"chat",None )
+    if chat is None or not hasattr (chat ,"stream"):
+        content =resilience .call (
+        functools .partial (_throttled_complete ,system_prompt ,messages ,temperature ,chosen_model ,priority =current_priority ()),
+        chosen_model ,
+        )
+        if key is not None :
+            cache .put (key ,content )
+        yield content 
+        return 
+
+    chat_messages =[{"role":"system","content":system_prompt }]+messages 
+    parts :List [str ]=[]
+    resilience .guard ()
+    _throttle (system_prompt ,messages )
+    usage =None 
+    failed =False 
+    with span ("llm.stream",kind =kind ,model =chosen_model ):
+        try :
+            started =time .monotonic ()
+            events =get_call_executor ().submit (
+            functools .partial (
+            chat .stream ,
+            model =chosen_model ,
+            messages =chat_messages ,
+            temperature =float (temperature ),
+            ),
+            ).result (timeout =resilience .timeout_seconds )
+            for event in events :
+                usage =getattr (getattr (event ,"data",event ),"usage",None )or usage 
+                delta =_extract_delta (event )
+                if delta :
+                    parts .append (delta )
+                    yield delta 
+                if time .monotonic ()-started >resilience .deadline_seconds :
+                    raise TimeoutError (f"LLM stream exceeded {resilience.deadline_seconds:.1f}s")
+        except Exception as exc :
+            if parts or not is_retryable (exc ):
+                resilience .settle (exc )
+            failed =True 
+    if failed :
+        inc ("llm_stream_fallbacks_total",kind =kind )
+        content =resilience .call (
+        functools .partial (_throttled_complete ,system_prompt ,messages ,temperature ,chosen_model ,priority =current_priority ()),
+        chosen_model ,
+        )
+        if key is not None :
+            cache .put (key ,content )
+        yield content 
+        return 
+    resilience .settle (None )
+    record_usage (chosen_model ,usage )
+
+    content ="".join (parts ).strip ()
+    if not content :
+        raise RuntimeError ("Mistral returned an empty/unsupported response format.")
+    if key is not None :
+        cache .put (key ,content )
+
+
+async def astream_llm (
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float =0.2 ,
+model :Optional [str ]=None ,
+use_cache :bool =True ,
+kind :Optional [str ]=None ,
+)->AsyncIterator [str ]:
+    chosen_model =_resolve_model (model ,kind )
+    cache ,key =_cache_key (use_cache ,chosen_model ,system_prompt ,messages ,temperature )
+    if key is not None :
+        cached =cache .get (key )
+        inc ("llm_cache_lookups_total",kind =kind ,outcome ="hit"if cached is not None else "miss")
+        if cached is not None :
+            yield cached 
+            return 
+
+    _record_prompt (kind ,chosen_model ,system_prompt ,messages )
+    resilience =get_resilience ()
+    chat =getattr (_get_mistral_client (),"chat",None )
+    if chat is None or not hasattr (chat ,"stream_async"):
+        content =await resilience .acall (
+        functools .partial (_athrottled_complete ,system_prompt ,messages ,temperature ,chosen_model ),
+        chosen_model ,
+        )
+        if key is not None :
+            cache .put (key ,content )
+        yield content 
+        return 
+
+    chat_messages =[{"role":"system","content":system_prompt }]+messages 
+    parts :List [str ]=[]
+    resilience .guard ()
+    await _athrottle (system_prompt ,messages )
+    usage =None 
+    with span ("llm.stream",kind =kind ,model =chosen_model ):
+        try :
+            events =await asyncio .wait_for (
+            chat .stream_async (
+            model =chosen_model ,
+            messages =chat_messages ,
+            temperature =float (temperature ),
+            ),
+            resilience .timeout_seconds ,
+            )
+            async for event in events :
+                usage =getattr (getattr (event ,"data",event ),"usage",None )or usage 
+                delta =_extract_delta (event )
+                if delta :
+                    parts .append (delta )
+                    yield delta 
+        except Exception as exc :
+            resilience .settle (exc )
+    resilience .settle (None )
+    record_usage (chosen_model ,usage )
+
+    content ="".join (parts ).strip ()
+    if not content :
+        raise RuntimeError ("Mistral returned an empty/unsupported response format.")
+    if key is not None :
+        cache .put (key ,content )
+
+
+def _collect_question_stream (
+parser :IncrementalJSONParser ,
+chunk :str ,
+on_question :Callable [[str ],Any ],
+)->None :
+    for field_name ,value in parser .feed (chunk ):
+        if field_name =="question"and isinstance (value ,str )and value .strip ():
+            on_question (value )
+
+
+LOCAL_CATEGORIES =("off_topic","hallucination")
+REPEAT_SWAP_ATTEMPTS =3 
+
+FALLBACK_QUESTIONS =(
+"Какую техническую задачу из своего опыта вы считаете самой сложной и почему?",
+"Расскажите о последнем серьёзном инциденте или баге, который вы разбирали: как искали причину?",
+"Какое архитектурное решение в вашем проекте вы бы сейчас приняли иначе и почему?",
+"Как вы проверяете качество своего кода перед тем, как отдать его в ревью?",
+"Расскажите о случае, когда вам пришлось оптимизировать производительность: что измеряли и что изменили?",
+)
+
+ROLE_REVERSAL_FALLBACK ="Хороший вопрос! Я уточню детали у команды и вернусь к нему после интервью."
+
+_LOCAL_REASONS ={
+"role_reversal":"Кандидат задал встречный вопрос. Нужно ответить и продолжить интервью.",
+"off_topic":"Ответ не относится к заданному техническому вопросу.",
+"hallucination":"Ответ содержит ложные утверждения, не подтверждённые фактом.",
+}
+
+
 class ObserverAgent :
 
     def __init__ (
@@ -105,20 +515,72 @@ class ObserverAgent :
     position :str |None =None ,
     grade :str |None =None ,
     experience :str |None =None ,
+    question_bank :Any =None ,
+    rules :Optional [RuleEngine ]=None ,
+    scorer :Optional [LexicalScorer ]=None ,
+    turn_store :Optional [TurnStore ]=None ,
+    estimator :Optional [AbilityEstimator ]=None ,
+    question_index :Optional [QuestionIndex ]=None ,
     )->None :
         self .difficulty =1 
         self .performance_score =0 
-        self .questions_asked :List [Dict [str ,Any ]]=[]
+        self .turns =turn_store if turn_store is not None else TurnStore ()
 
         self .last_evaluation_result :Optional [str ]=None 
         self .position =position 
         self .grade =grade 
         self .experience =experience 
-        self .recent_turns :List [Dict [str ,Any ]]=[]
         self .profile_inferred =False 
         self .profile_position :str |None =None 
         self .profile_topics :List [str ]=[]
         self .profile_grade :str |None =None 
+        self .prefetcher :Optional [QuestionPrefetcher ]=None 
+        self .question_bank =question_bank 
+        self .rules =rules or get_rule_engine ()
+        self .scorer =scorer if scorer is not None else get_lexical_scorer ()
+        self .staged_question :Optional [Dict [str ,Any ]]=None 
+        self .estimator =estimator 
+        self .question_index =question_index if question_index is not None else make_question_index ()
+
+    SNAPSHOT_FIELDS =(
+    "difficulty",
+    "performance_score",
+    "last_evaluation_result",
+    "position",
+    "grade",
+    "experience",
+    "profile_inferred",
+    "profile_position",
+    "profile_topics",
+    "profile_grade",
+    "staged_question",
+    )
+
+    def snapshot (self )->Dict [str ,Any ]:
+        state ={name :getattr (self ,name )for name in self .SNAPSHOT_FIELDS }
+        if self .estimator is not None :
+            state ["estimator"]=self .estimator .snapshot ()
+        return state 
+
+    def restore (self ,state :Dict [str ,Any ],questions_asked :List [Dict [str ,Any ]])->None :
+        for name in self .SNAPSHOT_FIELDS :
+            if name in state :
+                setattr (self ,name ,state [name ])
+        self .turns .load_questions (questions_asked )
+        if self .question_index is not None :
+            self .question_index .clear ()
+            for question in self .questions_asked :
+                self .question_index .add (question ["question"])
+        if self .estimator is not None and state .get ("estimator"):
+            self .estimator .restore (state ["estimator"])
+
+    @property 
+    def questions_asked (self )->ColumnView :
+        return self .turns .questions 
+
+    @property 
+    def recent_turns (self )->ColumnView :
+        return self .turns .recent_turns 
 
     @staticmethod 
     def _parse_json_response (raw :str )->Dict [str ,Any ]:
@@ -142,32 +604,49 @@ class ObserverAgent :
 
     @staticmethod 
     def _parse_llm_json (raw :str )->Dict [str ,Any ]:
-        return ObserverAgent ._parse_json_response (raw )
+        try :
+            return ObserverAgent ._parse_json_response (raw )
+        except Exception :
+            inc ("llm_parse_failures_total")
+            raise 
 
-    def infer_profile_from_intro (self ,candidate_answer :str )->Dict [str ,Any ]:
-        system_prompt =(
-        "Вы — технический интервьюер. На основе ответа кандидата определите:\n"
-        "1) Позицию (должность) кандидата.\n"
-        "2) 4-7 релевантных тем для технических вопросов по этой позиции.\n"
-        "3) Предполагаемый грейд (Junior/Middle/Senior).\n"
-        "Верните СТРОГО JSON: {\"position\": \"...\", \"topics\": [\"...\"], \"grade\": \"...\"}.\n"
-        "Если кандидат упоминает DevOps/SRE/Infrastructure, включайте темы: Linux, сети, CI/CD, облака, "
-        "контейнеры, мониторинг/логирование, IaC, безопасность. "
-        "Если упоминает Frontend, включайте темы: JS/TS, HTML/CSS, браузер, React/Vue, производительность.\n"
-        "Если упоминает Backend, включайте темы: API, базы данных, архитектура, кэширование, очереди.\n"
-        "Если информации мало, сделайте лучший вывод, но не добавляйте нерелевантные темы."
-        )
+    @staticmethod 
+    def _profile_prompt (candidate_answer :str )->Tuple [str ,List [Dict [str ,str ]]]:
+        system_prompt =SYSTEM_PROMPTS ["profile"]
         messages =[
         {
         "role":"user",
         "content":f"Ответ кандидата: {candidate_answer}",
         }
         ]
-        raw =call_llm (system_prompt ,messages ,temperature =0 )
+        return system_prompt ,messages 
+
+    @instrumented ()
+    def infer_profile_from_intro (self ,candidate_answer :str )->Dict [str ,Any ]:
+        system_prompt ,messages =self ._profile_prompt (candidate_answer )
+        try :
+            raw =call_llm (system_prompt ,messages ,temperature =0 ,kind ="profile")
+        except LLMUnavailableError :
+            raw =""
+        return self ._apply_profile (raw )
+
+    @instrumented ()
+    async def ainfer_profile_from_intro (self ,candidate_answer :str )->Dict [str ,Any ]:
+        system_prompt ,messages =self ._profile_prompt (candidate_answer )
+        try :
+            raw =await acall_llm (system_prompt ,messages ,temperature =0 ,kind ="profile")
+        except LLMUnavailableError :
+            raw =""
+        return self ._apply_profile (raw )
+
+    def _apply_profile (self ,raw :str )->Dict [str ,Any ]:
         try :
             data =self ._parse_llm_json (raw )
         except Exception :
             data ={}
+        return self ._profile_from_data (data )
+
+    def _profile_from_data (self ,data :Dict [str ,Any ])->Dict [str ,Any ]:
         position =data .get ("position","").strip ()
         raw_topics =data .get ("topics",[])
         if isinstance (raw_topics ,str ):
@@ -186,6 +665,9 @@ class ObserverAgent :
         self .profile_topics =topics 
         self .profile_grade =grade 
         self .difficulty =self ._grade_to_difficulty (grade )
+        if self .question_bank is not None :
+            for topic in self .profile_topics :
+                self .question_bank .request_refill (self .profile_position ,topic ,self .difficulty )
         return {
         "position":self .profile_position ,
         "topics":self .profile_topics ,
@@ -203,110 +685,136 @@ class ObserverAgent :
             return 3 
         return 1 
 
+    @instrumented ()
     def record_turn (self ,question :Dict [str ,Any ],candidate_answer :str ,evaluation :Dict [str ,Any ])->None :
-        self .recent_turns .append (
-        {
-        "question":question .get ("question",""),
-        "topic":question .get ("topic",""),
-        "candidate_answer":candidate_answer ,
-        "result":evaluation .get ("result","unknown"),
-        }
-        )
-
-        self .recent_turns =self .recent_turns [-6 :]
+        self .turns .add_evaluation (question ,candidate_answer ,evaluation ,question .get ("difficulty",self .difficulty ))
 
-    def evaluate_answer (self ,question :Dict [str ,Any ],candidate_answer :str )->Dict [str ,Any ]:
+    @instrumented ()
+    def _local_evaluation (self ,question :Dict [str ,Any ],candidate_answer :str )->Optional [Dict [str ,Any ]]:
 
         answer_norm =candidate_answer .strip ().lower ()
 
-
-
-
-        question_words =[
-        "что",
-        "как",
-        "когда",
-        "зачем",
-        "почему",
-        "какой",
-        "какие",
-        "кто",
-        "сколько",
-        ]
-
         if "?"in candidate_answer :
-            stripped =candidate_answer .strip ().lower ()
-
-            if stripped .endswith ("?")or any (stripped .startswith (w )for w in question_words ):
-                self .last_evaluation_result ="role_reversal"
-                return {
-                "result":"role_reversal",
-                "reason":"Кандидат задал встречный вопрос. Нужно ответить и продолжить интервью.",
-                "confidence":90 ,
-                "correct_answer":question ["answer"],
-                "topics":[],
-                }
+            if answer_norm .endswith ("?")or self .rules .starts_with (answer_norm ,"role_reversal"):
+                return self ._local_verdict (question ,"role_reversal")
 
+        category =self .rules .classify (answer_norm ,LOCAL_CATEGORIES )
+        if category is not None :
+            return self ._local_verdict (question ,category )
 
-        off_topic_keywords =[
-        "погода",
-        "weather",
-        "кошка",
-        "собака",
-        "ха ха",
-        "не по теме",
-        ]
-        for kw in off_topic_keywords :
-            if kw in answer_norm :
-                self .last_evaluation_result ="off_topic"
+        if self .scorer is not None and not self .scorer .shadow_mode :
+            verdict =self .scorer .score (question .get ("answer",""),candidate_answer )
+            if verdict is not None :
+                self .last_evaluation_result =verdict ["result"]
                 return {
-                "result":"off_topic",
-                "reason":"Ответ не относится к заданному техническому вопросу.",
-                "confidence":90 ,
+                **verdict ,
                 "correct_answer":question ["answer"],
-                "topics":[],
+                "topics":[question .get ("topic","")],
                 }
+        return None 
 
+    def _local_verdict (self ,question :Dict [str ,Any ],result :str )->Dict [str ,Any ]:
+        self .last_evaluation_result =result 
+        return {
+        "result":result ,
+        "reason":_LOCAL_REASONS [result ],
+        "confidence":90 ,
+        "correct_answer":question ["answer"],
+        "topics":[],
+        }
 
-        hallucination_patterns =[
-        r"python\s*4\.0",
-        r"уберут\s+циклы",
-        r"нейронные\s+связи",
-        r"magic is real",
+    @staticmethod 
+    def _evaluation_lines (question :Dict [str ,Any ],candidate_answer :str )->List [str ]:
+        return [
+        f"Тема вопроса: {question.get('topic', 'не указано')}",
+        f"Вопрос: {question['question']}",
+        f"Ожидаемый ответ: {question['answer']}",
+        f"Ответ кандидата: {candidate_answer}",
         ]
-        for pat in hallucination_patterns :
-            if re .search (pat ,answer_norm ):
-                self .last_evaluation_result ="hallucination"
-                return {
-                "result":"hallucination",
-                "reason":"Ответ содержит ложные утверждения, не подтверждённые фактом.",
-                "confidence":90 ,
-                "correct_answer":question ["answer"],
-                "topics":[],
-                }
 
+    def _evaluation_prompt (self ,question :Dict [str ,Any ],candidate_answer :str )->Tuple [str ,List [Dict [str ,str ]]]:
+        lines =[f"Позиция: {self.profile_position or self.position or 'не указано'}"]
+        lines +=self ._evaluation_lines (question ,candidate_answer )
+        messages =[{"role":"user","content":"\n".join (lines )+"\n"}]
+        return SYSTEM_PROMPTS ["evaluation"],messages 
 
-        system_prompt =(
-        "Вы — помощник для оценки ответов кандидатов на технические вопросы. "
-        "Вам дан вопрос, ожидаемый правильный ответ и фактический ответ кандидата. "
-        "Классифицируйте ответ как 'correct', 'partial' или 'incorrect'. "
-        "Также укажите краткую причину и уверенность (0-100). "
-        "Верните СТРОГО JSON: {\"result\": ..., \"reason\": ..., \"confidence\": ...}."
-        )
-        messages =[
-        {
-        "role":"user",
-        "content":(
-        f"Позиция: {self.profile_position or self.position or 'не указано'}\n"
-        f"Тема вопроса: {question.get('topic', 'не указано')}\n"
-        f"Вопрос: {question['question']}\n"
-        f"Ожидаемый ответ: {question['answer']}\n"
-        f"Ответ кандидата: {candidate_answer}\n"
-        ),
+    @instrumented ()
+    def evaluate_answer (self ,question :Dict [str ,Any ],candidate_answer :str )->Dict [str ,Any ]:
+        local =self ._local_evaluation (question ,candidate_answer )
+        if local is not None :
+            return local 
+        system_prompt ,messages =self ._evaluation_prompt (question ,candidate_answer )
+        try :
+            data =self ._grade_with_cascade (system_prompt ,messages )
+        except (LLMUnavailableError ,LLMResponseError ):
+            return self ._degraded_evaluation (question ,candidate_answer )
+        return self ._evaluation_from_data (question ,candidate_answer ,data )
+
+    @instrumented ()
+    async def aevaluate_answer (self ,question :Dict [str ,Any ],candidate_answer :str )->Dict [str ,Any ]:
+        local =self ._local_evaluation (question ,candidate_answer )
+        if local is not None :
+            return local 
+        system_prompt ,messages =self ._evaluation_prompt (question ,candidate_answer )
+        try :
+            data =await self ._agrade_with_cascade (system_prompt ,messages )
+        except (LLMUnavailableError ,LLMResponseError ):
+            return self ._degraded_evaluation (question ,candidate_answer )
+        return self ._evaluation_from_data (question ,candidate_answer ,data )
+
+    def _accept_grade (self ,raw :str ,model :str ,is_last :bool )->Optional [Dict [str ,Any ]]:
+        router =get_model_router ()
+        try :
+            data =self ._parse_llm_json (raw )
+            if "result"not in data :
+                raise ValueError ("Missing key result in LLM response")
+        except Exception as exc :
+            if is_last :
+                raise LLMResponseError (f"Final cascade tier {model} returned an unparseable grade: {exc}")from exc 
+            router .record_grade ("evaluation",model ,escalated =True )
+            return None 
+        try :
+            confidence =int (data .get ("confidence",60 ))
+        except (TypeError ,ValueError ):
+            confidence =None 
+        escalated =not is_last and (confidence is None or confidence <router .escalation_confidence )
+        router .record_grade ("evaluation",model ,escalated )
+        return None if escalated else data 
+
+    def _grade_with_cascade (self ,system_prompt :str ,messages :List [Dict [str ,str ]])->Dict [str ,Any ]:
+        tiers =get_model_router ().tiers ("evaluation")
+        for idx ,model in enumerate (tiers ):
+            raw =call_llm (system_prompt ,messages ,temperature =0 ,model =model ,kind ="evaluation")
+            data =self ._accept_grade (raw ,model ,idx ==len (tiers )-1 )
+            if data is not None :
+                return data 
+        raise RuntimeError ("Model cascade produced no grade.")
+
+    async def _agrade_with_cascade (self ,system_prompt :str ,messages :List [Dict [str ,str ]])->Dict [str ,Any ]:
+        tiers =get_model_router ().tiers ("evaluation")
+        for idx ,model in enumerate (tiers ):
+            raw =await acall_llm (system_prompt ,messages ,temperature =0 ,model =model ,kind ="evaluation")
+            data =self ._accept_grade (raw ,model ,idx ==len (tiers )-1 )
+            if data is not None :
+                return data 
+        raise RuntimeError ("Model cascade produced no grade.")
+
+    def _degraded_evaluation (self ,question :Dict [str ,Any ],candidate_answer :str )->Dict [str ,Any ]:
+        scorer =self .scorer or LexicalScorer (rules =self .rules )
+        verdict =scorer .fallback_verdict (question .get ("answer",""),candidate_answer )
+        self .last_evaluation_result =verdict ["result"]
+        return {
+        **verdict ,
+        "correct_answer":question ["answer"],
+        "topics":[question .get ("topic","")],
         }
-        ]
-        raw =call_llm (system_prompt ,messages ,temperature =0 )
-        data =self ._parse_llm_json (raw )
+
+    def _evaluation_from_data (
+    self ,
+    question :Dict [str ,Any ],
+    candidate_answer :str ,
+    data :Dict [str ,Any ],
+    )->Dict [str ,Any ]:
         result =data ["result"]
         reason =data .get ("reason","")
         try :
@@ -314,6 +822,8 @@ class ObserverAgent :
         except (TypeError ,ValueError ):
             confidence =60 
 
+        if self .scorer is not None and self .scorer .shadow_mode :
+            self .scorer .record_shadow (question .get ("answer",""),candidate_answer ,result )
 
         self .last_evaluation_result =result 
         return {
@@ -324,23 +834,356 @@ class ObserverAgent :
         "topics":[question .get ("topic","")],
         }
 
-    def update_difficulty (self ,evaluation_result :str )->None :
+    def _fused_profile_prompt (self ,candidate_answer :str )->Tuple [str ,List [Dict [str ,str ]]]:
+        _ ,messages =self ._profile_prompt (candidate_answer )
+        return SYSTEM_PROMPTS ["fused_profile"],messages 
+
+    @instrumented ()
+    def infer_profile_with_first_question (self ,candidate_answer :str )->Dict [str ,Any ]:
+        system_prompt ,messages =self ._fused_profile_prompt (candidate_answer )
+        try :
+            raw =call_llm (system_prompt ,messages ,temperature =0 ,kind ="profile")
+        except LLMUnavailableError :
+            raw =""
+        return self ._apply_fused_profile (raw )
+
+    @instrumented ()
+    async def ainfer_profile_with_first_question (self ,candidate_answer :str )->Dict [str ,Any ]:
+        system_prompt ,messages =self ._fused_profile_prompt (candidate_answer )
+        try :
+            raw =await acall_llm (system_prompt ,messages ,temperature =0 ,kind ="profile")
+        except LLMUnavailableError :
+            raw =""
+        return self ._apply_fused_profile (raw )
+
+    def _apply_fused_profile (self ,raw :str )->Dict [str ,Any ]:
+        try :
+            data =self ._parse_llm_json (raw )
+        except Exception :
+            data ={}
+        profile =self ._profile_from_data (data )
+        self ._stage_question (data .get ("next_question"),self .difficulty )
+        return profile 
+
+    def _fused_evaluation_prompt (self ,question :Dict [str ,Any ],candidate_answer :str )->Tuple [str ,List [Dict [str ,str ]]]:
+        _ ,difficulty_if_correct =self ._difficulty_after ("correct")
+        _ ,difficulty_if_incorrect =self ._difficulty_after ("incorrect")
+        user_content =get_prompt_builder ().build (
+        self ._session_lines (),
+        self .recent_turns ,
+        self ._asked_for_prompt (),
+        self ._evaluation_lines (question ,candidate_answer )
+        +[
+        f"Сложность следующего вопроса: {difficulty_if_correct}, если ответ correct; "
+        f"{difficulty_if_incorrect}, если partial или incorrect",
+        ],
+        )
+        return SYSTEM_PROMPTS ["fused_evaluation"],[{"role":"user","content":user_content }]
+
+    @instrumented ()
+    def evaluate_and_prepare_next (self ,question :Dict [str ,Any ],candidate_answer :str )->Dict [str ,Any ]:
+        local =self ._local_evaluation (question ,candidate_answer )
+        if local is not None :
+            return local 
+        system_prompt ,messages =self ._fused_evaluation_prompt (question ,candidate_answer )
+        try :
+            data =self ._grade_with_cascade (system_prompt ,messages )
+        except (LLMUnavailableError ,LLMResponseError ):
+            self .staged_question =None 
+            return self ._degraded_evaluation (question ,candidate_answer )
+        return self ._apply_fused_evaluation (question ,candidate_answer ,data )
+
+    @instrumented ()
+    async def aevaluate_and_prepare_next (self ,question :Dict [str ,Any ],candidate_answer :str )->Dict [str ,Any ]:
+        local =self ._local_evaluation (question ,candidate_answer )
+        if local is not None :
+            return local 
+        system_prompt ,messages =self ._fused_evaluation_prompt (question ,candidate_answer )
+        try :
+            data =await self ._agrade_with_cascade (system_prompt ,messages )
+        except (LLMUnavailableError ,LLMResponseError ):
+            self .staged_question =None 
+            return self ._degraded_evaluation (question ,candidate_answer )
+        return self ._apply_fused_evaluation (question ,candidate_answer ,data )
+
+    def _apply_fused_evaluation (
+    self ,
+    question :Dict [str ,Any ],
+    candidate_answer :str ,
+    data :Dict [str ,Any ],
+    )->Dict [str ,Any ]:
+        evaluation =self ._evaluation_from_data (question ,candidate_answer ,data )
+        _ ,next_difficulty =self ._difficulty_after (evaluation ["result"],question .get ("difficulty"))
+        self ._stage_question (data .get ("next_question"),next_difficulty )
+        return evaluation 
+
+    def _stage_question (self ,candidate :Any ,difficulty :int )->None :
+        self .staged_question =None 
+        if not isinstance (candidate ,dict ):
+            return 
+        text =str (candidate .get ("question","")).strip ()
+        if not text :
+            return 
+        self .staged_question ={
+        "topic":str (candidate .get ("topic","")).strip (),
+        "difficulty":difficulty ,
+        "question":text ,
+        "answer":str (candidate .get ("answer","")).strip (),
+        }
+
+    def _take_staged (self )->Optional [Dict [str ,Any ]]:
+        staged =self .staged_question 
+        self .staged_question =None 
+        if staged is None or staged ["difficulty"]!=self .difficulty :
+            return None 
+        self .cancel_prefetch ()
+        return staged 
+
+    def _difficulty_after (
+    self ,
+    evaluation_result :Optional [str ],
+    question_difficulty :Optional [int ]=None ,
+    )->Tuple [int ,int ]:
+        performance_score =self .performance_score 
+        difficulty =self .difficulty 
         if evaluation_result =="correct":
-            self .performance_score +=1 
-            if self .performance_score %2 ==0 :
-                self .difficulty =min (3 ,self .difficulty +1 )
+            performance_score +=1 
+            if performance_score %2 ==0 :
+                difficulty =min (3 ,difficulty +1 )
         elif evaluation_result in ("incorrect","partial"):
-            self .performance_score =max (0 ,self .performance_score -1 )
-            if self .performance_score %2 ==1 and self .performance_score >0 :
-                self .difficulty =max (1 ,self .difficulty -1 )
+            performance_score =max (0 ,performance_score -1 )
+            if performance_score %2 ==1 and performance_score >0 :
+                difficulty =max (1 ,difficulty -1 )
+        if self .estimator is not None :
+            difficulty =self .estimator .next_difficulty (
+            self .difficulty if question_difficulty is None else question_difficulty ,
+            evaluation_result ,
+            )
+        return performance_score ,difficulty 
+
+    @instrumented ()
+    def update_difficulty (self ,evaluation_result :str ,question_difficulty :Optional [int ]=None )->None :
+        level =self .difficulty if question_difficulty is None else question_difficulty 
+        self .performance_score ,self .difficulty =self ._difficulty_after (evaluation_result ,level )
+        if self .estimator is not None :
+            self .estimator .update (level ,evaluation_result )
+
+    def verdict_settled (self )->bool :
+        return self .estimator is not None and self .estimator .should_stop ()
+
+    def _prefetch_state_key (self )->Tuple [int ,int ,int ]:
+        return (len (self .questions_asked ),self .performance_score ,self .difficulty )
+
+    def _prefetch_targets (self )->Dict [int ,Optional [str ]]:
+        targets :Dict [int ,Optional [str ]]={}
+        for outcome in ("correct","incorrect",None ):
+            _ ,difficulty =self ._difficulty_after (outcome )
+            targets .setdefault (difficulty ,outcome or self .last_evaluation_result )
+        return targets 
+
+    @instrumented ()
+    def start_prefetch (self )->None :
+        if not self .profile_inferred :
+            return 
+        if self .prefetcher is None :
+            self .prefetcher =QuestionPrefetcher ()
+        state_key =self ._prefetch_state_key ()
+        if self .prefetcher .is_primed (state_key ):
+            return 
+        for difficulty ,outcome in self ._prefetch_targets ().items ():
+            system_prompt ,messages =self ._question_prompt (difficulty ,outcome )
+            self .prefetcher .submit (state_key ,difficulty ,self ._request_question ,system_prompt ,messages )
+
+    @instrumented ()
+    async def astart_prefetch (self )->None :
+        if not self .profile_inferred :
+            return 
+        if self .prefetcher is None :
+            self .prefetcher =QuestionPrefetcher ()
+        state_key =self ._prefetch_state_key ()
+        if self .prefetcher .is_primed (state_key ):
+            return 
+        for difficulty ,outcome in self ._prefetch_targets ().items ():
+            system_prompt ,messages =self ._question_prompt (difficulty ,outcome )
+            self .prefetcher .schedule (state_key ,difficulty ,self ._arequest_question (system_prompt ,messages ))
+
+    def cancel_prefetch (self )->None :
+        if self .prefetcher is not None :
+            self .prefetcher .cancel_all ()
+
+    def _take_prefetched (self )->Optional [Any ]:
+        if self .prefetcher is None :
+            return None 
+        return self .prefetcher .take (self .difficulty )
+
+    def _topics_by_coverage (self )->List [str ]:
+        asked_per_topic ={topic :0 for topic in self .profile_topics }
+        for q in self .questions_asked :
+            if q .get ("topic")in asked_per_topic :
+                asked_per_topic [q ["topic"]]+=1 
+        return sorted (self .profile_topics ,key =lambda topic :asked_per_topic [topic ])
+
+    def _take_from_bank (self ,difficulty :Optional [int ]=None )->Optional [Dict [str ,Any ]]:
+        if self .question_bank is None :
+            return None 
+        q =self .question_bank .take (
+        self .profile_position or "",
+        self ._topics_by_coverage (),
+        self .difficulty if difficulty is None else difficulty ,
+        exclude =[asked .get ("question","")for asked in self .questions_asked ],
+        )
+        if q is not None :
+            self .cancel_prefetch ()
+        return q 
 
+    def _question_indexes (self )->List [QuestionIndex ]:
+        indexes =[self .question_index ,get_shared_question_index (self .profile_position or self .position or "")]
+        return [index for index in indexes if index is not None ]
+
+    def _is_repeat (self ,text :str )->bool :
+        return any (index .find (text )is not None for index in self ._question_indexes ())
+
+    def _unless_repeat (self ,q :Optional [Dict [str ,Any ]],source :str )->Optional [Dict [str ,Any ]]:
+        if q is None or not self ._is_repeat (q .get ("question","")):
+            return q 
+        inc ("question_repeats_total",source =source )
+        for _ in range (REPEAT_SWAP_ATTEMPTS ):
+            alternative =self ._take_from_bank ()
+            if alternative is None :
+                break 
+            if not self ._is_repeat (alternative .get ("question","")):
+                inc ("question_repeat_swaps_total")
+                return alternative 
+        return None 
 
-    def select_next_question (self )->Dict [str ,Any ]:
+    def _unique_announcer (self ,on_question :Callable [[str ],Any ])->Callable [[str ],Any ]:
+        def announce (text :str )->None :
+            if not self ._is_repeat (text ):
+                on_question (text )
+        return announce 
+
+    def _asked_for_prompt (self )->Any :
+        return self .questions_asked if self .question_index is None else ()
+
+    def _fallback_question (self )->Dict [str ,Any ]:
+        for level in (self .difficulty -1 ,self .difficulty +1 ):
+            if 1 <=level <=3 :
+                q =self ._take_from_bank (level )
+                if q is not None and not self ._is_repeat (q .get ("question","")):
+                    return q 
+        asked ={q .get ("question","")for q in self .questions_asked }
+        topics =self ._topics_by_coverage ()or ["основы инженерии ПО"]
+        offset =len (self .questions_asked )
+        stock =[FALLBACK_QUESTIONS [(offset +i )%len (FALLBACK_QUESTIONS )]for i in range (len (FALLBACK_QUESTIONS ))]
+        candidates =[
+        (topic ,f"Расскажите, с какими задачами по теме «{topic}» вы сталкивались на практике и как их решали.")
+        for topic in topics 
+        ]+[(topics [0 ],text )for text in stock ]
+        for topic ,text in candidates :
+            if text not in asked and not self ._is_repeat (text ):
+                return {"topic":topic ,"difficulty":self .difficulty ,"question":text ,"answer":""}
+        inc ("question_fallback_exhausted_total")
+        return {"topic":topics [0 ],"difficulty":self .difficulty ,"question":stock [0 ],"answer":""}
+
+    @instrumented ()
+    def select_next_question (self ,on_question :Optional [Callable [[str ],Any ]]=None )->Dict [str ,Any ]:
         if not self .profile_inferred :
-            return self ._generate_intro_question_via_llm ()
+            try :
+                if on_question is not None :
+                    system_prompt ,messages =self ._intro_prompt ()
+                    return self ._parse_intro_question (self ._stream_json (system_prompt ,messages ,on_question ,"intro"))
+                return self ._generate_intro_question_via_llm ()
+            except LLMUnavailableError :
+                return self ._parse_intro_question ("")
+
+        q =self ._take_staged ()
+        if q is None :
+            q =self ._take_from_bank ()
+        if q is None :
+            q =result_or_none (self ._take_prefetched ())
+        q =self ._unless_repeat (q ,"prepared")
+        try :
+            if q is None :
+                if on_question is not None :
+                    system_prompt ,messages =self ._question_prompt ()
+                    raw =self ._stream_json (system_prompt ,messages ,self ._unique_announcer (on_question ),"question")
+                    candidate =self ._parse_question (raw )
+                else :
+                    candidate =self ._generate_question_via_llm ()
+                q =self ._unless_repeat (candidate ,"llm")
+                if q is None :
+                    retry =self ._generate_question_via_llm (rejected =candidate .get ("question",""))
+                    q =self ._unless_repeat (retry ,"llm_retry")
+        except (LLMUnavailableError ,LLMResponseError ):
+            q =None 
+        if q is None :
+            q =self ._fallback_question ()
+        return self ._register_question (q )
+
+    @instrumented ()
+    async def aselect_next_question (self ,on_question :Optional [Callable [[str ],Any ]]=None )->Dict [str ,Any ]:
+        if not self .profile_inferred :
+            try :
+                if on_question is not None :
+                    system_prompt ,messages =self ._intro_prompt ()
+                    return self ._parse_intro_question (await self ._astream_json (system_prompt ,messages ,on_question ,"intro"))
+                return await self ._agenerate_intro_question_via_llm ()
+            except LLMUnavailableError :
+                return self ._parse_intro_question ("")
+
+        q =self ._take_staged ()
+        if q is None :
+            q =self ._take_from_bank ()
+        if q is None :
+            q =await aresult_or_none (self ._take_prefetched ())
+        q =self ._unless_repeat (q ,"prepared")
+        try :
+            if q is None :
+                if on_question is not None :
+                    system_prompt ,messages =self ._question_prompt ()
+                    raw =await self ._astream_json (system_prompt ,messages ,self ._unique_announcer (on_question ),"question")
+                    candidate =self ._parse_question (raw )
+                else :
+                    candidate =await self ._agenerate_question_via_llm ()
+                q =self ._unless_repeat (candidate ,"llm")
+                if q is None :
+                    retry =await self ._agenerate_question_via_llm (rejected =candidate .get ("question",""))
+                    q =self ._unless_repeat (retry ,"llm_retry")
+        except (LLMUnavailableError ,LLMResponseError ):
+            q =None 
+        if q is None :
+            q =self ._fallback_question ()
+        return self ._register_question (q )
 
-        q =self ._generate_question_via_llm ()
+    @staticmethod 
+    def _stream_json (
+    system_prompt :str ,
+    messages :List [Dict [str ,str ]],
+    on_question :Callable [[str ],Any ],
+    kind :str ,
+    )->str :
+        parser =IncrementalJSONParser ()
+        chunks :List [str ]=[]
+        for chunk in stream_llm (system_prompt ,messages ,temperature =0 ,kind =kind ):
+            chunks .append (chunk )
+            _collect_question_stream (parser ,chunk ,on_question )
+        return "".join (chunks )
 
+    @staticmethod 
+    async def _astream_json (
+    system_prompt :str ,
+    messages :List [Dict [str ,str ]],
+    on_question :Callable [[str ],Any ],
+    kind :str ,
+    )->str :
+        parser =IncrementalJSONParser ()
+        chunks :List [str ]=[]
+        async for chunk in astream_llm (system_prompt ,messages ,temperature =0 ,kind =kind ):
+            chunks .append (chunk )
+            _collect_question_stream (parser ,chunk ,on_question )
+        return "".join (chunks )
+
+    def _register_question (self ,q :Dict [str ,Any ])->Dict [str ,Any ]:
 
         if "difficulty"not in q :
             q ["difficulty"]=self .difficulty 
@@ -349,17 +1192,32 @@ class ObserverAgent :
 
 
 
-        self .questions_asked .append (q )
+        try :
+            q ["difficulty"]=max (1 ,min (3 ,int (q ["difficulty"])))
+        except (TypeError ,ValueError ):
+            q ["difficulty"]=self .difficulty 
+        self .turns .add_question (q )
+        for index in self ._question_indexes ():
+            index .add (q ["question"])
         return q 
 
-    def _generate_intro_question_via_llm (self )->Dict [str ,Any ]:
-        system_prompt =(
-        "Вы — интервьюер. Сформулируйте краткий первый вопрос, "
-        "чтобы кандидат представился, указал позицию, опыт и ключевые технологии. "
-        "Верните СТРОГО JSON: {\"question\": \"...\"}."
-        )
+    @staticmethod 
+    def _intro_prompt ()->Tuple [str ,List [Dict [str ,str ]]]:
+        system_prompt =SYSTEM_PROMPTS ["intro"]
         messages =[{"role":"user","content":"Сгенерируйте первое приветственное обращение."}]
-        raw =call_llm (system_prompt ,messages ,temperature =0 )
+        return system_prompt ,messages 
+
+    def _generate_intro_question_via_llm (self )->Dict [str ,Any ]:
+        system_prompt ,messages =self ._intro_prompt ()
+        raw =call_llm (system_prompt ,messages ,temperature =0 ,kind ="intro")
+        return self ._parse_intro_question (raw )
+
+    async def _agenerate_intro_question_via_llm (self )->Dict [str ,Any ]:
+        system_prompt ,messages =self ._intro_prompt ()
+        raw =await acall_llm (system_prompt ,messages ,temperature =0 ,kind ="intro")
+        return self ._parse_intro_question (raw )
+
+    def _parse_intro_question (self ,raw :str )->Dict [str ,Any ]:
         try :
             data =self ._parse_llm_json (raw )
             question_text =data .get ("question","").strip ()
@@ -374,36 +1232,63 @@ class ObserverAgent :
         "answer":"",
         }
 
-    def _generate_question_via_llm (self )->Dict [str ,Any ]:
-
-        system_prompt =(
-        "Вы — ассистент по проведению технических собеседований. "
-        "Сгенерируйте следующий вопрос для кандидата на основе предоставленной информации. "
-        "Вы должны вернуть JSON со следующими полями: 'topic' (одна из тем: "
-        f"{', '.join(self.profile_topics)}"+"), 'difficulty' (целое 1-3), "
-        "'question' (текст вопроса на русском языке), 'answer' (ожидаемый правильный краткий ответ). "
-        "Выбирайте тему только из списка допустимых и придерживайтесь указанной сложности. "
-        "Если предыдущий ответ кандидата был верным, вы можете увеличить сложность; "
-        "если неверным — уменьшить. Вопросы должны строго соответствовать позиции кандидата."
-        )
+    def _session_lines (self )->List [str ]:
+        return [
+        f"Позиция кандидата: {self.profile_position or self.position or 'не указано'}",
+        f"Темы: {', '.join(self.profile_topics)}",
+        ]
 
-        perf =self .last_evaluation_result or "none"
-        asked =[q .get ("question","")for q in self .questions_asked [-5 :]]
-        recent_context =[
-        f"{idx + 1}) Q: {t['question']} | A: {t['candidate_answer']} | R: {t['result']}"
-        for idx ,t in enumerate (self .recent_turns [-4 :])
+    def _question_prompt (
+    self ,
+    difficulty :Optional [int ]=None ,
+    last_result :Optional [str ]=None ,
+    rejected :Optional [str ]=None ,
+    )->Tuple [str ,List [Dict [str ,str ]]]:
+        target_difficulty =self .difficulty if difficulty is None else difficulty 
+        perf =(last_result if last_result is not None else self .last_evaluation_result )or "none"
+        task_lines =[
+        f"Желаемая сложность: {target_difficulty}",
+        f"Последняя оценка ответа кандидата: {perf}",
         ]
-        user_content =(
-        f"Позиция кандидата: {self.profile_position or 'не указано'}\n"
-        f"Темы: {', '.join(self.profile_topics)}\n"
-        f"Желаемая сложность: {self.difficulty}\n"
-        f"Последняя оценка ответа кандидата: {perf}\n"
-        f"Контекст последних ответов кандидата (не повторять вопросы): {recent_context}\n"
-        f"Уже заданные вопросы (не повторять): {asked}\n"
-        "Сгенерируйте ОДИН новый вопрос, который НЕ повторяет уже заданные."
+        if rejected is not None :
+            task_lines .append (f"Вопрос «{rejected}» уже задавался — сформулируйте другой, по иной теме или с иным акцентом.")
+        user_content =get_prompt_builder ().build (
+        self ._session_lines (),
+        self .recent_turns ,
+        self .questions_asked if rejected is not None else self ._asked_for_prompt (),
+        task_lines ,
+        "Сгенерируйте ОДИН новый вопрос, который НЕ повторяет уже заданные.",
         )
         messages =[{"role":"user","content":user_content }]
-        raw =call_llm (system_prompt ,messages ,temperature =0 )
+        return SYSTEM_PROMPTS ["question"],messages 
+
+    def _generate_question_via_llm (
+    self ,
+    difficulty :Optional [int ]=None ,
+    last_result :Optional [str ]=None ,
+    rejected :Optional [str ]=None ,
+    )->Dict [str ,Any ]:
+        system_prompt ,messages =self ._question_prompt (difficulty ,last_result ,rejected )
+        return self ._request_question (system_prompt ,messages )
+
+    async def _agenerate_question_via_llm (
+    self ,
+    difficulty :Optional [int ]=None ,
+    last_result :Optional [str ]=None ,
+    rejected :Optional [str ]=None ,
+    )->Dict [str ,Any ]:
+        system_prompt ,messages =self ._question_prompt (difficulty ,last_result ,rejected )
+        return await self ._arequest_question (system_prompt ,messages )
+
+    def _request_question (self ,system_prompt :str ,messages :List [Dict [str ,str ]])->Dict [str ,Any ]:
+        raw =call_llm (system_prompt ,messages ,temperature =0 ,kind ="question")
+        return self ._parse_question (raw )
+
+    async def _arequest_question (self ,system_prompt :str ,messages :List [Dict [str ,str ]])->Dict [str ,Any ]:
+        raw =await acall_llm (system_prompt ,messages ,temperature =0 ,kind ="question")
+        return self ._parse_question (raw )
+
+    def _parse_question (self ,raw :str )->Dict [str ,Any ]:
         try :
             question_dict =self ._parse_llm_json (raw )
 
@@ -412,7 +1297,7 @@ class ObserverAgent :
                     raise ValueError (f"Missing key {key} in LLM response")
             return question_dict 
         except Exception as e :
-            raise RuntimeError (f"Failed to parse LLM question JSON: {e}. Raw response: {raw}")
+            raise LLMResponseError (f"Failed to parse LLM question JSON: {e}. Raw response: {raw}")
 
 
 class InterviewerAgent :
@@ -420,9 +1305,11 @@ class InterviewerAgent :
     def __init__ (self )->None :
         pass 
 
+    @instrumented ()
     def pose_question (self ,question :Dict [str ,Any ])->str :
         return question ["question"]
 
+    @instrumented ()
     def handle_off_topic_or_hallucination (self ,evaluation_result :str )->str :
         if evaluation_result =="off_topic":
             return "Ваш ответ не связан с вопросом. Давайте вернёмся к теме и попробуем ещё раз."
@@ -433,22 +1320,63 @@ class InterviewerAgent :
         else :
             return ""
 
-    def handle_role_reversal (self ,candidate_question :str )->str :
+    @staticmethod 
+    def _role_reversal_prompt (candidate_question :str )->Tuple [str ,List [Dict [str ,str ]]]:
 
-        system_prompt =(
-        "Вы — рекрутер, отвечающий на вопросы кандидатов во время интервью. "
-        "Ответьте кратко и по существу на вопрос кандидата о работе, команде, технологиях или процессах. "
-        "Если вопрос выходит за рамки вашей компетенции, вежливо скажите, что уточните у команды."
-        )
+        system_prompt =SYSTEM_PROMPTS ["role_reversal"]
         messages =[
         {
         "role":"user",
         "content":f"Вопрос кандидата: {candidate_question}\nКратко ответьте."
         }
         ]
-        reply =call_llm (system_prompt ,messages ,temperature =0 )
+        return system_prompt ,messages 
+
+    @instrumented ()
+    def handle_role_reversal (self ,candidate_question :str )->str :
+        system_prompt ,messages =self ._role_reversal_prompt (candidate_question )
+        try :
+            reply =call_llm (system_prompt ,messages ,temperature =0 ,kind ="role_reversal")
+        except LLMUnavailableError :
+            reply =ROLE_REVERSAL_FALLBACK 
+        return reply 
+
+    @instrumented ()
+    async def ahandle_role_reversal (self ,candidate_question :str )->str :
+        system_prompt ,messages =self ._role_reversal_prompt (candidate_question )
+        try :
+            reply =await acall_llm (system_prompt ,messages ,temperature =0 ,kind ="role_reversal")
+        except LLMUnavailableError :
+            reply =ROLE_REVERSAL_FALLBACK 
         return reply 
 
+    @instrumented ()
+    def stream_role_reversal (self ,candidate_question :str )->Iterator [str ]:
+        system_prompt ,messages =self ._role_reversal_prompt (candidate_question )
+        emitted =False 
+        try :
+            for chunk in stream_llm (system_prompt ,messages ,temperature =0 ,kind ="role_reversal"):
+                emitted =True 
+                yield chunk 
+        except LLMUnavailableError :
+            if emitted :
+                raise 
+            yield ROLE_REVERSAL_FALLBACK 
+
+    @instrumented ()
+    async def astream_role_reversal (self ,candidate_question :str )->AsyncIterator [str ]:
+        system_prompt ,messages =self ._role_reversal_prompt (candidate_question )
+        emitted =False 
+        try :
+            async for chunk in astream_llm (system_prompt ,messages ,temperature =0 ,kind ="role_reversal"):
+                emitted =True 
+                yield chunk 
+        except LLMUnavailableError :
+            if emitted :
+                raise 
+            yield ROLE_REVERSAL_FALLBACK 
+
+    @instrumented ()
     def acknowledge_answer (self ,evaluation_result :str )->str :
         if evaluation_result =="correct":
             return "Спасибо! Давайте перейдём к следующему вопросу."
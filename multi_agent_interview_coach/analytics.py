@@ -0,0 +1,399 @@
+from __future__ import annotations 
+
+import importlib 
+import json 
+import os 
+import re 
+import sys 
+from array import array 
+from pathlib import Path 
+from typing import Any ,Dict ,Iterable ,List ,Optional ,Sequence ,Tuple 
+
+from .estimator import RESULT_SCORES 
+from .logger import TranscriptReader 
+
+
+EVALUATION_COLUMNS ={"session":"i","topic":"i","result":"i","difficulty":"b","confidence":"b"}
+SESSION_COLUMNS ={"position":"i","grade":"i","claimed_grade":"i","hire":"i","accuracy":"f"}
+CATEGORIES ={
+"topic":"topic",
+"result":"result",
+"position":"position",
+"grade":"grade",
+"claimed_grade":"grade",
+"hire":"hire",
+}
+META_FILE ="meta.json"
+LEGACY_QUESTION_RE =re .compile (r"Задаём вопрос по теме '(.*?)' сложностью (\d+)")
+LEGACY_RESULT_RE =re .compile (r"Ответ классифицирован как (\w+)")
+LEGACY_FEEDBACK_RE ={
+"position":re .compile (r"^Позиция: (.*)$",re .MULTILINE ),
+"grade":re .compile (r"^- Грейд: (.*)$",re .MULTILINE ),
+"hire_recommendation":re .compile (r"^- Рекомендация по найму: (.*)$",re .MULTILINE ),
+}
+
+
+def _load_numpy ():
+    try :
+        return importlib .import_module ("numpy")
+    except ImportError :
+        raise RuntimeError (
+        "Package 'numpy' is not installed. Install it with: pip install numpy"
+        )
+
+
+def _read_log (path :str )->Dict [str ,Any ]:
+    if path .endswith (".json"):
+        with open (path ,"r",encoding ="utf-8")as f :
+            return json .load (f )
+    return TranscriptReader (path ).to_dict ()
+
+
+def _legacy_log (data :Dict [str ,Any ])->Tuple [List [Dict [str ,Any ]],Dict [str ,Any ]]:
+    evaluations :List [Dict [str ,Any ]]=[]
+    for turn in data .get ("turns")or []:
+        thoughts =str (turn .get ("internal_thoughts")or "")
+        question =LEGACY_QUESTION_RE .search (thoughts )
+        result =LEGACY_RESULT_RE .search (thoughts )
+        if question and result :
+            evaluations .append ({
+            "topic":question .group (1 ),
+            "difficulty":int (question .group (2 )),
+            "result":result .group (1 ),
+            "confidence":0 ,
+            })
+    summary :Dict [str ,Any ]={}
+    feedback =str (data .get ("final_feedback")or "")
+    for name ,pattern in LEGACY_FEEDBACK_RE .items ():
+        match =pattern .search (feedback )
+        summary [name ]=match .group (1 ).strip ()if match else ""
+    scores =[RESULT_SCORES [entry ["result"]]for entry in evaluations if entry ["result"]in RESULT_SCORES ]
+    summary ["accuracy"]=sum (scores )/len (scores )if scores else 0.0 
+    return evaluations ,summary 
+
+
+class AnalyticsBuilder :
+
+    def __init__ (self )->None :
+        self .dictionaries :Dict [str ,List [str ]]={name :[]for name in set (CATEGORIES .values ())}
+        self ._codes :Dict [str ,Dict [str ,int ]]={name :{}for name in self .dictionaries }
+        self .evaluations ={name :array (code )for name ,code in EVALUATION_COLUMNS .items ()}
+        self .sessions ={name :array (code )for name ,code in SESSION_COLUMNS .items ()}
+        self .sources :List [str ]=[]
+        self ._known_sources :set =set ()
+        self .skipped :Dict [str ,int ]={}
+        self .legacy =0 
+
+    @classmethod 
+    def from_store (cls ,directory :str )->"AnalyticsBuilder":
+        np =_load_numpy ()
+        builder =cls ()
+        store =AnalyticsStore .open (directory ,mmap =False )
+        for name ,values in store .dictionaries .items ():
+            for value in values :
+                builder ._code (name ,value )
+        for name ,code in EVALUATION_COLUMNS .items ():
+            builder .evaluations [name ].frombytes (np .asarray (store .evaluations [name ],dtype =code ).tobytes ())
+        for name ,code in SESSION_COLUMNS .items ():
+            builder .sessions [name ].frombytes (np .asarray (store .sessions [name ],dtype =code ).tobytes ())
+        builder .sources =list (store .sources )
+        builder ._known_sources =set (builder .sources )
+        return builder 
+
+    def _code (self ,dictionary :str ,value :Any )->int :
+        value =" ".join (str (value or "").split ())
+        codes =self ._codes [dictionary ]
+        code =codes .get (value )
+        if code is None :
+            code =codes [value ]=len (self .dictionaries [dictionary ])
+            self .dictionaries [dictionary ].append (value )
+        return code 
+
+    def add_log (self ,data :Dict [str ,Any ],source :str ="")->bool :
+        evaluations =data .get ("evaluations")
+        summary =data .get ("summary")or {}
+        if "evaluations"not in data and "summary"not in data :
+            evaluations ,summary =_legacy_log (data )
+            if evaluations :
+                self .legacy +=1 
+        if not evaluations :
+            self ._skip ("no_evaluations")
+            return False 
+        if not summary :
+            self ._skip ("no_summary")
+            return False 
+        session =len (self .sessions ["grade"])
+        try :
+            session_row ={
+            "position":self ._code ("position",str (summary .get ("position")or "").lower ()),
+            "grade":self ._code ("grade",summary .get ("grade")),
+            "claimed_grade":self ._code ("grade",summary .get ("claimed_grade")),
+            "hire":self ._code ("hire",summary .get ("hire_recommendation")),
+            "accuracy":float (summary .get ("accuracy")or 0.0 ),
+            }
+            evaluation_rows =[
+            {
+            "session":session ,
+            "topic":self ._code ("topic",entry .get ("topic")),
+            "result":self ._code ("result",entry .get ("result")),
+            "difficulty":max (0 ,min (127 ,int (entry .get ("difficulty")or 0 ))),
+            "confidence":max (0 ,min (100 ,int (entry .get ("confidence")or 0 ))),
+            }
+            for entry in evaluations 
+            ]
+        except (TypeError ,ValueError ):
+            self ._skip ("malformed")
+            return False 
+        for name ,value in session_row .items ():
+            self .sessions [name ].append (value )
+        for row in evaluation_rows :
+            for name ,value in row .items ():
+                self .evaluations [name ].append (value )
+        self .sources .append (source )
+        if source :
+            self ._known_sources .add (source )
+        return True 
+
+    def _skip (self ,reason :str )->None :
+        self .skipped [reason ]=self .skipped .get (reason ,0 )+1 
+
+    def add_file (self ,path :str )->bool :
+        source =os .path .abspath (path )
+        if source in self ._known_sources :
+            return False 
+        try :
+            data =_read_log (path )
+        except (OSError ,ValueError ):
+            self ._skip ("unreadable")
+            return False 
+        return self .add_log (data ,source )
+
+    def save (self ,directory :str )->None :
+        np =_load_numpy ()
+        target =Path (directory )
+        target .mkdir (parents =True ,exist_ok =True )
+        for prefix ,columns in (("evaluations",self .evaluations ),("sessions",self .sessions )):
+            for name ,column in columns .items ():
+                np .save (target /f"{prefix}.{name}.npy",np .frombuffer (column ,dtype =column .typecode ))
+        meta ={
+        "evaluations":len (self .evaluations ["session"]),
+        "sessions":len (self .sessions ["grade"]),
+        "dictionaries":self .dictionaries ,
+        "sources":self .sources ,
+        }
+        tmp_path =target /(META_FILE +".tmp")
+        with open (tmp_path ,"w",encoding ="utf-8")as f :
+            json .dump (meta ,f ,ensure_ascii =False )
+        os .replace (tmp_path ,target /META_FILE )
+
+
+Filter =Any 
+
+
+class AnalyticsStore :
+
+    def __init__ (
+    self ,
+    evaluations :Dict [str ,Any ],
+    sessions :Dict [str ,Any ],
+    dictionaries :Dict [str ,List [str ]],
+    sources :Sequence [str ]=(),
+    )->None :
+        self .evaluations =evaluations 
+        self .sessions =sessions 
+        self .dictionaries =dictionaries 
+        self .sources =sources 
+
+    @classmethod 
+    def open (cls ,directory :str ,mmap :bool =True )->"AnalyticsStore":
+        np =_load_numpy ()
+        source =Path (directory )
+        with open (source /META_FILE ,"r",encoding ="utf-8")as f :
+            meta =json .load (f )
+        mode ="r"if mmap else None 
+        evaluations ={name :np .load (source /f"evaluations.{name}.npy",mmap_mode =mode )for name in EVALUATION_COLUMNS }
+        sessions ={name :np .load (source /f"sessions.{name}.npy",mmap_mode =mode )for name in SESSION_COLUMNS }
+        return cls (evaluations ,sessions ,meta ["dictionaries"],meta .get ("sources",[]))
+
+    def __len__ (self )->int :
+        return len (self .evaluations ["session"])
+
+    def column (self ,name :str )->Any :
+        if name in self .evaluations :
+            return self .evaluations [name ]
+        return self .sessions [name ][self .evaluations ["session"]]
+
+    def _cardinality (self ,name :str )->int :
+        if name in CATEGORIES :
+            return max (1 ,len (self .dictionaries [CATEGORIES [name ]]))
+        column =self .column (name )
+        return int (column .max ())+1 if len (column )else 1 
+
+    def _label (self ,name :str ,code :int )->Any :
+        if name in CATEGORIES :
+            return self .dictionaries [CATEGORIES [name ]][code ]
+        return int (code )
+
+    def _matching_codes (self ,name :str ,condition :Filter )->List [int ]:
+        if name not in CATEGORIES :
+            values =[condition ]if isinstance (condition ,int )else list (condition )
+            return [int (value )for value in values ]
+        labels =self .dictionaries [CATEGORIES [name ]]
+        if callable (condition ):
+            return [code for code ,label in enumerate (labels )if condition (label )]
+        wanted ={condition }if isinstance (condition ,str )else set (condition )
+        if name =="position":
+            wanted ={value .lower ()for value in wanted }
+        return [code for code ,label in enumerate (labels )if label in wanted ]
+
+    def mask (self ,where :Optional [Dict [str ,Filter ]]=None )->Any :
+        np =_load_numpy ()
+        selected =np .ones (len (self ),dtype =bool )
+        for name ,condition in (where or {}).items ():
+            codes =self ._matching_codes (name ,condition )
+            if name in self .sessions :
+                session_mask =np .isin (self .sessions [name ],codes )
+                selected &=session_mask [self .evaluations ["session"]]
+            else :
+                selected &=np .isin (self .evaluations [name ],codes )
+        return selected 
+
+    def _group (self ,by :Sequence [str ],selected :Any )->Tuple [Any ,Tuple [int ,...]]:
+        np =_load_numpy ()
+        shape =tuple (self ._cardinality (name )for name in by )
+        codes =[np .asarray (self .column (name )[selected ],dtype =np .int64 )for name in by ]
+        if not codes :
+            return np .zeros (int (selected .sum ()),dtype =np .int64 ),(1 ,)
+        return np .ravel_multi_index (codes ,shape ),shape 
+
+    def _rows (self ,by :Sequence [str ],keys :Iterable [int ],shape :Tuple [int ,...])->List [Dict [str ,Any ]]:
+        np =_load_numpy ()
+        keys =np .asarray (list (keys ),dtype =np .int64 )
+        if not by :
+            return [{}for _ in keys ]
+        coords =np .unravel_index (keys ,shape )
+        return [
+        {name :self ._label (name ,int (coords [axis ][row ]))for axis ,name in enumerate (by )}
+        for row in range (len (keys ))
+        ]
+
+    def counts (self ,by :Sequence [str ],where :Optional [Dict [str ,Filter ]]=None )->List [Dict [str ,Any ]]:
+        np =_load_numpy ()
+        selected =self .mask (where )
+        flat ,shape =self ._group (by ,selected )
+        totals =np .bincount (flat ,minlength =int (np .prod (shape )))
+        keys =np .flatnonzero (totals )
+        keys =keys [np .argsort (-totals [keys ],kind ="stable")]
+        rows =self ._rows (by ,keys ,shape )
+        for row ,key in zip (rows ,keys ):
+            row ["count"]=int (totals [key ])
+        return rows 
+
+    def failure_rates (
+    self ,
+    by :Sequence [str ]=("topic",),
+    where :Optional [Dict [str ,Filter ]]=None ,
+    min_count :int =1 ,
+    )->List [Dict [str ,Any ]]:
+        np =_load_numpy ()
+        scores =np .full (max (1 ,len (self .dictionaries ["result"])),np .nan )
+        for code ,label in enumerate (self .dictionaries ["result"]):
+            if label in RESULT_SCORES :
+                scores [code ]=RESULT_SCORES [label ]
+        per_row =scores [self .evaluations ["result"]]
+        selected =self .mask (where )&~np .isnan (per_row )
+        flat ,shape =self ._group (by ,selected )
+        size =int (np .prod (shape ))
+        scored =np .bincount (flat ,minlength =size )
+        earned =np .bincount (flat ,weights =per_row [selected ],minlength =size )
+        keys =np .flatnonzero (scored >=max (1 ,min_count ))
+        rates =1.0 -earned [keys ]/scored [keys ]
+        order =np .lexsort ((-scored [keys ],-rates ))
+        rows =self ._rows (by ,keys [order ],shape )
+        for row ,key ,rate in zip (rows ,keys [order ],rates [order ]):
+            row ["scored"]=int (scored [key ])
+            row ["failure_rate"]=float (rate )
+        return rows 
+
+    def session_counts (self ,by :Sequence [str ],where :Optional [Dict [str ,Filter ]]=None )->List [Dict [str ,Any ]]:
+        np =_load_numpy ()
+        unknown =[name for name in by if name not in self .sessions ]
+        if unknown :
+            raise ValueError (f"Sessions can only be grouped by session columns, not: {unknown[0]}")
+        count =len (self .sessions ["grade"])
+        selected =np .ones (count ,dtype =bool )
+        row_filters :Dict [str ,Filter ]={}
+        for name ,condition in (where or {}).items ():
+            if name in self .sessions :
+                selected &=np .isin (self .sessions [name ],self ._matching_codes (name ,condition ))
+            else :
+                row_filters [name ]=condition 
+        if row_filters :
+            rows =self .evaluations ["session"][self .mask (row_filters )]
+            selected &=np .bincount (rows ,minlength =count )[:count ]>0 
+        shape =tuple (self ._cardinality (name )for name in by )
+        flat =np .ravel_multi_index ([np .asarray (self .sessions [name ][selected ],dtype =np .int64 )for name in by ],shape )
+        totals =np .bincount (flat ,minlength =int (np .prod (shape )))
+        keys =np .flatnonzero (totals )
+        keys =keys [np .argsort (-totals [keys ],kind ="stable")]
+        rows =self ._rows (by ,keys ,shape )
+        for row ,key in zip (rows ,keys ):
+            row ["sessions"]=int (totals [key ])
+        return rows 
+
+
+def _parse_filters (args :Sequence [str ])->Tuple [List [str ],Dict [str ,Filter ]]:
+    by :List [str ]=[]
+    where :Dict [str ,Filter ]={}
+    for arg in args :
+        if "~="in arg :
+            name ,needle =arg .split ("~=",1 )
+            where [name ]=lambda label ,needle =needle .lower ():needle in label .lower ()
+        elif "="in arg :
+            name ,value =arg .split ("=",1 )
+            values =value .split (",")
+            where [name ]=values if name in CATEGORIES else [int (v )for v in values ]
+        else :
+            by .append (arg )
+    return by ,where 
+
+
+def main ()->None :
+    usage =(
+    "Usage: python -m multi_agent_interview_coach.analytics ingest <store_dir> <log> [...]\n"
+    "       python -m multi_agent_interview_coach.analytics failures|counts|sessions <store_dir> "
+    "[column ...] [column=value[,value]] [column~=substring]"
+    )
+    if len (sys .argv )<3 :
+        print (usage )
+        raise SystemExit (2 )
+    command ,directory ,args =sys .argv [1 ],sys .argv [2 ],sys .argv [3 :]
+    if command =="ingest":
+        has_store =(Path (directory )/META_FILE ).exists ()
+        builder =AnalyticsBuilder .from_store (directory )if has_store else AnalyticsBuilder ()
+        paths =[str (path )for arg in args for path in (sorted (Path (arg ).glob ("interview_*"))if Path (arg ).is_dir ()else [Path (arg )])]
+        added =sum (builder .add_file (path )for path in paths )
+        builder .save (directory )
+        print (json .dumps ({
+        "added":added ,
+        "legacy":builder .legacy ,
+        "skipped":builder .skipped ,
+        "sessions":len (builder .sessions ["grade"]),
+        }))
+        return 
+    store =AnalyticsStore .open (directory )
+    by ,where =_parse_filters (args )
+    if command =="failures":
+        rows =store .failure_rates (by or ["topic"],where )
+    elif command =="counts":
+        rows =store .counts (by or ["result"],where )
+    elif command =="sessions":
+        rows =store .session_counts (by or ["grade"],where )
+    else :
+        print (usage )
+        raise SystemExit (2 )
+    print (json .dumps (rows ,ensure_ascii =False ,indent =2 ))
+
+
+if __name__ =="__main__":
+    main ()
@@ -0,0 +1,387 @@
+from __future__ import annotations 
+
+import json 
+import os 
+import struct 
+import sys 
+import threading 
+import time 
+import zlib 
+from array import array 
+from bisect import bisect_left ,bisect_right 
+from dataclasses import dataclass 
+from datetime import datetime 
+from pathlib import Path 
+from typing import Any ,Dict ,List ,Optional ,Tuple ,Union 
+
+from .logger import _load_zstd 
+
+
+INDEX_FIELDS =("participant_name","position","grade","verdict")
+CODECS =("zlib","zstd")
+INDEX_FILE ="index.jsonl"
+
+_FRAME =struct .Struct (">I")
+
+
+def _normalize (value :Any )->str :
+    return " ".join (str (value or "").split ()).casefold ()
+
+
+def _segment_name (segment :int )->str :
+    return f"segment-{segment:06d}.seg"
+
+
+def _timestamp (value :Union [float ,str ,datetime ,None ])->Optional [float ]:
+    if value is None or isinstance (value ,(int ,float )):
+        return value 
+    if isinstance (value ,str ):
+        value =datetime .fromisoformat (value )
+    return value .timestamp ()
+
+
+@dataclass 
+class ArchiveEntry :
+    id :int 
+    participant_name :str 
+    position :str 
+    grade :str 
+    verdict :str 
+    timestamp :float 
+    segment :int 
+    offset :int 
+    length :int 
+    codec :str 
+
+
+class ArchiveIndex :
+
+    def __init__ (self )->None :
+        self .dictionaries :Dict [str ,List [str ]]={name :[]for name in INDEX_FIELDS }
+        self ._codes :Dict [str ,Dict [str ,int ]]={name :{}for name in INDEX_FIELDS }
+        self .columns ={name :array ("i")for name in INDEX_FIELDS }
+        self .timestamps =array ("d")
+        self .segments =array ("I")
+        self .offsets =array ("Q")
+        self .lengths =array ("I")
+        self .codecs =array ("b")
+        self ._sorted_keys :Dict [str ,List [str ]]={name :[]for name in INDEX_FIELDS }
+        self ._sorted_ids :Dict [str ,array ]={name :array ("I")for name in INDEX_FIELDS }
+        self ._time_keys =array ("d")
+        self ._time_ids =array ("I")
+
+    def __len__ (self )->int :
+        return len (self .timestamps )
+
+    def _code (self ,name :str ,value :str )->int :
+        codes =self ._codes [name ]
+        code =codes .get (value )
+        if code is None :
+            code =codes [value ]=len (self .dictionaries [name ])
+            self .dictionaries [name ].append (sys .intern (value ))
+        return code 
+
+    def add (self ,record :Dict [str ,Any ])->int :
+        entry_id =len (self .timestamps )
+        for name in INDEX_FIELDS :
+            code =self ._code (name ,record .get (name ,""))
+            self .columns [name ].append (code )
+            key =_normalize (self .dictionaries [name ][code ])
+            keys =self ._sorted_keys [name ]
+            position =bisect_right (keys ,key )
+            keys .insert (position ,sys .intern (key ))
+            self ._sorted_ids [name ].insert (position ,entry_id )
+        timestamp =float (record ["timestamp"])
+        self .timestamps .append (timestamp )
+        self .segments .append (record ["segment"])
+        self .offsets .append (record ["offset"])
+        self .lengths .append (record ["length"])
+        self .codecs .append (CODECS .index (record .get ("codec","zlib")))
+        position =bisect_right (self ._time_keys ,timestamp )
+        self ._time_keys .insert (position ,timestamp )
+        self ._time_ids .insert (position ,entry_id )
+        return entry_id 
+
+    def entry (self ,entry_id :int )->ArchiveEntry :
+        if not 0 <=entry_id <len (self .timestamps ):
+            raise KeyError (f"Unknown archive entry: {entry_id}")
+        labels =[self .dictionaries [name ][self .columns [name ][entry_id ]]for name in INDEX_FIELDS ]
+        return ArchiveEntry (
+        entry_id ,
+        *labels ,
+        self .timestamps [entry_id ],
+        self .segments [entry_id ],
+        self .offsets [entry_id ],
+        self .lengths [entry_id ],
+        CODECS [self .codecs [entry_id ]],
+        )
+
+    def equal_range (self ,name :str ,value :str )->Tuple [int ,int ]:
+        key =_normalize (value )
+        keys =self ._sorted_keys [name ]
+        return bisect_left (keys ,key ),bisect_right (keys ,key )
+
+    def time_range (self ,since :Optional [float ],until :Optional [float ])->Tuple [int ,int ]:
+        low =0 if since is None else bisect_left (self ._time_keys ,since )
+        high =len (self ._time_keys )if until is None else bisect_right (self ._time_keys ,until )
+        return low ,high 
+
+    def find (
+    self ,
+    since :Optional [float ]=None ,
+    until :Optional [float ]=None ,
+    limit :Optional [int ]=None ,
+    **equals :str ,
+    )->List [ArchiveEntry ]:
+        unknown =set (equals )-set (INDEX_FIELDS )
+        if unknown :
+            raise ValueError (f"Unknown archive index field: {sorted(unknown)[0]}")
+        ranges ={name :self .equal_range (name ,value )for name ,value in equals .items ()if value is not None }
+        low ,high =self .time_range (since ,until )
+        if ranges :
+            name ,(start ,stop )=min (ranges .items (),key =lambda item :item [1 ][1 ]-item [1 ][0 ])
+            candidates =self ._sorted_ids [name ][start :stop ]
+        else :
+            candidates =self ._time_ids [low :high ]
+        wanted ={name :_normalize (value )for name ,value in equals .items ()if value is not None }
+        found :List [Tuple [float ,int ]]=[]
+        for entry_id in candidates :
+            timestamp =self .timestamps [entry_id ]
+            if (since is not None and timestamp <since )or (until is not None and timestamp >until ):
+                continue 
+            if all (
+            _normalize (self .dictionaries [name ][self .columns [name ][entry_id ]])==value 
+            for name ,value in wanted .items ()
+            ):
+                found .append ((timestamp ,entry_id ))
+        found .sort ()
+        if limit is not None :
+            found =found [:limit ]
+        return [self .entry (entry_id )for _ ,entry_id in found ]
+
+    def nbytes (self )->int :
+        total =sum (sys .getsizeof (column )for column in self .columns .values ())
+        total +=sum (sys .getsizeof (keys )+sys .getsizeof (self ._sorted_ids [name ])for name ,keys in self ._sorted_keys .items ())
+        for column in (self .timestamps ,self .segments ,self .offsets ,self .lengths ,self .codecs ,self ._time_keys ,self ._time_ids ):
+            total +=sys .getsizeof (column )
+        return total 
+
+
+class InterviewArchive :
+
+    def __init__ (
+    self ,
+    directory :str ,
+    segment_bytes :int =64 *1024 *1024 ,
+    codec :str ="zlib",
+    level :int =6 ,
+    )->None :
+        if codec not in CODECS :
+            raise ValueError (f"Unsupported archive codec: {codec}")
+        self .directory =Path (directory )
+        self .segment_bytes =segment_bytes 
+        self .codec =codec 
+        self .level =level 
+        self .index =ArchiveIndex ()
+        self ._lock =threading .Lock ()
+        self ._segment =0 
+        self ._segment_size =0 
+        self .directory .mkdir (parents =True ,exist_ok =True )
+        self ._load_index ()
+
+    def __len__ (self )->int :
+        return len (self .index )
+
+    def _load_index (self )->None :
+        path =self .directory /INDEX_FILE 
+        if not path .exists ():
+            return 
+        sizes :Dict [int ,int ]={}
+        valid =0 
+        with open (path ,"rb")as f :
+            for line in f :
+                if not line .endswith (b"\n"):
+                    break 
+                try :
+                    record =json .loads (line )
+                except json .JSONDecodeError :
+                    break 
+                segment =record ["segment"]
+                if segment not in sizes :
+                    segment_path =self .directory /_segment_name (segment )
+                    sizes [segment ]=segment_path .stat ().st_size if segment_path .exists ()else 0 
+                if record ["offset"]+_FRAME .size +record ["length"]>sizes [segment ]:
+                    break 
+                self .index .add (record )
+                valid +=len (line )
+        if valid <path .stat ().st_size :
+            os .truncate (path ,valid )
+        if sizes :
+            self ._segment =max (sizes )
+            self ._segment_size =sizes [self ._segment ]
+
+    def _compress (self ,payload :bytes )->bytes :
+        if self .codec =="zstd":
+            return _load_zstd ().ZstdCompressor (level =self .level ).compress (payload )
+        return zlib .compress (payload ,self .level )
+
+    @staticmethod 
+    def _decompress (data :bytes ,codec :str )->bytes :
+        if codec =="zstd":
+            return _load_zstd ().ZstdDecompressor ().decompress (data )
+        return zlib .decompress (data )
+
+    def add (
+    self ,
+    log :Dict [str ,Any ],
+    timestamp :Union [float ,str ,datetime ,None ]=None ,
+    position :str ="",
+    grade :str ="",
+    )->ArchiveEntry :
+        summary =log .get ("summary")or {}
+        data =self ._compress (json .dumps (log ,ensure_ascii =False ,separators =(",",":")).encode ("utf-8"))
+        stamp =_timestamp (timestamp )
+        record ={
+        "participant_name":log .get ("participant_name",""),
+        "position":summary .get ("position")or position ,
+        "grade":summary .get ("grade")or grade ,
+        "verdict":summary .get ("hire_recommendation",""),
+        "timestamp":time .time ()if stamp is None else stamp ,
+        "length":len (data ),
+        "codec":self .codec ,
+        }
+        with self ._lock :
+            if self ._segment_size and self ._segment_size +_FRAME .size +len (data )>self .segment_bytes :
+                self ._segment +=1 
+                self ._segment_size =0 
+            record ["segment"]=self ._segment 
+            record ["offset"]=self ._segment_size 
+            with open (self .directory /_segment_name (self ._segment ),"ab")as f :
+                f .write (_FRAME .pack (len (data ))+data )
+                f .flush ()
+                os .fsync (f .fileno ())
+            self ._segment_size +=_FRAME .size +len (data )
+            with open (self .directory /INDEX_FILE ,"a",encoding ="utf-8")as f :
+                f .write (json .dumps (record ,ensure_ascii =False ,separators =(",",":"))+"\n")
+                f .flush ()
+                os .fsync (f .fileno ())
+            return self .index .entry (self .index .add (record ))
+
+    def add_file (self ,path :str )->ArchiveEntry :
+        if path .endswith (".json"):
+            with open (path ,"r",encoding ="utf-8")as f :
+                log =json .load (f )
+        else :
+            from .logger import TranscriptReader 
+
+            log =TranscriptReader (path ).to_dict ()
+        return self .add (log ,timestamp =os .path .getmtime (path ))
+
+    def find (
+    self ,
+    participant_name :Optional [str ]=None ,
+    position :Optional [str ]=None ,
+    grade :Optional [str ]=None ,
+    verdict :Optional [str ]=None ,
+    since :Union [float ,str ,datetime ,None ]=None ,
+    until :Union [float ,str ,datetime ,None ]=None ,
+    limit :Optional [int ]=None ,
+    )->List [ArchiveEntry ]:
+        with self ._lock :
+            return self .index .find (
+            _timestamp (since ),
+            _timestamp (until ),
+            limit ,
+            participant_name =participant_name ,
+            position =position ,
+            grade =grade ,
+            verdict =verdict ,
+            )
+
+    def read (self ,entry :Union [ArchiveEntry ,int ])->Dict [str ,Any ]:
+        if isinstance (entry ,int ):
+            with self ._lock :
+                entry =self .index .entry (entry )
+        with open (self .directory /_segment_name (entry .segment ),"rb")as f :
+            f .seek (entry .offset )
+            (length ,)=_FRAME .unpack (f .read (_FRAME .size ))
+            data =f .read (length )
+        return json .loads (self ._decompress (data ,entry .codec ).decode ("utf-8"))
+
+    def stats (self )->Dict [str ,Any ]:
+        with self ._lock :
+            return {
+            "sessions":len (self .index ),
+            "segments":self ._segment +1 if len (self .index )else 0 ,
+            "compressed_bytes":sum (self .index .lengths ),
+            "index_bytes":self .index .nbytes (),
+            }
+
+
+_ARCHIVE :Optional [InterviewArchive ]=None 
+_ARCHIVE_CONFIGURED =False 
+_ARCHIVE_LOCK =threading .Lock ()
+
+
+def configure_archive (archive :Optional [InterviewArchive ])->None :
+    global _ARCHIVE ,_ARCHIVE_CONFIGURED 
+    with _ARCHIVE_LOCK :
+        _ARCHIVE =archive 
+        _ARCHIVE_CONFIGURED =True 
+
+
+def get_archive ()->Optional [InterviewArchive ]:
+    global _ARCHIVE ,_ARCHIVE_CONFIGURED 
+    with _ARCHIVE_LOCK :
+        if not _ARCHIVE_CONFIGURED :
+            directory =os .getenv ("INTERVIEW_ARCHIVE_DIR")
+            if directory :
+                _ARCHIVE =InterviewArchive (
+                directory ,
+                segment_bytes =int (os .getenv ("INTERVIEW_ARCHIVE_SEGMENT_MB","64"))*1024 *1024 ,
+                codec =os .getenv ("INTERVIEW_ARCHIVE_CODEC","zlib"),
+                )
+            _ARCHIVE_CONFIGURED =True 
+        return _ARCHIVE 
+
+
+def _describe (entry :ArchiveEntry )->Dict [str ,Any ]:
+    return {
+    "id":entry .id ,
+    "participant_name":entry .participant_name ,
+    "position":entry .position ,
+    "grade":entry .grade ,
+    "verdict":entry .verdict ,
+    "timestamp":datetime .fromtimestamp (entry .timestamp ).isoformat (timespec ="seconds"),
+    }
+
+
+def main ()->None :
+    usage =(
+    "Usage: python -m multi_agent_interview_coach.archive add <archive_dir> <log> [...]\n"
+    "       python -m multi_agent_interview_coach.archive find <archive_dir> [field=value ...] "
+    "[since=ISO] [until=ISO] [limit=N]\n"
+    "       python -m multi_agent_interview_coach.archive show <archive_dir> <id>"
+    )
+    if len (sys .argv )<3 :
+        print (usage )
+        raise SystemExit (2 )
+    command ,archive =sys .argv [1 ],InterviewArchive (sys .argv [2 ])
+    args =sys .argv [3 :]
+    if command =="add":
+        entries =[archive .add_file (path )for path in args ]
+        print (json .dumps ([_describe (entry )for entry in entries ],ensure_ascii =False ,indent =2 ))
+    elif command =="find":
+        filters :Dict [str ,Any ]=dict (arg .split ("=",1 )for arg in args )
+        if "limit"in filters :
+            filters ["limit"]=int (filters ["limit"])
+        print (json .dumps ([_describe (entry )for entry in archive .find (**filters )],ensure_ascii =False ,indent =2 ))
+    elif command =="show"and args :
+        print (json .dumps (archive .read (int (args [0 ])),ensure_ascii =False ,indent =2 ))
+    else :
+        print (usage )
+        raise SystemExit (2 )
+
+
+if __name__ =="__main__":
+    main ()
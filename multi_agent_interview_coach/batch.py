@@ -0,0 +1,268 @@
+from __future__ import annotations 
+
+import asyncio 
+import csv 
+import json 
+import os 
+import sys 
+from collections import deque 
+from concurrent .futures import ProcessPoolExecutor 
+from typing import Any ,Deque ,Dict ,Iterator ,List ,Optional ,Set ,Tuple 
+
+from .agents import ObserverAgent ,acall_llm 
+from .metrics import inc 
+from .prompts import SYSTEM_PROMPTS 
+from .ratelimit import llm_priority 
+from .resilience import LLMResponseError ,LLMUnavailableError 
+
+
+REQUIRED_FIELDS =("question","answer","candidate_answer")
+OUTPUT_FIELDS =("result","reason","confidence")
+
+
+def read_rows (path :str )->Iterator [Dict [str ,Any ]]:
+    with open (path ,"r",encoding ="utf-8",newline ="")as f :
+        if path .endswith (".csv"):
+            rows :Iterator [Dict [str ,Any ]]=csv .DictReader (f )
+        else :
+            rows =(json .loads (line )for line in f if line .strip ())
+        for number ,row in enumerate (rows ,1 ):
+            missing =[name for name in REQUIRED_FIELDS if row .get (name )is None ]
+            if missing :
+                raise ValueError (f"Row {number} is missing field: {missing[0]}")
+            row =dict (row )
+            row ["id"]=str (row .get ("id")or number )
+            yield row 
+
+
+def completed_ids (path :str )->Set [str ]:
+    done :Set [str ]=set ()
+    if not os .path .exists (path ):
+        return done 
+    valid =0 
+    with open (path ,"rb")as f :
+        for line in f :
+            if not line .endswith (b"\n"):
+                break 
+            try :
+                done .add (str (json .loads (line )["id"]))
+            except (json .JSONDecodeError ,KeyError ):
+                break 
+            valid +=len (line )
+    if valid <os .path .getsize (path ):
+        os .truncate (path ,valid )
+    return done 
+
+
+def _question (row :Dict [str ,Any ])->Dict [str ,Any ]:
+    return {"question":row ["question"],"answer":row ["answer"],"topic":row .get ("topic")or "не указано"}
+
+
+_WORKER_OBSERVER :Optional [ObserverAgent ]=None 
+
+
+def _precheck (rows :List [Dict [str ,Any ]])->List [Optional [Dict [str ,Any ]]]:
+    global _WORKER_OBSERVER 
+    if _WORKER_OBSERVER is None :
+        _WORKER_OBSERVER =ObserverAgent ()
+    return [_WORKER_OBSERVER ._local_evaluation (_question (row ),row ["candidate_answer"])for row in rows ]
+
+
+class BatchGrader :
+
+    def __init__ (
+    self ,
+    workers :Optional [int ]=None ,
+    concurrency :int =8 ,
+    pack_size :int =1 ,
+    chunk_size :int =256 ,
+    position :Optional [str ]=None ,
+    )->None :
+        self .workers =(os .cpu_count ()or 1 )if workers is None else workers 
+        self .concurrency =max (1 ,concurrency )
+        self .pack_size =max (1 ,pack_size )
+        self .chunk_size =max (1 ,chunk_size )
+        self .position =position 
+        self .observer =ObserverAgent (position =position )
+        self .stats :Dict [str ,int ]={"rows":0 ,"skipped":0 ,"local":0 ,"llm":0 ,"degraded":0 }
+
+    def _write (self ,out :Any ,row :Dict [str ,Any ],evaluation :Dict [str ,Any ],source :str )->None :
+        record ={"id":row ["id"],**{name :evaluation .get (name )for name in OUTPUT_FIELDS },"source":source }
+        out .write (json .dumps (record ,ensure_ascii =False )+"\n")
+        out .flush ()
+        self .stats [source ]+=1 
+        inc ("batch_rows_total",source =source )
+
+    def _position_line (self ,row :Dict [str ,Any ])->str :
+        return f"Позиция: {row.get('position') or self.position or 'не указано'}"
+
+    async def _grade_one (self ,row :Dict [str ,Any ])->Tuple [Dict [str ,Any ],str ]:
+        question =_question (row )
+        lines =[self ._position_line (row )]+ObserverAgent ._evaluation_lines (question ,row ["candidate_answer"])
+        messages =[{"role":"user","content":"\n".join (lines )+"\n"}]
+        try :
+            data =await self .observer ._agrade_with_cascade (SYSTEM_PROMPTS ["evaluation"],messages )
+        except LLMUnavailableError :
+            return self .observer ._degraded_evaluation (question ,row ["candidate_answer"]),"degraded"
+        except Exception :
+            inc ("batch_row_errors_total")
+            return self .observer ._degraded_evaluation (question ,row ["candidate_answer"]),"degraded"
+        return self .observer ._evaluation_from_data (question ,row ["candidate_answer"],data ),"llm"
+
+    async def _grade_pack (self ,rows :List [Dict [str ,Any ]])->List [Tuple [Dict [str ,Any ],str ]]:
+        lines :List [str ]=[]
+        for number ,row in enumerate (rows ,1 ):
+            lines .append (f"#{number}. {self._position_line(row)}")
+            lines +=ObserverAgent ._evaluation_lines (_question (row ),row ["candidate_answer"])
+        messages =[{"role":"user","content":"\n".join (lines )+"\n"}]
+        try :
+            raw =await acall_llm (SYSTEM_PROMPTS ["batch_evaluation"],messages ,temperature =0 ,kind ="evaluation")
+            grades ={
+            int (grade ["id"]):grade 
+            for grade in ObserverAgent ._parse_llm_json (raw ).get ("grades",[])
+            if "result"in grade 
+            }
+        except LLMUnavailableError :
+            return [
+            (self .observer ._degraded_evaluation (_question (row ),row ["candidate_answer"]),"degraded")
+            for row in rows 
+            ]
+        except (LLMResponseError ,ValueError ,TypeError ,KeyError ,AttributeError ):
+            grades ={}
+        results =[]
+        for number ,row in enumerate (rows ,1 ):
+            if number in grades :
+                evaluation =self .observer ._evaluation_from_data (_question (row ),row ["candidate_answer"],grades [number ])
+                results .append ((evaluation ,"llm"))
+            else :
+                inc ("batch_pack_fallbacks_total")
+                results .append (await self ._grade_one (row ))
+        return results 
+
+    async def _consume (self ,queue :asyncio .Queue ,out :Any )->None :
+        while True :
+            row =await queue .get ()
+            if row is None :
+                return 
+            rows =[row ]
+            while len (rows )<self .pack_size and not queue .empty ():
+                row =queue .get_nowait ()
+                if row is None :
+                    queue .put_nowait (None )
+                    break 
+                rows .append (row )
+            if len (rows )==1 :
+                results =[await self ._grade_one (rows [0 ])]
+            else :
+                results =await self ._grade_pack (rows )
+            for row ,(evaluation ,source )in zip (rows ,results ):
+                self ._write (out ,row ,evaluation ,source )
+
+    def _chunks (self ,rows :Iterator [Dict [str ,Any ]],done :Set [str ])->Iterator [List [Dict [str ,Any ]]]:
+        chunk :List [Dict [str ,Any ]]=[]
+        for row in rows :
+            self .stats ["rows"]+=1 
+            if row ["id"]in done :
+                self .stats ["skipped"]+=1 
+                continue 
+            chunk .append (row )
+            if len (chunk )>=self .chunk_size :
+                yield chunk 
+                chunk =[]
+        if chunk :
+            yield chunk 
+
+    async def _dispatch (
+    self ,
+    chunk :List [Dict [str ,Any ]],
+    prechecked :"asyncio.Future[List[Optional[Dict[str, Any]]]]",
+    queue :asyncio .Queue ,
+    out :Any ,
+    )->None :
+        for row ,local in zip (chunk ,await prechecked ):
+            if local is not None :
+                self ._write (out ,row ,local ,"local")
+            else :
+                await queue .put (row )
+
+    async def arun (self ,input_path :str ,output_path :str )->Dict [str ,int ]:
+        done =completed_ids (output_path )
+        loop =asyncio .get_running_loop ()
+        pool =ProcessPoolExecutor (max_workers =self .workers )if self .workers >0 else None 
+        queue :asyncio .Queue =asyncio .Queue (maxsize =self .concurrency *self .pack_size *2 )
+
+        async def precheck (chunk :List [Dict [str ,Any ]])->List [Optional [Dict [str ,Any ]]]:
+            if pool is None :
+                return _precheck (chunk )
+            return await loop .run_in_executor (pool ,_precheck ,chunk )
+
+        pending :Deque [Tuple [List [Dict [str ,Any ]],Any ]]=deque ()
+
+        async def produce (out :Any ,consumers :List [asyncio .Future ])->None :
+            for chunk in self ._chunks (read_rows (input_path ),done ):
+                pending .append ((chunk ,asyncio .ensure_future (precheck (chunk ))))
+                if len (pending )>max (1 ,self .workers ):
+                    await self ._dispatch (*pending .popleft (),queue ,out )
+            while pending :
+                await self ._dispatch (*pending .popleft (),queue ,out )
+            for _ in consumers :
+                await queue .put (None )
+
+        with llm_priority ("batch"),open (output_path ,"a",encoding ="utf-8")as out :
+            consumers =[asyncio .ensure_future (self ._consume (queue ,out ))for _ in range (self .concurrency )]
+            tasks =[asyncio .ensure_future (produce (out ,consumers ))]+consumers 
+            try :
+                finished ,_ =await asyncio .wait (tasks ,return_when =asyncio .FIRST_EXCEPTION )
+                for task in finished :
+                    if task .exception ()is not None :
+                        raise task .exception ()
+            finally :
+                for task in tasks :
+                    task .cancel ()
+                for _ ,task in pending :
+                    task .cancel ()
+                if pool is not None :
+                    pool .shutdown (wait =False )
+        return dict (self .stats )
+
+    def run (self ,input_path :str ,output_path :str )->Dict [str ,int ]:
+        return asyncio .run (self .arun (input_path ,output_path ))
+
+
+def make_batch_grader (**overrides :Any )->BatchGrader :
+    options :Dict [str ,Any ]={
+    "workers":int (os .getenv ("INTERVIEW_BATCH_WORKERS",str (os .cpu_count ()or 1 ))),
+    "concurrency":int (os .getenv ("INTERVIEW_BATCH_CONCURRENCY","8")),
+    "pack_size":int (os .getenv ("INTERVIEW_BATCH_PACK","1")),
+    "chunk_size":int (os .getenv ("INTERVIEW_BATCH_CHUNK","256")),
+    "position":os .getenv ("INTERVIEW_BATCH_POSITION")or None ,
+    }
+    options .update (overrides )
+    return BatchGrader (**options )
+
+
+def main ()->None :
+    usage =(
+    "Usage: python -m multi_agent_interview_coach.batch <input.csv|input.jsonl> <output.jsonl> "
+    "[workers=N] [concurrency=N] [pack=N] [chunk=N] [position=...]"
+    )
+    if len (sys .argv )<3 :
+        print (usage )
+        raise SystemExit (2 )
+    names ={"workers":"workers","concurrency":"concurrency","pack":"pack_size","chunk":"chunk_size"}
+    overrides :Dict [str ,Any ]={}
+    for arg in sys .argv [3 :]:
+        key ,_ ,value =arg .partition ("=")
+        if key =="position":
+            overrides ["position"]=value 
+        elif key in names :
+            overrides [names [key ]]=int (value )
+        else :
+            print (usage )
+            raise SystemExit (2 )
+    stats =make_batch_grader (**overrides ).run (sys .argv [1 ],sys .argv [2 ])
+    print (json .dumps (stats ,ensure_ascii =False ))
+
+
+if __name__ =="__main__":
+    main ()
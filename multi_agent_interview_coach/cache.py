@@ -0,0 +1,141 @@
+from __future__ import annotations 
+
+import hashlib 
+import json 
+import os 
+import sqlite3 
+import threading 
+import time 
+from collections import OrderedDict 
+from typing import Any ,Dict ,List ,Optional ,Tuple 
+
+
+class ResponseCache :
+
+    def __init__ (
+    self ,
+    max_entries :int =512 ,
+    ttl_seconds :float =3600.0 ,
+    path :Optional [str ]=None ,
+    )->None :
+        self .max_entries =max (1 ,int (max_entries ))
+        self .ttl_seconds =float (ttl_seconds )
+        self .path =path 
+        self ._entries :OrderedDict [str ,Tuple [float ,str ]]=OrderedDict ()
+        self ._lock =threading .Lock ()
+        self .hits =0 
+        self .disk_hits =0 
+        self .misses =0 
+        self .evictions =0 
+        self ._db :Optional [sqlite3 .Connection ]=None 
+        if path :
+            self ._db =sqlite3 .connect (path ,check_same_thread =False )
+            self ._db .execute (
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self ._db .execute ("DELETE FROM responses WHERE created < ?",(time .time ()-self .ttl_seconds ,))
+            self ._db .commit ()
+
+    @staticmethod 
+    def make_key (
+    model :str ,
+    system_prompt :str ,
+    messages :List [Dict [str ,str ]],
+    temperature :float ,
+    )->str :
+        payload =json .dumps (
+        [model ,system_prompt ,messages ,float (temperature )],
+        ensure_ascii =False ,
+        sort_keys =True ,
+        )
+        return hashlib .sha256 (payload .encode ("utf-8")).hexdigest ()
+
+    def _expired (self ,created :float ,now :float )->bool :
+        return now -created >self .ttl_seconds 
+
+    def get (self ,key :str )->Optional [str ]:
+        now =time .time ()
+        with self ._lock :
+            entry =self ._entries .get (key )
+            if entry is not None :
+                if not self ._expired (entry [0 ],now ):
+                    self ._entries .move_to_end (key )
+                    self .hits +=1 
+                    return entry [1 ]
+                del self ._entries [key ]
+            if self ._db is not None :
+                row =self ._db .execute (
+                "SELECT value, created FROM responses WHERE key = ?",(key ,)
+                ).fetchone ()
+                if row is not None and not self ._expired (row [1 ],now ):
+                    self ._store (key ,row [1 ],row [0 ])
+                    self .hits +=1 
+                    self .disk_hits +=1 
+                    return row [0 ]
+            self .misses +=1 
+            return None 
+
+    def put (self ,key :str ,value :str )->None :
+        now =time .time ()
+        with self ._lock :
+            self ._store (key ,now ,value )
+            if self ._db is not None :
+                self ._db .execute (
+                "INSERT OR REPLACE INTO responses (key, value, created) VALUES (?, ?, ?)",
+                (key ,value ,now ),
+                )
+                self ._db .commit ()
+
+    def _store (self ,key :str ,created :float ,value :str )->None :
+        self ._entries [key ]=(created ,value )
+        self ._entries .move_to_end (key )
+        while len (self ._entries )>self .max_entries :
+            self ._entries .popitem (last =False )
+            self .evictions +=1 
+
+    def clear (self )->None :
+        with self ._lock :
+            self ._entries .clear ()
+            if self ._db is not None :
+                self ._db .execute ("DELETE FROM responses")
+                self ._db .commit ()
+
+    def stats (self )->Dict [str ,Any ]:
+        with self ._lock :
+            lookups =self .hits +self .misses 
+            return {
+            "entries":len (self ._entries ),
+            "hits":self .hits ,
+            "disk_hits":self .disk_hits ,
+            "misses":self .misses ,
+            "evictions":self .evictions ,
+            "hit_rate":self .hits /lookups if lookups else 0.0 ,
+            }
+
+
+_RESPONSE_CACHE :Optional [ResponseCache ]=None 
+_CACHE_CONFIGURED =False 
+_CACHE_LOCK =threading .Lock ()
+
+
+def configure_response_cache (cache :Optional [ResponseCache ])->None :
+    global _RESPONSE_CACHE ,_CACHE_CONFIGURED 
+    with _CACHE_LOCK :
+        _RESPONSE_CACHE =cache 
+        _CACHE_CONFIGURED =True 
+
+
+def get_response_cache ()->Optional [ResponseCache ]:
+    global _RESPONSE_CACHE ,_CACHE_CONFIGURED 
+    with _CACHE_LOCK :
+        if not _CACHE_CONFIGURED :
+            size =int (os .getenv ("LLM_CACHE_SIZE","512"))
+            if size >0 :
+                _RESPONSE_CACHE =ResponseCache (
+                max_entries =size ,
+                ttl_seconds =float (os .getenv ("LLM_CACHE_TTL","3600")),
+                path =os .getenv ("LLM_CACHE_PATH")or None ,
+                )
+            _CACHE_CONFIGURED =True 
+        return _RESPONSE_CACHE 
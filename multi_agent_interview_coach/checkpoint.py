@@ -0,0 +1,104 @@
+from __future__ import annotations 
+
+import json 
+import os 
+import tempfile 
+import threading 
+from pathlib import Path 
+from typing import Any ,Dict ,List ,Optional 
+
+
+APPEND_ONLY_KEYS =("evaluations","log_turns","questions_asked")
+
+
+def _dumps (record :Dict [str ,Any ])->str :
+    return json .dumps (record ,ensure_ascii =False ,separators =(",",":"))
+
+
+class SessionCheckpointer :
+
+    def __init__ (self ,path :str ,compact_every :int =32 )->None :
+        self .path =path 
+        self .compact_every =compact_every 
+        self ._written :Dict [str ,int ]={}
+        self ._records =0 
+        self ._lock =threading .Lock ()
+
+    def save (self ,state :Dict [str ,Any ])->None :
+        with self ._lock :
+            shrunk =any (len (state .get (key ,[]))<self ._written .get (key ,0 )for key in APPEND_ONLY_KEYS )
+            if not self ._written or shrunk or self ._records >=self .compact_every :
+                self ._rewrite (state )
+            else :
+                self ._append (state )
+
+    def _record (self ,state :Dict [str ,Any ],full :bool )->Dict [str ,Any ]:
+        record ={key :value for key ,value in state .items ()if key not in APPEND_ONLY_KEYS }
+        record ["full"]=full 
+        for key in APPEND_ONLY_KEYS :
+            items =state .get (key ,[])
+            record [key ]=items if full else items [self ._written .get (key ,0 ):]
+        return record 
+
+    def _mark_written (self ,state :Dict [str ,Any ])->None :
+        for key in APPEND_ONLY_KEYS :
+            self ._written [key ]=len (state .get (key ,[]))
+
+    def _rewrite (self ,state :Dict [str ,Any ])->None :
+        target =Path (self .path )
+        target .parent .mkdir (parents =True ,exist_ok =True )
+        fd ,tmp_path =tempfile .mkstemp (prefix =target .name +".",suffix =".tmp",dir =str (target .parent ))
+        try :
+            with os .fdopen (fd ,"w",encoding ="utf-8")as f :
+                f .write (_dumps (self ._record (state ,True ))+"\n")
+                f .flush ()
+                os .fsync (f .fileno ())
+            os .replace (tmp_path ,target )
+        except BaseException :
+            if os .path .exists (tmp_path ):
+                os .unlink (tmp_path )
+            raise 
+        self ._mark_written (state )
+        self ._records =1 
+
+    def _append (self ,state :Dict [str ,Any ])->None :
+        with open (self .path ,"a",encoding ="utf-8")as f :
+            f .write (_dumps (self ._record (state ,False ))+"\n")
+            f .flush ()
+            os .fsync (f .fileno ())
+        self ._mark_written (state )
+        self ._records +=1 
+
+    def discard (self )->None :
+        with self ._lock :
+            if os .path .exists (self .path ):
+                os .unlink (self .path )
+            self ._written ={}
+            self ._records =0 
+
+
+def load_checkpoint (path :str )->Optional [Dict [str ,Any ]]:
+    if not os .path .exists (path ):
+        return None 
+    state :Optional [Dict [str ,Any ]]=None 
+    lists :Dict [str ,List [Any ]]={key :[]for key in APPEND_ONLY_KEYS }
+    with open (path ,"r",encoding ="utf-8")as f :
+        for line in f :
+            line =line .strip ()
+            if not line :
+                continue 
+            try :
+                record =json .loads (line )
+            except json .JSONDecodeError :
+                break 
+            if record .pop ("full",False ):
+                lists ={key :[]for key in APPEND_ONLY_KEYS }
+            elif state is None :
+                continue 
+            for key in APPEND_ONLY_KEYS :
+                lists [key ].extend (record .pop (key ,[]))
+            state =record 
+    if state is None :
+        return None 
+    state .update (lists )
+    return state 
@@ -0,0 +1,145 @@
+from __future__ import annotations 
+
+import os 
+import random 
+import re 
+import sys 
+import threading 
+import zlib 
+from collections import deque 
+from typing import Any ,Deque ,Dict ,FrozenSet ,List ,Optional ,Tuple 
+
+
+_WORD_RE =re .compile (r"\w+",re .UNICODE )
+_MERSENNE =(1 <<61 )-1 
+
+
+def shingles (text :str ,size :int =2 )->FrozenSet [int ]:
+    stems =[word [:5 ]for word in _WORD_RE .findall (text .lower ())]
+    if len (stems )<size :
+        grams =[" ".join (stems )]if stems else []
+    else :
+        grams =[" ".join (stems [i :i +size ])for i in range (len (stems )-size +1 )]
+    return frozenset (zlib .crc32 (gram .encode ("utf-8"))for gram in grams )
+
+
+class QuestionIndex :
+
+    def __init__ (
+    self ,
+    threshold :float =0.5 ,
+    num_perm :int =32 ,
+    band_rows :int =2 ,
+    max_entries :Optional [int ]=None ,
+    seed :int =1 ,
+    )->None :
+        rng =random .Random (seed )
+        self .threshold =threshold 
+        self .band_rows =band_rows 
+        self .max_entries =max_entries 
+        self ._perms =[(rng .randrange (1 ,_MERSENNE ),rng .randrange (0 ,_MERSENNE ))for _ in range (num_perm )]
+        self ._bands :List [Dict [int ,List [int ]]]=[{}for _ in range (num_perm //band_rows )]
+        self ._entries :Dict [int ,Tuple [str ,FrozenSet [int ],Tuple [int ,...]]]={}
+        self ._order :Deque [int ]=deque ()
+        self ._next_id =0 
+        self ._lock =threading .Lock ()
+        self .lookups =0 
+        self .repeats =0 
+
+    def __len__ (self )->int :
+        return len (self ._entries )
+
+    def _band_keys (self ,grams :FrozenSet [int ])->Tuple [int ,...]:
+        signature =[min ((a *gram +b )%_MERSENNE for gram in grams )for a ,b in self ._perms ]
+        rows =self .band_rows 
+        return tuple (hash (tuple (signature [i :i +rows ]))for i in range (0 ,len (self ._bands )*rows ,rows ))
+
+    def find (self ,text :str )->Optional [str ]:
+        grams =shingles (text )
+        if not grams :
+            return None 
+        keys =self ._band_keys (grams )
+        with self ._lock :
+            self .lookups +=1 
+            candidates =set ()
+            for band ,key in zip (self ._bands ,keys ):
+                candidates .update (band .get (key ,()))
+            for entry_id in candidates :
+                known ,known_grams ,_ =self ._entries [entry_id ]
+                if len (grams &known_grams )>=self .threshold *len (grams |known_grams ):
+                    self .repeats +=1 
+                    return known 
+        return None 
+
+    def add (self ,text :str )->None :
+        grams =shingles (text )
+        if not grams :
+            return 
+        keys =self ._band_keys (grams )
+        with self ._lock :
+            entry_id =self ._next_id 
+            self ._next_id +=1 
+            self ._entries [entry_id ]=(text ,grams ,keys )
+            self ._order .append (entry_id )
+            for band ,key in zip (self ._bands ,keys ):
+                band .setdefault (key ,[]).append (entry_id )
+            if self .max_entries is not None :
+                while len (self ._order )>self .max_entries :
+                    self ._remove (self ._order .popleft ())
+
+    def _remove (self ,entry_id :int )->None :
+        _ ,_ ,keys =self ._entries .pop (entry_id )
+        for band ,key in zip (self ._bands ,keys ):
+            bucket =band [key ]
+            bucket .remove (entry_id )
+            if not bucket :
+                del band [key ]
+
+    def clear (self )->None :
+        with self ._lock :
+            self ._entries .clear ()
+            self ._order .clear ()
+            for band in self ._bands :
+                band .clear ()
+
+    def nbytes (self )->int :
+        with self ._lock :
+            total =sys .getsizeof (self ._entries )+sys .getsizeof (self ._order )
+            for _ ,grams ,keys in self ._entries .values ():
+                total +=sys .getsizeof (grams )+sys .getsizeof (keys )
+            for band in self ._bands :
+                total +=sys .getsizeof (band )+sum (sys .getsizeof (bucket )for bucket in band .values ())
+            return total 
+
+    def stats (self )->Dict [str ,Any ]:
+        with self ._lock :
+            return {
+            "entries":len (self ._entries ),
+            "lookups":self .lookups ,
+            "repeats":self .repeats ,
+            "threshold":self .threshold ,
+            }
+
+
+def make_question_index ()->Optional [QuestionIndex ]:
+    if os .getenv ("INTERVIEW_DEDUP","1")=="0":
+        return None 
+    return QuestionIndex (threshold =float (os .getenv ("INTERVIEW_DEDUP_THRESHOLD","0.5")))
+
+
+_SHARED_INDEXES :Dict [str ,QuestionIndex ]={}
+_SHARED_LOCK =threading .Lock ()
+
+
+def get_shared_question_index (position :str )->Optional [QuestionIndex ]:
+    if os .getenv ("INTERVIEW_DEDUP_SHARED","0")!="1":
+        return None 
+    key =" ".join (position .lower ().split ())or "не указано"
+    with _SHARED_LOCK :
+        index =_SHARED_INDEXES .get (key )
+        if index is None :
+            index =_SHARED_INDEXES [key ]=QuestionIndex (
+            threshold =float (os .getenv ("INTERVIEW_DEDUP_THRESHOLD","0.5")),
+            max_entries =int (os .getenv ("INTERVIEW_DEDUP_SHARED_SIZE","5000")),
+            )
+        return index 
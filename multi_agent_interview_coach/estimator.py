@@ -0,0 +1,159 @@
+from __future__ import annotations 
+
+import math 
+import os 
+from typing import Any ,Dict ,Optional ,Tuple ,Type 
+
+
+LEVELS :Dict [int ,float ]={1 :-1.0 ,2 :0.0 ,3 :1.0 }
+GRADE_BANDS :Tuple [Tuple [str ,float ,float ],...]=(
+("Junior",-math .inf ,-0.5 ),
+("Middle",-0.5 ,0.5 ),
+("Senior",0.5 ,math .inf ),
+)
+RESULT_SCORES :Dict [str ,float ]={"correct":1.0 ,"partial":0.5 ,"incorrect":0.0 }
+
+
+def _sigmoid (x :float )->float :
+    return 1.0 /(1.0 +math .exp (-x ))
+
+
+def _normal_cdf (x :float ,mean :float ,sd :float )->float :
+    if math .isinf (x ):
+        return 1.0 if x >0 else 0.0 
+    return 0.5 *(1.0 +math .erf ((x -mean )/(sd *math .sqrt (2.0 ))))
+
+
+class AbilityEstimator :
+
+    def __init__ (
+    self ,
+    prior_sd :float =1.0 ,
+    stop_confidence :float =0.9 ,
+    min_questions :int =3 ,
+    max_questions :Optional [int ]=None ,
+    levels :Optional [Dict [int ,float ]]=None ,
+    )->None :
+        self .prior_sd =prior_sd 
+        self .stop_confidence =stop_confidence 
+        self .min_questions =min_questions 
+        self .max_questions =max_questions 
+        self .levels =levels or LEVELS 
+        self .theta :Optional [float ]=None 
+        self .variance =prior_sd *prior_sd 
+        self .observations =0 
+
+    def _level (self ,difficulty :Any )->Optional [int ]:
+        try :
+            level =int (difficulty )
+        except (TypeError ,ValueError ):
+            return None 
+        return level if level in self .levels else None 
+
+    def _posterior (self ,difficulty :Any ,result :Optional [str ])->Optional [Tuple [float ,float ]]:
+        score =RESULT_SCORES .get (result or "")
+        level =self ._level (difficulty )
+        if score is None or level is None :
+            return None 
+        b =self .levels [level ]
+        theta =b if self .theta is None else self .theta 
+        p =_sigmoid (theta -b )
+        variance =1.0 /(1.0 /self .variance +p *(1.0 -p ))
+        return theta +self ._step (variance )*(score -p ),variance 
+
+    def _step (self ,variance :float )->float :
+        return variance 
+
+    def best_difficulty (self ,theta :float )->int :
+        return max (
+        self .levels ,
+        key =lambda level :(_sigmoid (theta -self .levels [level ])*(1.0 -_sigmoid (theta -self .levels [level ])),-level ),
+        )
+
+    def next_difficulty (self ,difficulty :Any ,result :Optional [str ])->int :
+        posterior =self ._posterior (difficulty ,result )
+        if posterior is None :
+            if self .theta is None :
+                return self ._level (difficulty )or min (self .levels )
+            return self .best_difficulty (self .theta )
+        return self .best_difficulty (posterior [0 ])
+
+    def update (self ,difficulty :Any ,result :Optional [str ])->None :
+        posterior =self ._posterior (difficulty ,result )
+        if posterior is None :
+            return 
+        self .theta ,self .variance =posterior 
+        self .observations +=1 
+
+    def grade (self )->Tuple [str ,float ]:
+        if self .theta is None :
+            return "",0.0 
+        sd =math .sqrt (self .variance )
+        for name ,low ,high in GRADE_BANDS :
+            if low <=self .theta <high :
+                return name ,_normal_cdf (high ,self .theta ,sd )-_normal_cdf (low ,self .theta ,sd )
+        return "",0.0 
+
+    def hire_recommendation (self ,target_grade :str )->str :
+        grade ,_ =self .grade ()
+        names =[name .lower ()for name ,_ ,_ in GRADE_BANDS ]
+        if grade .lower ()not in names :
+            return "No Hire"
+        target_name =target_grade .strip ().lower ()
+        target =names .index (target_name )if target_name in names else 0 
+        rank =names .index (grade .lower ())
+        if rank >target :
+            return "Strong Hire"
+        return "Hire"if rank ==target else "No Hire"
+
+    def should_stop (self )->bool :
+        if self .observations <self .min_questions :
+            return False 
+        if self .max_questions is not None and self .observations >=self .max_questions :
+            return True 
+        return self .grade ()[1 ]>=self .stop_confidence 
+
+    def stats (self )->Dict [str ,Any ]:
+        grade ,probability =self .grade ()
+        return {
+        "theta":self .theta ,
+        "sd":math .sqrt (self .variance ),
+        "observations":self .observations ,
+        "grade":grade ,
+        "grade_probability":probability ,
+        }
+
+    def snapshot (self )->Dict [str ,Any ]:
+        return {"theta":self .theta ,"variance":self .variance ,"observations":self .observations }
+
+    def restore (self ,state :Dict [str ,Any ])->None :
+        self .theta =state .get ("theta")
+        self .variance =state .get ("variance",self .prior_sd *self .prior_sd )
+        self .observations =state .get ("observations",0 )
+
+
+class EloEstimator (AbilityEstimator ):
+
+    def __init__ (self ,k_factor :float =0.4 ,**kwargs :Any )->None :
+        super ().__init__ (**kwargs )
+        self .k_factor =k_factor 
+
+    def _step (self ,variance :float )->float :
+        return self .k_factor 
+
+
+ESTIMATORS :Dict [str ,Type [AbilityEstimator ]]={"irt":AbilityEstimator ,"elo":EloEstimator }
+
+
+def make_estimator (name :str )->Optional [AbilityEstimator ]:
+    name =name .strip ().lower ()
+    if not name or name =="parity":
+        return None 
+    if name not in ESTIMATORS :
+        raise ValueError (f"Unknown difficulty estimator: {name}")
+    max_questions =os .getenv ("INTERVIEW_MAX_QUESTIONS")
+    return ESTIMATORS [name ](
+    stop_confidence =float (os .getenv ("INTERVIEW_STOP_CONFIDENCE","0.9")),
+    min_questions =int (os .getenv ("INTERVIEW_MIN_QUESTIONS","3")),
+    max_questions =int (max_questions )if max_questions else None ,
+    )
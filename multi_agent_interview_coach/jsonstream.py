@@ -0,0 +1,87 @@
+from __future__ import annotations 
+
+import json 
+from typing import Any ,Dict ,List ,Optional ,Tuple 
+
+
+class IncrementalJSONParser :
+
+    def __init__ (self )->None :
+        self ._depth =0 
+        self ._in_string =False 
+        self ._escape =False 
+        self ._buffer :List [str ]=[]
+        self ._key :Optional [str ]=None 
+        self ._expect_value =False 
+        self ._scalar :List [str ]=[]
+        self .fields :Dict [str ,Any ]={}
+
+    def feed (self ,chunk :str )->List [Tuple [str ,Any ]]:
+        completed :List [Tuple [str ,Any ]]=[]
+        for ch in chunk :
+            if self ._in_string :
+                if self ._depth ==1 :
+                    self ._buffer .append (ch )
+                if self ._escape :
+                    self ._escape =False 
+                elif ch =="\\":
+                    self ._escape =True 
+                elif ch =='"':
+                    self ._in_string =False 
+                    if self ._depth ==1 :
+                        self ._finish_string (completed )
+                continue 
+
+            if ch =='"':
+                self ._in_string =True 
+                if self ._depth ==1 :
+                    self ._buffer =[]
+                continue 
+            if ch in "{[":
+                if self ._depth ==1 and self ._expect_value :
+                    self ._expect_value =False 
+                    self ._key =None 
+                self ._depth +=1 
+                continue 
+            if ch in "}]":
+                if self ._depth ==1 :
+                    self ._finish_scalar (completed )
+                self ._depth =max (0 ,self ._depth -1 )
+                continue 
+            if self ._depth !=1 :
+                continue 
+            if ch ==":":
+                self ._expect_value =True 
+                self ._scalar =[]
+            elif ch ==",":
+                self ._finish_scalar (completed )
+            elif self ._expect_value and not ch .isspace ():
+                self ._scalar .append (ch )
+        return completed 
+
+    def _finish_string (self ,completed :List [Tuple [str ,Any ]])->None :
+        raw ='"'+"".join (self ._buffer )
+        try :
+            text =json .loads (raw )
+        except ValueError :
+            text =raw [1 :-1 ]
+        if self ._expect_value and self ._key is not None :
+            self ._emit (self ._key ,text ,completed )
+        else :
+            self ._key =text 
+
+    def _finish_scalar (self ,completed :List [Tuple [str ,Any ]])->None :
+        if self ._expect_value and self ._key is not None and self ._scalar :
+            token ="".join (self ._scalar )
+            try :
+                value =json .loads (token )
+            except ValueError :
+                value =token 
+            self ._emit (self ._key ,value ,completed )
+        self ._scalar =[]
+
+    def _emit (self ,key :str ,value :Any ,completed :List [Tuple [str ,Any ]])->None :
+        self .fields [key ]=value 
+        completed .append ((key ,value ))
+        self ._key =None 
+        self ._expect_value =False 
@@ -1,11 +1,218 @@
 from __future__ import annotations 
 from dataclasses import dataclass ,field 
-from typing import List ,Dict ,Any 
+from typing import List ,Dict ,Any ,Iterator ,Optional ,IO 
+from datetime import datetime 
+from pathlib import Path 
+import gzip 
+import importlib 
 import json 
+import os 
+import re 
+import threading 
+import time 
+import uuid 
+import zlib 
+
+from .turn_store import ColumnView ,TurnStore 
+
+COMPRESSION_SUFFIXES ={None :".jsonl","gzip":".jsonl.gz","zstd":".jsonl.zst"}
+
+
+def _load_zstd ():
+    try :
+        return importlib .import_module ("zstandard")
+    except ImportError :
+        raise RuntimeError (
+        "Package 'zstandard' is not installed. Install it with: pip install zstandard"
+        )
+
+
+def session_log_path (directory :str ,participant_name :str ,compression :Optional [str ]=None )->str :
+    if compression not in COMPRESSION_SUFFIXES :
+        raise ValueError (f"Unsupported log compression: {compression}")
+    slug =re .sub (r"[^\w-]+","_",participant_name .strip (),flags =re .UNICODE ).strip ("_")or "candidate"
+    stamp =datetime .now ().strftime ("%Y%m%d-%H%M%S")
+    name =f"interview_{slug}_{stamp}_{uuid.uuid4().hex[:8]}{COMPRESSION_SUFFIXES[compression]}"
+    return str (Path (directory )/name )
+
+
+class TranscriptSink :
+
+    def __init__ (
+    self ,
+    path :str ,
+    compression :Optional [str ]=None ,
+    fsync_every :int =8 ,
+    fsync_interval :float =2.0 ,
+    )->None :
+        if compression not in COMPRESSION_SUFFIXES :
+            raise ValueError (f"Unsupported log compression: {compression}")
+        self .path =path 
+        self .compression =compression 
+        self .fsync_every =fsync_every 
+        self .fsync_interval =fsync_interval 
+        self ._raw :Optional [IO [bytes ]]=None 
+        self ._stream :Any =None 
+        self ._pending =0 
+        self ._last_sync =time .monotonic ()
+        self ._lock =threading .Lock ()
+        self .deferred =False 
+        self ._sync_due =False 
+
+    def _open (self )->None :
+        zstd =_load_zstd ()if self .compression =="zstd"else None 
+        Path (self .path ).parent .mkdir (parents =True ,exist_ok =True )
+        self ._raw =open (self .path ,"ab")
+        if self .compression =="gzip":
+            self ._stream =gzip .GzipFile (fileobj =self ._raw ,mode ="ab")
+        elif zstd is not None :
+            self ._stream =zstd .ZstdCompressor ().stream_writer (self ._raw ,closefd =False )
+        else :
+            self ._stream =self ._raw 
+
+    def append (self ,record :Dict [str ,Any ],sync :bool =False )->None :
+        line =(json .dumps (record ,ensure_ascii =False )+"\n").encode ("utf-8")
+        with self ._lock :
+            if self ._stream is None :
+                self ._open ()
+            self ._stream .write (line )
+            if self ._stream is self ._raw :
+                self ._raw .flush ()
+            self ._pending +=1 
+            if (
+            sync 
+            or self ._pending >=self .fsync_every 
+            or time .monotonic ()-self ._last_sync >=self .fsync_interval 
+            ):
+                if self .deferred :
+                    self ._sync_due =True 
+                else :
+                    self ._sync ()
+
+    def _sync (self )->None :
+        if self .compression =="gzip":
+            self ._stream .flush (zlib .Z_SYNC_FLUSH )
+        elif self .compression =="zstd":
+            self ._stream .flush (_load_zstd ().FLUSH_BLOCK )
+        self ._raw .flush ()
+        os .fsync (self ._raw .fileno ())
+        self ._pending =0 
+        self ._sync_due =False 
+        self ._last_sync =time .monotonic ()
+
+    def flush (self )->None :
+        with self ._lock :
+            if self ._stream is not None :
+                self ._sync ()
+
+    def sync_due (self )->None :
+        with self ._lock :
+            if self ._sync_due and self ._stream is not None :
+                self ._sync ()
+
+    def close (self )->None :
+        with self ._lock :
+            if self ._stream is None :
+                return 
+            self ._sync ()
+            if self ._stream is not self ._raw :
+                self ._stream .close ()
+            self ._raw .close ()
+            self ._stream =None 
+            self ._raw =None 
+
+
+def _decompressed_chunks (path :str ,chunk_size :int =1 <<16 )->Iterator [bytes ]:
+    with open (path ,"rb")as raw :
+        blocks =iter (lambda :raw .read (chunk_size ),b"")
+        if path .endswith (".gz"):
+            make =lambda :zlib .decompressobj (16 +zlib .MAX_WBITS )
+        elif path .endswith (".zst"):
+            zstd =_load_zstd ()
+            make =lambda :zstd .ZstdDecompressor ().decompressobj ()
+        else :
+            yield from blocks 
+            return 
+        decoder =make ()
+        for block in blocks :
+            while block :
+                yield decoder .decompress (block )
+                block =b""
+                if getattr (decoder ,"eof",False ):
+                    block =decoder .unused_data 
+                    decoder =make ()
+
+
+def _iter_lines (path :str )->Iterator [str ]:
+    buffer =b""
+    for chunk in _decompressed_chunks (path ):
+        buffer +=chunk 
+        *complete ,buffer =buffer .split (b"\n")
+        for line in complete :
+            yield line .decode ("utf-8")
+
+
+class TranscriptReader :
+
+    def __init__ (self ,path :str )->None :
+        self .path =path 
+
+    def records (self )->Iterator [Dict [str ,Any ]]:
+        for line in _iter_lines (self .path ):
+            line =line .strip ()
+            if not line :
+                continue 
+            try :
+                yield json .loads (line )
+            except json .JSONDecodeError :
+                return 
+
+    def header (self )->Dict [str ,Any ]:
+        for record in self .records ():
+            if record .get ("type")=="header":
+                return record 
+        return {}
+
+    def iter_turns (self )->Iterator [Dict [str ,Any ]]:
+        for record in self .records ():
+            if record .get ("type")=="turn":
+                yield {
+                "turn_id":record ["turn_id"],
+                "agent_visible_message":record ["agent_visible_message"],
+                "user_message":record ["user_message"],
+                "internal_thoughts":record ["internal_thoughts"],
+                }
+
+    def to_dict (self )->Dict [str ,Any ]:
+        participant_name =""
+        turns :List [Dict [str ,Any ]]=[]
+        evaluations :List [Dict [str ,Any ]]=[]
+        summary :Dict [str ,Any ]={}
+        final_feedback :str |None =None 
+        for record in self .records ():
+            kind =record .get ("type")
+            if kind =="header":
+                participant_name =record .get ("participant_name","")
+            elif kind =="turn":
+                turns .append ({key :record [key ]for key in ("turn_id","agent_visible_message","user_message","internal_thoughts")})
+            elif kind =="evaluation":
+                evaluations .append ({key :value for key ,value in record .items ()if key !="type"})
+            elif kind =="summary":
+                summary =record .get ("summary",{})
+            elif kind =="final_feedback":
+                final_feedback =record .get ("final_feedback")
+        return {
+        "participant_name":participant_name ,
+        "turns":turns ,
+        "evaluations":evaluations ,
+        "summary":summary ,
+        "final_feedback":final_feedback ,
+        }
 
 
 @dataclass 
 class TurnLog :
+    __slots__ =("turn_id","agent_visible_message","user_message","internal_thoughts")
     turn_id :int 
     agent_visible_message :str 
     user_message :str 
@@ -18,14 +225,59 @@ class InterviewLog :
     position :str 
     grade :str 
     experience :str 
-    turns :List [TurnLog ]=field (default_factory =list )
     final_feedback :str |None =None 
+    summary :Dict [str ,Any ]=field (default_factory =dict )
+    sink :Optional [TranscriptSink ]=field (default =None ,repr =False )
+    store :TurnStore =field (default_factory =TurnStore ,repr =False )
+
+    def __post_init__ (self )->None :
+        if self .sink is not None :
+            self .sink .append (
+            {
+            "type":"header",
+            "participant_name":self .participant_name ,
+            "position":self .position ,
+            "grade":self .grade ,
+            "experience":self .experience ,
+            "started_at":datetime .now ().isoformat (timespec ="seconds"),
+            },
+            sync =True ,
+            )
+
+    @property 
+    def turns (self )->ColumnView :
+        return self .store .log_view (TurnLog )
 
     def log_turn (self ,turn_id :int ,agent_visible_message :str ,user_message :str ,internal_thoughts :str )->None :
-        self .turns .append (TurnLog (turn_id ,agent_visible_message ,user_message ,internal_thoughts ))
+        self .store .add_log_turn (turn_id ,agent_visible_message ,user_message ,internal_thoughts )
+        if self .sink is not None :
+            self .sink .append (
+            {
+            "type":"turn",
+            "turn_id":turn_id ,
+            "agent_visible_message":agent_visible_message ,
+            "user_message":user_message ,
+            "internal_thoughts":internal_thoughts ,
+            }
+            )
+
+    def log_evaluation (self )->None :
+        if self .sink is not None :
+            self .sink .append ({"type":"evaluation",**self .store .evaluations [-1 ]})
+
+    def set_summary (self ,summary :Dict [str ,Any ])->None :
+        self .summary =summary 
+        if self .sink is not None :
+            self .sink .append ({"type":"summary","summary":summary })
 
     def set_final_feedback (self ,feedback :str )->None :
         self .final_feedback =feedback 
+        if self .sink is not None :
+            self .sink .append ({"type":"final_feedback","final_feedback":feedback },sync =True )
+
+    def close (self )->None :
+        if self .sink is not None :
+            self .sink .close ()
 
     def to_dict (self )->Dict [str ,Any ]:
         return {
@@ -39,6 +291,8 @@ class InterviewLog :
         }
         for t in self .turns 
         ],
+        "evaluations":self .store .evaluations [:],
+        "summary":self .summary ,
         "final_feedback":self .final_feedback ,
         }
 
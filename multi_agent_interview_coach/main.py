@@ -1,16 +1,40 @@
 
 from __future__ import annotations 
 
-import re 
-from typing import List ,Dict ,Any 
+import os 
+import json 
+import asyncio 
+import contextlib 
+import contextvars 
+import functools 
+from typing import List ,Dict ,Any ,Optional ,Callable ,Awaitable ,AsyncIterator 
 from pathlib import Path 
 
-from .logger import InterviewLog 
+from .logger import InterviewLog ,TranscriptSink ,session_log_path 
+from .checkpoint import SessionCheckpointer ,load_checkpoint 
 from .agents import ObserverAgent ,InterviewerAgent 
+from .question_bank import QuestionBank ,get_question_bank 
+from .rules import get_rule_engine 
+from .metrics import SessionTrace ,configure_instrumentation ,get_metrics ,span ,use_trace 
+from .turn_store import ColumnView ,TurnStore 
+from .estimator import make_estimator 
+from .archive import get_archive 
 from dotenv import load_dotenv 
 
 load_dotenv (dotenv_path =Path (__file__ ).resolve ().parents [1 ]/".env")
 
+
+async def _threaded_input (prompt :str )->str :
+    loop =asyncio .get_running_loop ()
+    return await loop .run_in_executor (None ,input ,prompt )
+
+
+async def run_blocking (fn :Callable [...,Any ],*args :Any ,**kwargs :Any )->Any :
+    loop =asyncio .get_running_loop ()
+    context =contextvars .copy_context ()
+    return await loop .run_in_executor (None ,functools .partial (context .run ,fn ,*args ,**kwargs ))
+
+
 class InterviewSession :
 
     def __init__ (
@@ -19,13 +43,29 @@ class InterviewSession :
     position :str ,
     grade :str ,
     experience :str ,
+    prefetch :bool =False ,
+    question_bank :QuestionBank |None =None ,
+    fused :bool =False ,
+    stream :bool =False ,
+    trace_path :Optional [str ]=None ,
+    log_dir :Optional [str ]=None ,
+    log_compression :Optional [str ]=None ,
+    checkpoint_path :Optional [str ]=None ,
+    estimator :Optional [str ]=None ,
+    early_stop :bool =False ,
     )->None :
 
 
+        self .turns =TurnStore ()
+        self .estimator_name =estimator if estimator is not None else os .getenv ("INTERVIEW_ESTIMATOR","parity")
+        self .early_stop =early_stop 
         self .observer =ObserverAgent (
         position =position ,
         grade =grade ,
         experience =experience ,
+        question_bank =question_bank ,
+        turn_store =self .turns ,
+        estimator =make_estimator (self .estimator_name ),
         )
         self .interviewer =InterviewerAgent ()
         self .log =InterviewLog (
@@ -33,223 +73,505 @@ class InterviewSession :
         position =position ,
         grade =grade ,
         experience =experience ,
+        sink =TranscriptSink (
+        session_log_path (log_dir ,candidate_name ,log_compression ),
+        log_compression ,
+        )if log_dir else None ,
+        store =self .turns ,
         )
         self .turn_id =1 
         self .pending_question :Dict [str ,Any ]|None =None 
-        self .evaluations :List [Dict [str ,Any ]]=[]
+        self .current_question :Dict [str ,Any ]|None =None 
+        self .current_visible_message =""
+        self .internal_before =""
+        self .prefetch =prefetch 
+        self .fused =fused 
+        self .stream =stream 
+        self .trace_path =trace_path 
+        self .use_question_bank =question_bank is not None 
+        self .awaiting_answer =False 
+        self .checkpointer =SessionCheckpointer (checkpoint_path )if checkpoint_path else None 
+        self ._defer_io =False 
+        self ._pending_snapshot :Optional [Dict [str ,Any ]]=None 
+        self .trace =SessionTrace (candidate_name )if trace_path else None 
+        if trace_path :
+            configure_instrumentation (True )
+
+    @property 
+    def evaluations (self )->ColumnView :
+        return self .turns .evaluations 
+
+    def should_stop (self )->bool :
+        return self .early_stop and self .observer .verdict_settled ()
+
+    @staticmethod 
+    def is_stop_command (candidate_answer :str )->bool :
+        normalized_answer =candidate_answer .strip ().lower ()
+        return get_rule_engine ().matches (normalized_answer ,"stop")
+
+    def _take_pending_question (self )->Dict [str ,Any ]|None :
+        question =self .pending_question 
+        self .pending_question =None 
+        return question 
+
+    def _pose_question (self ,question :Dict [str ,Any ])->str :
+        self .current_question =question 
+        self .current_visible_message =self .interviewer .pose_question (question )
+        self .internal_before =(
+        f"[Observer]: Задаём вопрос по теме '{question['topic']}' сложностью {self.observer.difficulty}. "
+        "[Interviewer]: Озвучиваю вопрос кандидату."
+        )
+        self .awaiting_answer =True 
+        self .checkpoint ()
+        return self .current_visible_message 
+
+    def replaced_announcement (self ,announced :List [str ])->bool :
+        return bool (announced )and announced [-1 ].strip ()!=self .current_visible_message .strip ()
+
+    def snapshot (self )->Dict [str ,Any ]:
+        sink =self .log .sink 
+        return {
+        "version":1 ,
+        "config":{
+        "candidate_name":self .log .participant_name ,
+        "position":self .log .position ,
+        "grade":self .log .grade ,
+        "experience":self .log .experience ,
+        "prefetch":self .prefetch ,
+        "fused":self .fused ,
+        "estimator":self .estimator_name ,
+        "early_stop":self .early_stop ,
+        "stream":self .stream ,
+        "use_question_bank":self .use_question_bank ,
+        "log_path":sink .path if sink is not None else None ,
+        "log_compression":sink .compression if sink is not None else None ,
+        },
+        "session":{
+        "turn_id":self .turn_id ,
+        "pending_question":self .pending_question ,
+        "current_question":self .current_question ,
+        "current_visible_message":self .current_visible_message ,
+        "internal_before":self .internal_before ,
+        "awaiting_answer":self .awaiting_answer ,
+        "final_feedback":self .log .final_feedback ,
+        },
+        "observer":self .observer .snapshot (),
+        "evaluations":self .evaluations [:],
+        "log_turns":self .turns .log_rows (),
+        "questions_asked":self .observer .questions_asked [:],
+        }
+
+    def checkpoint (self )->None :
+        if self .checkpointer is None :
+            return 
+        if self ._defer_io :
+            self ._pending_snapshot =self .snapshot ()
+        else :
+            self .checkpointer .save (self .snapshot ())
+
+    def flush_io (self )->None :
+        snapshot ,self ._pending_snapshot =self ._pending_snapshot ,None 
+        if snapshot is not None and self .checkpointer is not None :
+            self .checkpointer .save (snapshot )
+        if self .log .sink is not None :
+            self .log .sink .sync_due ()
+
+    @contextlib .asynccontextmanager 
+    async def _deferred_io (self )->AsyncIterator [None ]:
+        sink =self .log .sink 
+        self ._defer_io =True 
+        if sink is not None :
+            sink .deferred =True 
+        try :
+            yield 
+        finally :
+            self ._defer_io =False 
+            if sink is not None :
+                sink .deferred =False 
+            await run_blocking (self .flush_io )
+
+    @classmethod 
+    def from_snapshot (
+    cls ,
+    state :Dict [str ,Any ],
+    question_bank :QuestionBank |None =None ,
+    checkpoint_path :Optional [str ]=None ,
+    trace_path :Optional [str ]=None ,
+    resume_question :bool =True ,
+    )->InterviewSession :
+        config =state ["config"]
+        if question_bank is None and config .get ("use_question_bank"):
+            question_bank =get_question_bank ()
+        session =cls (
+        config ["candidate_name"],
+        config ["position"],
+        config ["grade"],
+        config ["experience"],
+        prefetch =config .get ("prefetch",False ),
+        question_bank =question_bank ,
+        fused =config .get ("fused",False ),
+        stream =config .get ("stream",False ),
+        trace_path =trace_path ,
+        checkpoint_path =checkpoint_path ,
+        estimator =config .get ("estimator","parity"),
+        early_stop =config .get ("early_stop",False ),
+        )
+        if config .get ("log_path"):
+            session .log .sink =TranscriptSink (config ["log_path"],config .get ("log_compression"))
+        session .turns .load_log (state .get ("log_turns",[]))
+        saved =state ["session"]
+        session .log .final_feedback =saved .get ("final_feedback")
+        session .turn_id =saved ["turn_id"]
+        session .pending_question =saved .get ("pending_question")
+        session .current_question =saved .get ("current_question")
+        session .current_visible_message =saved .get ("current_visible_message","")
+        session .internal_before =saved .get ("internal_before","")
+        session .awaiting_answer =bool (saved .get ("awaiting_answer"))
+        if resume_question and session .awaiting_answer and session .current_question is not None :
+            session .pending_question =session .current_question 
+        session .turns .load_evaluations (state .get ("evaluations",[]))
+        session .observer .restore (state ["observer"],state .get ("questions_asked",[]))
+        return session 
+
+    @classmethod 
+    def resume (
+    cls ,
+    checkpoint_path :str ,
+    question_bank :QuestionBank |None =None ,
+    trace_path :Optional [str ]=None ,
+    resume_question :bool =True ,
+    )->InterviewSession |None :
+        state =load_checkpoint (checkpoint_path )
+        if state is None :
+            return None 
+        return cls .from_snapshot (state ,question_bank ,checkpoint_path ,trace_path ,resume_question )
+
+    def start_turn (self ,on_question :Optional [Callable [[str ],Any ]]=None )->str :
+        with use_trace (self .trace ),span ("session.start_turn"):
+            question =self ._take_pending_question ()
+            if question is None :
+                question =self .observer .select_next_question (on_question )
+            visible_message =self ._pose_question (question )
+            if self .prefetch :
+                self .observer .start_prefetch ()
+            return visible_message 
+
+    async def astart_turn (self ,on_question :Optional [Callable [[str ],Any ]]=None )->str :
+        with use_trace (self .trace ),span ("session.start_turn"):
+            async with self ._deferred_io ():
+                question =self ._take_pending_question ()
+                if question is None :
+                    question =await self .observer .aselect_next_question (on_question )
+                visible_message =self ._pose_question (question )
+            if self .prefetch :
+                await self .observer .astart_prefetch ()
+            return visible_message 
+
+    def submit_answer (
+    self ,
+    candidate_answer :str ,
+    on_reply_chunk :Optional [Callable [[str ],Any ]]=None ,
+    )->str :
+        with use_trace (self .trace ),span ("session.submit_answer"):
+            if not self .observer .profile_inferred :
+                if self .fused :
+                    profile =self .observer .infer_profile_with_first_question (candidate_answer )
+                else :
+                    profile =self .observer .infer_profile_from_intro (candidate_answer )
+                return self ._log_profile_turn (candidate_answer ,profile )
+
+            if self .fused :
+                evaluation =self .observer .evaluate_and_prepare_next (self .current_question ,candidate_answer )
+            else :
+                evaluation =self .observer .evaluate_answer (self .current_question ,candidate_answer )
+            internal_thoughts =self ._apply_evaluation (candidate_answer ,evaluation )
+            reply =""
+            if evaluation ["result"]=="role_reversal"and on_reply_chunk is not None :
+                chunks =[]
+                for chunk in self .interviewer .stream_role_reversal (candidate_answer ):
+                    chunks .append (chunk )
+                    on_reply_chunk (chunk )
+                reply ="".join (chunks ).strip ()
+            elif evaluation ["result"]=="role_reversal":
+                reply =self .interviewer .handle_role_reversal (candidate_answer )
+            return self ._reply_and_log (candidate_answer ,evaluation ,internal_thoughts ,reply )
 
-    def run (self )->None :
-        print (f"Привет, {self.log.participant_name}! Давайте начнем техническое интервью.")
-        while True :
+    async def asubmit_answer (
+    self ,
+    candidate_answer :str ,
+    on_reply_chunk :Optional [Callable [[str ],Any ]]=None ,
+    )->str :
+        with use_trace (self .trace ),span ("session.submit_answer"):
+            async with self ._deferred_io ():
+                if not self .observer .profile_inferred :
+                    if self .fused :
+                        profile =await self .observer .ainfer_profile_with_first_question (candidate_answer )
+                    else :
+                        profile =await self .observer .ainfer_profile_from_intro (candidate_answer )
+                    return self ._log_profile_turn (candidate_answer ,profile )
+
+                if self .fused :
+                    evaluation =await self .observer .aevaluate_and_prepare_next (self .current_question ,candidate_answer )
+                else :
+                    evaluation =await self .observer .aevaluate_answer (self .current_question ,candidate_answer )
+                internal_thoughts =self ._apply_evaluation (candidate_answer ,evaluation )
+                reply =""
+                if evaluation ["result"]=="role_reversal"and on_reply_chunk is not None :
+                    chunks =[]
+                    async for chunk in self .interviewer .astream_role_reversal (candidate_answer ):
+                        chunks .append (chunk )
+                        on_reply_chunk (chunk )
+                    reply ="".join (chunks ).strip ()
+                elif evaluation ["result"]=="role_reversal":
+                    reply =await self .interviewer .ahandle_role_reversal (candidate_answer )
+                return self ._reply_and_log (candidate_answer ,evaluation ,internal_thoughts ,reply )
+
+    def _log_profile_turn (self ,candidate_answer :str ,profile :Dict [str ,Any ])->str :
+        internal_profile =(
+        "[Observer]: Определён профиль кандидата: "
+        f"{profile['position']}, темы: {', '.join(profile['topics'])}, "
+        f"ориентировочный грейд: {profile['grade']}."
+        )
+        self .log .log_turn (
+        self .turn_id ,
+        self .current_visible_message ,
+        candidate_answer ,
+        self .internal_before +" "+internal_profile ,
+        )
+        self .turn_id +=1 
+        self ._end_turn ()
+        return ""
 
-            if self .pending_question is not None :
-                question =self .pending_question 
-                self .pending_question =None 
-            else :
-                question =self .observer .select_next_question ()
-            visible_message =self .interviewer .pose_question (question )
+    def _apply_evaluation (self ,candidate_answer :str ,evaluation :Dict [str ,Any ])->str :
+        question =self .current_question 
+        self .observer .record_turn (question ,candidate_answer ,evaluation )
+        self .log .log_evaluation ()
 
-            internal_before =(
-            f"[Observer]: Задаём вопрос по теме '{question['topic']}' сложностью {self.observer.difficulty}. "
-            "[Interviewer]: Озвучиваю вопрос кандидату."
-            )
+        self .observer .update_difficulty (evaluation ["result"],question .get ("difficulty"))
 
-            print (f"\nВопрос {self.turn_id}: {visible_message}")
-            candidate_answer =input ("Ваш ответ: ")
-
-            stop_patterns =[
-            r"\bстоп\b",
-            r"\bстоп интервью\b",
-            r"\bstop\b",
-            r"\bstop interview\b",
-            r"\bстоп игра\b",
-            r"\bдавай фидбэк\b",
-            r"\bfeedback\b",
-            ]
-            normalized_answer =candidate_answer .strip ().lower ()
-            if any (re .search (pattern ,normalized_answer )for pattern in stop_patterns ):
-                print ("Прерываем интервью и формируем отчёт...\n")
-                break 
 
-            if not self .observer .profile_inferred :
-                profile =self .observer .infer_profile_from_intro (candidate_answer )
-                internal_profile =(
-                "[Observer]: Определён профиль кандидата: "
-                f"{profile['position']}, темы: {', '.join(profile['topics'])}, "
-                f"ориентировочный грейд: {profile['grade']}."
-                )
-                self .log .log_turn (
-                self .turn_id ,
-                visible_message ,
-                candidate_answer ,
-                internal_before +" "+internal_profile ,
-                )
-                self .turn_id +=1 
-                continue 
-
-
-            evaluation =self .observer .evaluate_answer (question ,candidate_answer )
-            self .observer .record_turn (question ,candidate_answer ,evaluation )
-            self .evaluations .append (
-            {
-            "question":question ["question"],
-            "topic":question ["topic"],
-            "candidate_answer":candidate_answer ,
-            "result":evaluation ["result"],
-            "correct_answer":evaluation ["correct_answer"],
-            "reason":evaluation .get ("reason",""),
-            "difficulty":question .get ("difficulty",self .observer .difficulty ),
-            "confidence":evaluation .get ("confidence",0 ),
-            }
+        if evaluation ["result"]=="correct":
+            recommendation ="усложнить"
+        elif evaluation ["result"]in ("incorrect","partial"):
+            recommendation ="упростить"
+        elif evaluation ["result"]=="role_reversal":
+            recommendation ="ответить кандидату и продолжить"
+        else :
+
+            recommendation ="повторить"
+        internal_after =(
+        f"[Observer]: Ответ классифицирован как {evaluation['result']}. "
+        f"Рекомендация: {recommendation} вопрос."
+        )
+        return self .internal_before +" "+internal_after 
+
+    def _reply_and_log (
+    self ,
+    candidate_answer :str ,
+    evaluation :Dict [str ,Any ],
+    internal_thoughts :str ,
+    role_reversal_reply :str ,
+    )->str :
+        visible_message =self .current_visible_message 
+        if evaluation ["result"]in ("off_topic","hallucination"):
+            reply_to_candidate =self .interviewer .handle_off_topic_or_hallucination (evaluation ["result"])
+
+            self .log .log_turn (
+            self .turn_id ,
+            visible_message +"\n"+reply_to_candidate ,
+            candidate_answer ,
+            internal_thoughts ,
             )
 
-            self .observer .update_difficulty (evaluation ["result"])
+            self .pending_question =self .current_question 
+            self ._end_turn ()
+            return reply_to_candidate 
+        elif evaluation ["result"]=="role_reversal":
+            reply =role_reversal_reply 
+        else :
 
+            reply =self .interviewer .acknowledge_answer (evaluation ["result"])
 
-            if evaluation ["result"]=="correct":
-                recommendation ="усложнить"
-            elif evaluation ["result"]in ("incorrect","partial"):
-                recommendation ="упростить"
-            elif evaluation ["result"]=="role_reversal":
-                recommendation ="ответить кандидату и продолжить"
-            else :
+        self .log .log_turn (
+        self .turn_id ,
+        visible_message +"\n"+reply ,
+        candidate_answer ,
+        internal_thoughts ,
+        )
+        self .turn_id +=1 
+        self ._end_turn ()
+        return reply 
 
-                recommendation ="повторить"
-            internal_after =(
-            f"[Observer]: Ответ классифицирован как {evaluation['result']}. "
-            f"Рекомендация: {recommendation} вопрос."
-            )
-            internal_thoughts =internal_before +" "+internal_after 
+    def _end_turn (self )->None :
+        self .awaiting_answer =False 
+        self .checkpoint ()
 
-            if evaluation ["result"]in ("off_topic","hallucination"):
-                reply_to_candidate =self .interviewer .handle_off_topic_or_hallucination (evaluation ["result"])
-                print (reply_to_candidate )
+    def finish (
+    self ,
+    filename :Optional [str ]="interview_log.json",
+    evaluations_path :Optional [str ]=None ,
+    )->str :
+        self .observer .cancel_prefetch ()
+        with use_trace (self .trace ),span ("session.finish"):
+            final_report =self .generate_final_feedback ()
+            self .log .set_summary (self .summary ())
+            self .log .set_final_feedback (final_report )
+            self .log .close ()
+            if filename :
+                self .log .save (filename )
+            if evaluations_path :
+                self .save_evaluations (evaluations_path )
+            archive =get_archive ()
+            if archive is not None :
+                archive .add (self .log .to_dict ())
+        if self .trace is not None and self .trace_path :
+            self .trace .save (self .trace_path )
+        if self .checkpointer is not None :
+            self .checkpointer .discard ()
+        return final_report 
+
+    def summary (self )->Dict [str ,Any ]:
+        verdict =self .live_verdict ()
+        return {
+        "position":self .observer .profile_position or self .log .position ,
+        "claimed_grade":self .log .grade ,
+        "profile_grade":self .observer .profile_grade ,
+        "grade":verdict ["grade"],
+        "hire_recommendation":verdict ["hire_recommendation"],
+        "confidence":verdict ["confidence"],
+        "accuracy":verdict ["accuracy"],
+        }
+
+    def save_evaluations (self ,path :str )->None :
+        with open (path ,"a",encoding ="utf-8")as f :
+            for entry in self .evaluations :
+                f .write (json .dumps (entry ,ensure_ascii =False )+"\n")
+
+    def _print_summary (self ,filename :str ,final_report :str ,output :Callable [[str ],Any ])->None :
+        output (f"Лог интервью сохранён в {filename}.")
+        output ("\nФинальный отчёт:\n")
+        output (final_report )
 
-                self .log .log_turn (
-                self .turn_id ,
-                visible_message +"\n"+reply_to_candidate ,
-                candidate_answer ,
-                internal_thoughts ,
-                )
+    def run (self )->None :
+        print (f"Привет, {self.log.participant_name}! Давайте начнем техническое интервью.")
+        while True :
+            announced :List [str ]=[]
 
-                self .pending_question =question 
-                continue 
-            elif evaluation ["result"]=="role_reversal":
+            def announce (text :str )->None :
+                announced .append (text )
+                print (f"\nВопрос {self.turn_id}: {text}",flush =True )
 
-                reply =self .interviewer .handle_role_reversal (candidate_answer )
+            visible_message =self .start_turn (announce if self .stream else None )
+
+            if self .replaced_announcement (announced ):
+                print (f"\nВопрос {self.turn_id} (заменён): {visible_message}")
+            elif not announced :
+                print (f"\nВопрос {self.turn_id}: {visible_message}")
+            with use_trace (self .trace ),span ("session.await_answer"):
+                candidate_answer =input ("Ваш ответ: ")
+
+            if self .is_stop_command (candidate_answer ):
+                print ("Прерываем интервью и формируем отчёт...\n")
+                break 
+
+            streamed :List [str ]=[]
+
+            def show_chunk (chunk :str )->None :
+                streamed .append (chunk )
+                print (chunk ,end ="",flush =True )
+
+            reply =self .submit_answer (candidate_answer ,show_chunk if self .stream else None )
+            if streamed :
+                print ()
+            elif reply :
                 print (reply )
+            if self .should_stop ():
+                print ("Оценка уже достаточно уверенная, завершаем интервью и формируем отчёт...\n")
+                break 
 
-                self .log .log_turn (
-                self .turn_id ,
-                visible_message +"\n"+reply ,
-                candidate_answer ,
-                internal_thoughts ,
-                )
+        filename =None if self .log .sink is not None else "interview_log.json"
+        final_report =self .finish (filename ,os .getenv ("INTERVIEW_EVALUATIONS_PATH"))
+        self ._print_summary (filename or self .log .sink .path ,final_report ,print )
 
-                self .turn_id +=1 
-                continue 
-            else :
+    async def arun (
+    self ,
+    ainput :Optional [Callable [[str ],Awaitable [str ]]]=None ,
+    output :Callable [[str ],Any ]=print ,
+    filename :Optional [str ]=None ,
+    output_chunk :Optional [Callable [[str ],Any ]]=None ,
+    )->str :
+        read_answer =ainput or _threaded_input 
+        output (f"Привет, {self.log.participant_name}! Давайте начнем техническое интервью.")
+        while True :
+            announced :List [str ]=[]
 
-                ack =self .interviewer .acknowledge_answer (evaluation ["result"])
-                print (ack )
+            def announce (text :str )->None :
+                announced .append (text )
+                output (f"\nВопрос {self.turn_id}: {text}")
 
-                self .log .log_turn (
-                self .turn_id ,
-                visible_message +"\n"+ack ,
-                candidate_answer ,
-                internal_thoughts ,
-                )
-                self .turn_id +=1 
+            visible_message =await self .astart_turn (announce if self .stream else None )
 
+            if self .replaced_announcement (announced ):
+                output (f"\nВопрос {self.turn_id} (заменён): {visible_message}")
+            elif not announced :
+                output (f"\nВопрос {self.turn_id}: {visible_message}")
+            with use_trace (self .trace ),span ("session.await_answer"):
+                candidate_answer =await read_answer ("Ваш ответ: ")
 
-        final_report =self .generate_final_feedback ()
-        self .log .set_final_feedback (final_report )
+            if self .is_stop_command (candidate_answer ):
+                output ("Прерываем интервью и формируем отчёт...\n")
+                break 
+
+            streamed :List [str ]=[]
+
+            def show_chunk (chunk :str )->None :
+                streamed .append (chunk )
+                output_chunk (chunk )
+
+            reply =await self .asubmit_answer (
+            candidate_answer ,
+            show_chunk if self .stream and output_chunk is not None else None ,
+            )
+            if not streamed and reply :
+                output (reply )
+            if self .should_stop ():
+                output ("Оценка уже достаточно уверенная, завершаем интервью и формируем отчёт...\n")
+                break 
 
-        filename ="interview_log.json"
-        self .log .save (filename )
-        print (f"Лог интервью сохранён в {filename}.")
-        print ("\nФинальный отчёт:\n")
-        print (final_report )
+        if filename is None and self .log .sink is None :
+            filename =str (Path (session_log_path (".",self .log .participant_name )).with_suffix (".json"))
+        self .observer .cancel_prefetch ()
+        final_report =await run_blocking (self .finish ,filename )
+        self ._print_summary (filename or self .log .sink .path ,final_report ,output )
+        return final_report 
 
     def generate_final_feedback (self )->str :
         return self ._build_structured_feedback ()
 
-    def _build_structured_feedback (self )->str :
-        scored =[e for e in self .evaluations if e ["result"]in ("correct","partial","incorrect")]
-        confirmed =[e for e in scored if e ["result"]=="correct"]
-        gaps =[e for e in scored if e ["result"]in ("incorrect","partial")]
-        hallucinations =[e for e in self .evaluations if e ["result"]=="hallucination"]
-        off_topic =[e for e in self .evaluations if e ["result"]=="off_topic"]
-        role_reversal =[e for e in self .evaluations if e ["result"]=="role_reversal"]
-
-        total =len (scored )
-        score =sum (1 for e in scored if e ["result"]=="correct")+0.5 *sum (
-        1 for e in scored if e ["result"]=="partial"
-        )
-        accuracy =score /total if total else 0.0 
-        avg_difficulty =(
-        sum (e .get ("difficulty",self .observer .difficulty )for e in scored )/total 
-        if total 
-        else self .observer .difficulty 
-        )
-        avg_confidence =(
-        sum (e .get ("confidence",0 )for e in scored )/total 
-        if total 
-        else 0 
+    def live_verdict (self )->Dict [str ,Any ]:
+        verdict =self .turns .scorecard .snapshot (
+        self .observer .profile_grade or self .log .grade or "Junior",
+        self .observer .difficulty ,
         )
+        estimator =self .observer .estimator 
+        if estimator is not None :
+            verdict ["ability"]=estimator .stats ()
+            grade ,probability =estimator .grade ()
+            if self .early_stop and grade :
+                verdict ["grade"]=grade 
+                verdict ["hire_recommendation"]=estimator .hire_recommendation (self .log .grade or self .observer .profile_grade or "Junior")
+                verdict ["confidence"]=int (round (100 *probability ))
+        return verdict 
 
-        grade =self .observer .profile_grade or self .log .grade or "Junior"
-        if total :
-            if avg_difficulty >=3 and accuracy >=0.8 :
-                grade ="Senior"
-            elif avg_difficulty >=2 and accuracy >=0.65 :
-                grade ="Middle"
-            else :
-                grade ="Junior"
-
-        if total ==0 :
-            hire_reco ="No Hire"
-        elif accuracy >=0.85 and not hallucinations :
-            hire_reco ="Strong Hire"
-        elif accuracy >=0.65 and len (hallucinations )<=1 :
-            hire_reco ="Hire"
-        else :
-            hire_reco ="No Hire"
-
-        base_confidence =30 +total *5 
-        confidence =(
-        base_confidence 
-        +int (accuracy *50 )
-        +int ((avg_difficulty -1 )*10 )
-        +int (avg_confidence *0.2 )
-        )
-        confidence -=len (hallucinations )*10 
-        if total ==0 :
-            confidence =20 
-        confidence =max (20 ,min (90 ,confidence ))
-
-        def clarity_label ()->str :
-            if not scored :
-                return "Недостаточно данных"
-            avg_words =sum (len (e ["candidate_answer"].split ())for e in scored )/total 
-            if avg_words >=20 :
-                return "Высокая"
-            if avg_words >=8 :
-                return "Средняя"
-            return "Низкая"
-
-        def honesty_label ()->str :
-            if hallucinations :
-                return "Есть сомнительные/ложные утверждения"
-            if any (
-            phrase in e ["candidate_answer"].lower ()
-            for e in gaps 
-            for phrase in ("не знаю","затрудняюсь","не уверен")
-            ):
-                return "Честно признавал незнание"
-            return "Нейтральная"
-
-        engagement_label ="Задавал встречные вопросы"if role_reversal else "Нейтральная"
+    def _build_structured_feedback (self )->str :
+        card =self .turns .scorecard 
+        verdict =self .live_verdict ()
+        evaluations =self .evaluations 
+        confirmed =[evaluations [row ]for row in card .confirmed_rows ]
+        gaps =[evaluations [row ]for row in card .gap_rows ]
+        grade =verdict ["grade"]
+        hire_reco =verdict ["hire_recommendation"]
+        confidence =verdict ["confidence"]
 
         lines =[
         f"Позиция: {self.observer.profile_position or self.log.position}",
@@ -279,12 +601,12 @@ class InterviewSession :
         [
         "",
         "C. Коммуникация и поведенческие сигналы",
-        f"- Ясность: {clarity_label()}",
-        f"- Честность: {honesty_label()}",
-        f"- Вовлечённость: {engagement_label}",
+        f"- Ясность: {verdict['clarity']}",
+        f"- Честность: {verdict['honesty']}",
+        f"- Вовлечённость: {verdict['engagement']}",
         ]
         )
-        if off_topic :
+        if verdict ["off_topic"]:
             lines .append ("- Уход от темы: были уходы в сторону, интервьюеру приходилось возвращать к вопросу.")
 
         lines .extend (
@@ -294,12 +616,8 @@ class InterviewSession :
         ]
         )
         if gaps :
-            seen_topics =set ()
-            for entry in gaps :
-                topic =entry ["topic"]
-                if topic in seen_topics :
-                    continue 
-                seen_topics .add (topic )
+            for topic ,row in card .gap_topics .items ():
+                entry =evaluations [row ]
 
                 lines .append (f"- {topic}:")
                 question =entry .get ("question","")
@@ -322,12 +640,43 @@ class InterviewSession :
 
 def main ()->None :
     print ("==== Multi‑Agent Interview Coach ====")
+    configure_instrumentation (os .getenv ("INTERVIEW_METRICS","0")=="1")
+    checkpoint_path =os .getenv ("INTERVIEW_CHECKPOINT_PATH")or None 
+    if checkpoint_path :
+        session =InterviewSession .resume (checkpoint_path ,trace_path =os .getenv ("INTERVIEW_TRACE_PATH")or None )
+        if session is not None :
+            print (f"Продолжаем интервью с вопроса {session.turn_id}.")
+            session .run ()
+            _save_metrics ()
+            return 
     name =input ("Введите имя кандидата: ")
     position =input ("Введите позицию (например, Backend Developer): ")
     grade =input ("Введите ожидаемый грейд (Junior/Middle/Senior): ")
     experience =input ("Опишите опыт кандидата: ")
-    session =InterviewSession (name ,position ,grade ,experience )
+    session =InterviewSession (
+    name ,
+    position ,
+    grade ,
+    experience ,
+    prefetch =os .getenv ("INTERVIEW_PREFETCH","0")=="1",
+    question_bank =get_question_bank ()if os .getenv ("INTERVIEW_QUESTION_BANK","0")=="1"else None ,
+    fused =os .getenv ("INTERVIEW_FUSED","0")=="1",
+    stream =os .getenv ("INTERVIEW_STREAM","0")=="1",
+    trace_path =os .getenv ("INTERVIEW_TRACE_PATH")or None ,
+    log_dir =os .getenv ("INTERVIEW_LOG_DIR")or None ,
+    log_compression =os .getenv ("INTERVIEW_LOG_COMPRESSION")or None ,
+    checkpoint_path =checkpoint_path ,
+    early_stop =os .getenv ("INTERVIEW_EARLY_STOP","0")=="1",
+    )
     session .run ()
+    _save_metrics ()
+
+
+def _save_metrics ()->None :
+    metrics =get_metrics ()
+    metrics_path =os .getenv ("INTERVIEW_METRICS_PATH")
+    if metrics is not None and metrics_path :
+        metrics .save (metrics_path )
 
 
 if __name__ =="__main__":
@@ -0,0 +1,309 @@
+from __future__ import annotations 
+
+import asyncio 
+import contextvars 
+import functools 
+import inspect 
+import json 
+import os 
+import threading 
+import time 
+from typing import Any ,Callable ,Dict ,List ,Optional ,Tuple 
+
+
+DEFAULT_BUCKETS =(0.001 ,0.005 ,0.01 ,0.05 ,0.1 ,0.25 ,0.5 ,1.0 ,2.5 ,5.0 ,10.0 ,30.0 ,60.0 )
+
+LabelKey =Tuple [Tuple [str ,str ],...]
+
+
+def _label_key (labels :Dict [str ,Any ])->LabelKey :
+    return tuple (sorted ((k ,str (v ))for k ,v in labels .items ()if v is not None ))
+
+
+def _format_labels (key :LabelKey ,extra :Optional [Tuple [str ,str ]]=None )->str :
+    pairs =list (key )+([extra ]if extra else [])
+    if not pairs :
+        return ""
+    escaped =[
+    f'{k}="'+v .replace ("\\","\\\\").replace ('"','\\"').replace ("\n","\\n")+'"'
+    for k ,v in pairs 
+    ]
+    return "{"+",".join (escaped )+"}"
+
+
+class MetricsRegistry :
+
+    def __init__ (self ,buckets :Tuple [float ,...]=DEFAULT_BUCKETS )->None :
+        self .buckets =buckets 
+        self ._counters :Dict [str ,Dict [LabelKey ,float ]]={}
+        self ._histograms :Dict [str ,Dict [LabelKey ,List [float ]]]={}
+        self ._gauges :Dict [str ,Dict [LabelKey ,float ]]={}
+        self ._lock =threading .Lock ()
+
+    def inc (self ,name :str ,value :float =1.0 ,**labels :Any )->None :
+        key =_label_key (labels )
+        with self ._lock :
+            series =self ._counters .setdefault (name ,{})
+            series [key ]=series .get (key ,0.0 )+value 
+
+    def set (self ,name :str ,value :float ,**labels :Any )->None :
+        key =_label_key (labels )
+        with self ._lock :
+            self ._gauges .setdefault (name ,{})[key ]=value 
+
+    def observe (self ,name :str ,value :float ,**labels :Any )->None :
+        key =_label_key (labels )
+        with self ._lock :
+            series =self ._histograms .setdefault (name ,{})
+            state =series .get (key )
+            if state is None :
+                state =series [key ]=[0.0 ]*(len (self .buckets )+2 )
+            for idx ,bound in enumerate (self .buckets ):
+                if value <=bound :
+                    state [idx ]+=1 
+                    break 
+            state [-2 ]+=value 
+            state [-1 ]+=1 
+
+    def render (self )->str :
+        lines :List [str ]=[]
+        with self ._lock :
+            for name in sorted (self ._counters ):
+                lines .append (f"# TYPE {name} counter")
+                for key ,value in sorted (self ._counters [name ].items ()):
+                    lines .append (f"{name}{_format_labels(key)} {value:g}")
+            for name in sorted (self ._gauges ):
+                lines .append (f"# TYPE {name} gauge")
+                for key ,value in sorted (self ._gauges [name ].items ()):
+                    lines .append (f"{name}{_format_labels(key)} {value:g}")
+            for name in sorted (self ._histograms ):
+                lines .append (f"# TYPE {name} histogram")
+                for key ,state in sorted (self ._histograms [name ].items ()):
+                    cumulative =0.0 
+                    for idx ,bound in enumerate (self .buckets ):
+                        cumulative +=state [idx ]
+                        lines .append (f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative:g}")
+                    lines .append (f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {state[-1]:g}")
+                    lines .append (f"{name}_sum{_format_labels(key)} {state[-2]:.6f}")
+                    lines .append (f"{name}_count{_format_labels(key)} {state[-1]:g}")
+        return "\n".join (lines )+"\n"
+
+    def snapshot (self )->Dict [str ,Any ]:
+        with self ._lock :
+            return {
+            "counters":{
+            name :{_format_labels (key )or "{}":value for key ,value in series .items ()}
+            for name ,series in self ._counters .items ()
+            },
+            "gauges":{
+            name :{_format_labels (key )or "{}":value for key ,value in series .items ()}
+            for name ,series in self ._gauges .items ()
+            },
+            "histograms":{
+            name :{
+            _format_labels (key )or "{}":{"count":state [-1 ],"sum":state [-2 ]}
+            for key ,state in series .items ()
+            }
+            for name ,series in self ._histograms .items ()
+            },
+            }
+
+    def save (self ,path :str )->None :
+        with open (path ,"w",encoding ="utf-8")as f :
+            f .write (self .render ())
+
+
+class SessionTrace :
+
+    def __init__ (self ,session_name :str ="interview")->None :
+        self .session_name =session_name 
+        self .events :List [Dict [str ,Any ]]=[]
+        self ._origin =time .perf_counter ()
+        self ._lock =threading .Lock ()
+
+    def add (self ,name :str ,started :float ,duration :float ,args :Dict [str ,Any ])->None :
+        event ={
+        "name":name ,
+        "cat":name .split (".",1 )[0 ],
+        "ph":"X",
+        "ts":round ((started -self ._origin )*1e6 ,1 ),
+        "dur":round (duration *1e6 ,1 ),
+        "pid":os .getpid (),
+        "tid":threading .get_ident (),
+        "args":args ,
+        }
+        with self ._lock :
+            self .events .append (event )
+
+    def to_dict (self )->Dict [str ,Any ]:
+        with self ._lock :
+            events =list (self .events )
+        return {
+        "traceEvents":events ,
+        "displayTimeUnit":"ms",
+        "otherData":{"session":self .session_name },
+        }
+
+    def save (self ,path :str )->None :
+        with open (path ,"w",encoding ="utf-8")as f :
+            json .dump (self .to_dict (),f ,ensure_ascii =False )
+
+
+class _NoopSpan :
+
+    def __enter__ (self )->"_NoopSpan":
+        return self 
+
+    def __exit__ (self ,*exc :Any )->bool :
+        return False 
+
+
+_NOOP =_NoopSpan ()
+
+
+class _Span :
+
+    __slots__ =("name","labels","started")
+
+    def __init__ (self ,name :str ,labels :Dict [str ,Any ])->None :
+        self .name =name 
+        self .labels =labels 
+
+    def __enter__ (self )->"_Span":
+        self .started =time .perf_counter ()
+        return self 
+
+    def __exit__ (self ,exc_type :Any ,exc :Any ,tb :Any )->bool :
+        duration =time .perf_counter ()-self .started 
+        registry =_REGISTRY 
+        if registry is not None :
+            registry .observe ("interview_span_seconds",duration ,span =self .name ,**self .labels )
+            if exc_type is not None :
+                registry .inc ("interview_span_errors_total",span =self .name ,error =exc_type .__name__ )
+        trace =_CURRENT_TRACE .get ()
+        if trace is not None :
+            args =dict (self .labels )
+            if exc_type is not None :
+                args ["error"]=exc_type .__name__ 
+            trace .add (self .name ,self .started ,duration ,args )
+        return False 
+
+
+class _TraceScope :
+
+    __slots__ =("trace","token")
+
+    def __init__ (self ,trace :SessionTrace )->None :
+        self .trace =trace 
+
+    def __enter__ (self )->SessionTrace :
+        self .token =_CURRENT_TRACE .set (self .trace )
+        return self .trace 
+
+    def __exit__ (self ,*exc :Any )->bool :
+        _CURRENT_TRACE .reset (self .token )
+        return False 
+
+
+_ENABLED =os .getenv ("INTERVIEW_METRICS","0")=="1"
+_REGISTRY :Optional [MetricsRegistry ]=MetricsRegistry ()if _ENABLED else None 
+_CURRENT_TRACE :contextvars .ContextVar [Optional [SessionTrace ]]=contextvars .ContextVar (
+"interview_trace",
+default =None ,
+)
+
+
+def configure_instrumentation (enabled :bool ,registry :Optional [MetricsRegistry ]=None )->None :
+    global _ENABLED ,_REGISTRY 
+    if enabled :
+        _REGISTRY =registry or _REGISTRY or MetricsRegistry ()
+    _ENABLED =enabled 
+
+
+def instrumentation_enabled ()->bool :
+    return _ENABLED 
+
+
+def get_metrics ()->Optional [MetricsRegistry ]:
+    return _REGISTRY if _ENABLED else None 
+
+
+def inc (name :str ,value :float =1.0 ,**labels :Any )->None :
+    if _ENABLED :
+        _REGISTRY .inc (name ,value ,**labels )
+
+
+def gauge (name :str ,value :float ,**labels :Any )->None :
+    if _ENABLED :
+        _REGISTRY .set (name ,value ,**labels )
+
+
+def observe (name :str ,value :float ,**labels :Any )->None :
+    if _ENABLED :
+        _REGISTRY .observe (name ,value ,**labels )
+
+
+def record_usage (model :str ,usage :Any )->None :
+    if not _ENABLED or usage is None :
+        return 
+    prompt_tokens =getattr (usage ,"prompt_tokens",None )
+    completion_tokens =getattr (usage ,"completion_tokens",None )
+    if prompt_tokens :
+        _REGISTRY .inc ("llm_prompt_tokens_total",prompt_tokens ,model =model )
+    if completion_tokens :
+        _REGISTRY .inc ("llm_completion_tokens_total",completion_tokens ,model =model )
+
+
+def span (name :str ,**labels :Any )->Any :
+    if not _ENABLED :
+        return _NOOP 
+    return _Span (name ,labels )
+
+
+def use_trace (trace :Optional [SessionTrace ])->Any :
+    if trace is None or not _ENABLED :
+        return _NOOP 
+    return _TraceScope (trace )
+
+
+def instrumented (name :Optional [str ]=None )->Callable [[Callable [...,Any ]],Callable [...,Any ]]:
+    def decorate (fn :Callable [...,Any ])->Callable [...,Any ]:
+        span_name =name or fn .__qualname__ 
+
+        if inspect .isasyncgenfunction (fn ):
+            @functools .wraps (fn )
+            async def agen_wrapper (*args :Any ,**kwargs :Any )->Any :
+                with span (span_name ):
+                    async for item in fn (*args ,**kwargs ):
+                        yield item 
+
+            return agen_wrapper 
+
+        if inspect .isgeneratorfunction (fn ):
+            @functools .wraps (fn )
+            def gen_wrapper (*args :Any ,**kwargs :Any )->Any :
+                with span (span_name ):
+                    yield from fn (*args ,**kwargs )
+
+            return gen_wrapper 
+
+        if asyncio .iscoroutinefunction (fn ):
+            @functools .wraps (fn )
+            async def async_wrapper (*args :Any ,**kwargs :Any )->Any :
+                if not _ENABLED :
+                    return await fn (*args ,**kwargs )
+                with _Span (span_name ,{}):
+                    return await fn (*args ,**kwargs )
+
+            return async_wrapper 
+
+        @functools .wraps (fn )
+        def wrapper (*args :Any ,**kwargs :Any )->Any :
+            if not _ENABLED :
+                return fn (*args ,**kwargs )
+            with _Span (span_name ,{}):
+                return fn (*args ,**kwargs )
+
+        return wrapper 
+
+    return decorate 
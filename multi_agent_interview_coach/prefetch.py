@@ -0,0 +1,90 @@
+from __future__ import annotations 
+
+import asyncio 
+from concurrent .futures import Future ,ThreadPoolExecutor 
+from typing import Any ,Callable ,Dict ,Hashable ,Optional 
+import threading 
+
+
+_EXECUTOR :Optional [ThreadPoolExecutor ]=None 
+_EXECUTOR_LOCK =threading .Lock ()
+
+
+def get_prefetch_executor ()->ThreadPoolExecutor :
+    global _EXECUTOR 
+    with _EXECUTOR_LOCK :
+        if _EXECUTOR is None :
+            _EXECUTOR =ThreadPoolExecutor (max_workers =8 ,thread_name_prefix ="question-prefetch")
+        return _EXECUTOR 
+
+
+def _running_loop ()->Optional [asyncio .AbstractEventLoop ]:
+    try :
+        return asyncio .get_running_loop ()
+    except RuntimeError :
+        return None 
+
+
+class QuestionPrefetcher :
+
+    def __init__ (self ,executor :Optional [ThreadPoolExecutor ]=None )->None :
+        self ._executor =executor 
+        self ._state_key :Optional [Hashable ]=None 
+        self ._pending :Dict [int ,Any ]={}
+
+    def is_primed (self ,state_key :Hashable )->bool :
+        return bool (self ._pending )and self ._state_key ==state_key 
+
+    def _reset (self ,state_key :Hashable )->None :
+        if self ._state_key !=state_key :
+            self .cancel_all ()
+            self ._state_key =state_key 
+
+    def submit (self ,state_key :Hashable ,difficulty :int ,fn :Callable [...,Any ],*args :Any )->None :
+        self ._reset (state_key )
+        if difficulty in self ._pending :
+            return 
+        executor =self ._executor or get_prefetch_executor ()
+        self ._pending [difficulty ]=executor .submit (fn ,*args )
+
+    def schedule (self ,state_key :Hashable ,difficulty :int ,coro :Any )->None :
+        self ._reset (state_key )
+        if difficulty in self ._pending :
+            coro .close ()
+            return 
+        self ._pending [difficulty ]=asyncio .ensure_future (coro )
+
+    def take (self ,difficulty :int )->Optional [Any ]:
+        chosen =self ._pending .pop (difficulty ,None )
+        self .cancel_all ()
+        return chosen 
+
+    def cancel_all (self )->None :
+        for pending in self ._pending .values ():
+            if isinstance (pending ,asyncio .Future )and pending .get_loop ()is not _running_loop ():
+                if not pending .get_loop ().is_closed ():
+                    pending .get_loop ().call_soon_threadsafe (pending .cancel )
+            else :
+                pending .cancel ()
+        self ._pending ={}
+        self ._state_key =None 
+
+
+def result_or_none (pending :Optional [Any ])->Optional [Dict [str ,Any ]]:
+    if pending is None :
+        return None 
+    try :
+        return pending .result ()
+    except Exception :
+        return None 
+
+
+async def aresult_or_none (pending :Optional [Any ])->Optional [Dict [str ,Any ]]:
+    if pending is None :
+        return None 
+    try :
+        if isinstance (pending ,Future ):
+            return await asyncio .wrap_future (pending )
+        return await pending 
+    except Exception :
+        return None 
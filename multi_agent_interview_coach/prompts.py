@@ -0,0 +1,206 @@
+from __future__ import annotations 
+
+import math 
+import os 
+import re 
+import threading 
+from typing import Any ,Dict ,List ,Optional ,Sequence 
+
+
+SYSTEM_PROMPTS :Dict [str ,str ]={
+"intro":(
+"Вы — интервьюер. Сформулируйте краткий первый вопрос, "
+"чтобы кандидат представился, указал позицию, опыт и ключевые технологии. "
+"Верните СТРОГО JSON: {\"question\": \"...\"}."
+),
+"profile":(
+"Вы — технический интервьюер. На основе ответа кандидата определите:\n"
+"1) Позицию (должность) кандидата.\n"
+"2) 4-7 релевантных тем для технических вопросов по этой позиции.\n"
+"3) Предполагаемый грейд (Junior/Middle/Senior).\n"
+"Верните СТРОГО JSON: {\"position\": \"...\", \"topics\": [\"...\"], \"grade\": \"...\"}.\n"
+"Если кандидат упоминает DevOps/SRE/Infrastructure, включайте темы: Linux, сети, CI/CD, облака, "
+"контейнеры, мониторинг/логирование, IaC, безопасность. "
+"Если упоминает Frontend, включайте темы: JS/TS, HTML/CSS, браузер, React/Vue, производительность.\n"
+"Если упоминает Backend, включайте темы: API, базы данных, архитектура, кэширование, очереди.\n"
+"Если информации мало, сделайте лучший вывод, но не добавляйте нерелевантные темы."
+),
+"evaluation":(
+"Вы — помощник для оценки ответов кандидатов на технические вопросы. "
+"Вам дан вопрос, ожидаемый правильный ответ и фактический ответ кандидата. "
+"Классифицируйте ответ как 'correct', 'partial' или 'incorrect'. "
+"Также укажите краткую причину и уверенность (0-100). "
+"Верните СТРОГО JSON: {\"result\": ..., \"reason\": ..., \"confidence\": ...}."
+),
+"fused_evaluation":(
+"Вы — помощник для оценки ответов кандидатов на технические вопросы и подготовки следующего вопроса. "
+"Вам дан вопрос, ожидаемый правильный ответ и фактический ответ кандидата. "
+"Классифицируйте ответ как 'correct', 'partial' или 'incorrect'. "
+"Также укажите краткую причину и уверенность (0-100). "
+"Затем сгенерируйте следующий вопрос для кандидата: 'topic' (одна из допустимых тем), "
+"'question' (текст вопроса на русском языке), 'answer' (ожидаемый правильный краткий ответ). "
+"Сложность следующего вопроса зависит от вашей оценки и указана в данных. "
+"Вопрос не должен повторять уже заданные и должен строго соответствовать позиции кандидата. "
+"Верните СТРОГО JSON: {\"result\": ..., \"reason\": ..., \"confidence\": ..., "
+"\"next_question\": {\"topic\": ..., \"question\": ..., \"answer\": ...}}."
+),
+"question":(
+"Вы — ассистент по проведению технических собеседований. "
+"Сгенерируйте следующий вопрос для кандидата на основе предоставленной информации. "
+"Вы должны вернуть JSON со следующими полями: 'topic' (одна из тем, перечисленных в данных кандидата), "
+"'difficulty' (целое 1-3), "
+"'question' (текст вопроса на русском языке), 'answer' (ожидаемый правильный краткий ответ). "
+"Выбирайте тему только из списка допустимых и придерживайтесь указанной сложности. "
+"Если предыдущий ответ кандидата был верным, вы можете увеличить сложность; "
+"если неверным — уменьшить. Вопросы должны строго соответствовать позиции кандидата."
+),
+"question_batch":(
+"Вы — ассистент по проведению технических собеседований. "
+"Сгенерируйте несколько разных вопросов для кандидата по одной теме и сложности. "
+"Верните СТРОГО JSON: {\"questions\": [{\"question\": \"...\", \"answer\": \"...\"}]}, где "
+"'question' — текст вопроса на русском языке, 'answer' — ожидаемый правильный краткий ответ. "
+"Вопросы не должны повторять друг друга и должны строго соответствовать позиции кандидата."
+),
+"batch_evaluation":(
+"Вы — помощник для оценки ответов кандидатов на технические вопросы. "
+"Вам дано несколько пронумерованных ответов: для каждого — вопрос, ожидаемый правильный ответ и ответ кандидата. "
+"Оцените каждый ответ независимо от остальных как 'correct', 'partial' или 'incorrect', "
+"укажите краткую причину и уверенность (0-100). "
+"Верните СТРОГО JSON: {\"grades\": [{\"id\": номер, \"result\": ..., \"reason\": ..., \"confidence\": ...}]}."
+),
+"role_reversal":(
+"Вы — рекрутер, отвечающий на вопросы кандидатов во время интервью. "
+"Ответьте кратко и по существу на вопрос кандидата о работе, команде, технологиях или процессах. "
+"Если вопрос выходит за рамки вашей компетенции, вежливо скажите, что уточните у команды."
+),
+}
+SYSTEM_PROMPTS ["fused_profile"]=(
+SYSTEM_PROMPTS ["profile"]
++"\nДополнительно сформулируйте первый технический вопрос по одной из определённых тем, "
+"сложность которого соответствует грейду (Junior — 1, Middle — 2, Senior — 3). "
+"Верните СТРОГО JSON: {\"position\": \"...\", \"topics\": [\"...\"], \"grade\": \"...\", "
+"\"next_question\": {\"topic\": \"...\", \"question\": \"...\", \"answer\": \"...\"}}, где "
+"'question' — текст вопроса на русском языке, 'answer' — ожидаемый правильный краткий ответ."
+)
+
+MESSAGE_OVERHEAD_TOKENS =4 
+
+TURNS_HEADER ="Последние ответы кандидата (не повторять вопросы):"
+ASKED_HEADER ="Уже заданные вопросы (не повторять):"
+
+_TOKEN_RE =re .compile (r"\w+|[^\w\s]",re .UNICODE )
+
+
+def count_tokens (text :str )->int :
+    total =0 
+    for piece in _TOKEN_RE .findall (text ):
+        total +=max (1 ,math .ceil (len (piece )/(4 if piece .isascii ()else 3 )))
+    return total 
+
+
+def count_prompt_tokens (system_prompt :str ,messages :Sequence [Dict [str ,str ]])->int :
+    total =count_tokens (system_prompt )+MESSAGE_OVERHEAD_TOKENS 
+    for message in messages :
+        total +=count_tokens (message .get ("content",""))+MESSAGE_OVERHEAD_TOKENS 
+    return total 
+
+
+def abbreviate (text :str ,max_words :int )->str :
+    words =text .split ()
+    if len (words )<=max_words :
+        return " ".join (words )
+    return " ".join (words [:max_words ])+"…"
+
+
+class PromptBuilder :
+
+    def __init__ (
+    self ,
+    budget :int =600 ,
+    answer_words :int =40 ,
+    question_words :int =16 ,
+    recent_turns :int =4 ,
+    )->None :
+        self .budget =budget 
+        self .answer_words =answer_words 
+        self .question_words =question_words 
+        self .recent_turns =recent_turns 
+
+    def history (
+    self ,
+    recent_turns :Sequence [Dict [str ,Any ]],
+    asked :Sequence [Dict [str ,Any ]],
+    budget :int ,
+    )->List [str ]:
+        turn_lines :List [str ]=[]
+        asked_lines :List [str ]=[]
+        shown =set ()
+        budget -=count_tokens (TURNS_HEADER )+count_tokens (ASKED_HEADER )
+        for turn in list (recent_turns )[-self .recent_turns :][::-1 ]:
+            line =(
+            f"- Q: {abbreviate(turn.get('question', ''), self.question_words)}"
+            f" | A: {abbreviate(turn.get('candidate_answer', ''), self.answer_words)}"
+            f" | R: {turn.get('result', '')}"
+            )
+            cost =count_tokens (line )
+            if cost >budget :
+                break 
+            budget -=cost 
+            turn_lines .append (line )
+            shown .add (turn .get ("question",""))
+        for question in list (asked )[::-1 ]:
+            text =question .get ("question","")
+            if text in shown :
+                continue 
+            shown .add (text )
+            line =f"- {abbreviate(text, self.question_words)}"
+            cost =count_tokens (line )
+            if cost >budget :
+                break 
+            budget -=cost 
+            asked_lines .append (line )
+        lines :List [str ]=[]
+        if turn_lines :
+            lines .append (TURNS_HEADER )
+            lines .extend (turn_lines [::-1 ])
+        if asked_lines :
+            lines .append (ASKED_HEADER )
+            lines .extend (asked_lines [::-1 ])
+        return lines 
+
+    def build (
+    self ,
+    session_lines :Sequence [str ],
+    recent_turns :Sequence [Dict [str ,Any ]],
+    asked :Sequence [Dict [str ,Any ]],
+    turn_lines :Sequence [str ],
+    instruction :str ="",
+    )->str :
+        head ="\n".join (session_lines )
+        tail ="\n".join (list (turn_lines )+([instruction ]if instruction else []))
+        budget =self .budget -count_tokens (head )-count_tokens (tail )
+        return "\n".join (
+        part for part in (head ,"\n".join (self .history (recent_turns ,asked ,budget )),tail )if part 
+        )
+
+
+_PROMPT_BUILDER :Optional [PromptBuilder ]=None 
+_BUILDER_LOCK =threading .Lock ()
+
+
+def configure_prompt_builder (builder :PromptBuilder )->None :
+    global _PROMPT_BUILDER 
+    with _BUILDER_LOCK :
+        _PROMPT_BUILDER =builder 
+
+
+def get_prompt_builder ()->PromptBuilder :
+    global _PROMPT_BUILDER 
+    with _BUILDER_LOCK :
+        if _PROMPT_BUILDER is None :
+            _PROMPT_BUILDER =PromptBuilder (
+            budget =int (os .getenv ("INTERVIEW_PROMPT_BUDGET","600")),
+            answer_words =int (os .getenv ("INTERVIEW_PROMPT_ANSWER_WORDS","40")),
+            question_words =int (os .getenv ("INTERVIEW_PROMPT_QUESTION_WORDS","16")),
+            )
+        return _PROMPT_BUILDER 
@@ -0,0 +1,180 @@
+from __future__ import annotations 
+
+import threading 
+from collections import deque 
+from typing import Any ,Deque ,Dict ,Iterable ,List ,Optional ,Set ,Tuple 
+
+from .agents import ObserverAgent ,call_llm 
+from .metrics import inc 
+from .prefetch import get_prefetch_executor 
+from .prompts import SYSTEM_PROMPTS ,abbreviate ,get_prompt_builder 
+from .ratelimit import llm_priority 
+from .resilience import LLMResponseError ,LLMUnavailableError 
+
+
+BankKey =Tuple [str ,str ,int ]
+
+
+def _normalize (text :str )->str :
+    return " ".join (text .lower ().split ())
+
+
+class QuestionBank :
+
+    def __init__ (
+    self ,
+    batch_size :int =5 ,
+    low_watermark :int =2 ,
+    max_per_key :int =50 ,
+    )->None :
+        self .batch_size =batch_size 
+        self .low_watermark =low_watermark 
+        self .max_per_key =max_per_key 
+        self ._buckets :Dict [BankKey ,Deque [Dict [str ,Any ]]]={}
+        self ._seen :Dict [BankKey ,Set [str ]]={}
+        self ._refilling :Set [BankKey ]=set ()
+        self ._lock =threading .Lock ()
+        self .hits =0 
+        self .misses =0 
+        self .refills =0 
+
+    @staticmethod 
+    def make_key (position :str ,topic :str ,difficulty :int )->BankKey :
+        return (_normalize (position ),_normalize (topic ),int (difficulty ))
+
+    def add (self ,position :str ,questions :Iterable [Dict [str ,Any ]])->int :
+        added =0 
+        with self ._lock :
+            for q in questions :
+                text =str (q .get ("question","")).strip ()
+                topic =str (q .get ("topic","")).strip ()
+                if not text or not topic :
+                    continue 
+                try :
+                    difficulty =int (q .get ("difficulty",1 ))
+                except (TypeError ,ValueError ):
+                    continue 
+                key =self .make_key (position ,topic ,difficulty )
+                seen =self ._seen .setdefault (key ,set ())
+                norm =_normalize (text )
+                if norm in seen :
+                    continue 
+                bucket =self ._buckets .setdefault (key ,deque ())
+                if len (bucket )>=self .max_per_key :
+                    continue 
+                seen .add (norm )
+                bucket .append (
+                {
+                "topic":topic ,
+                "difficulty":difficulty ,
+                "question":text ,
+                "answer":str (q .get ("answer","")).strip (),
+                }
+                )
+                added +=1 
+        return added 
+
+    def take (
+    self ,
+    position :str ,
+    topics :List [str ],
+    difficulty :int ,
+    exclude :Iterable [str ]=(),
+    )->Optional [Dict [str ,Any ]]:
+        excluded ={_normalize (text )for text in exclude }
+        found :Optional [Dict [str ,Any ]]=None 
+        low :List [Tuple [str ,int ]]=[]
+        with self ._lock :
+            for topic in topics :
+                key =self .make_key (position ,topic ,difficulty )
+                bucket =self ._buckets .get (key )
+                while found is None and bucket :
+                    candidate =bucket .popleft ()
+                    if _normalize (candidate ["question"])not in excluded :
+                        found =dict (candidate ,topic =topic )
+                if not bucket or len (bucket )<self .low_watermark :
+                    low .append ((topic ,difficulty ))
+                if found is not None :
+                    break 
+            if found is not None :
+                self .hits +=1 
+            else :
+                self .misses +=1 
+        for topic ,level in low :
+            self .request_refill (position ,topic ,level )
+        return found 
+
+    def request_refill (self ,position :str ,topic :str ,difficulty :int )->None :
+        key =self .make_key (position ,topic ,difficulty )
+        with self ._lock :
+            if key in self ._refilling :
+                return 
+            self ._refilling .add (key )
+        get_prefetch_executor ().submit (self ._refill ,key ,position ,topic ,difficulty )
+
+    def _refill (self ,key :BankKey ,position :str ,topic :str ,difficulty :int )->None :
+        try :
+            self .add (position ,self .generate_batch (position ,topic ,difficulty ))
+        except (LLMUnavailableError ,LLMResponseError )as exc :
+            inc ("question_bank_refill_failures_total",error =type (exc ).__name__ )
+        finally :
+            with self ._lock :
+                self ._refilling .discard (key )
+                self .refills +=1 
+
+    def generate_batch (self ,position :str ,topic :str ,difficulty :int )->List [Dict [str ,Any ]]:
+        with self ._lock :
+            known =[q ["question"]for q in self ._buckets .get (self .make_key (position ,topic ,difficulty ),())][-5 :]
+        user_content =(
+        f"Позиция кандидата: {position or 'не указано'}\n"
+        f"Тема: {topic}\n"
+        f"Сложность: {difficulty}\n"
+        f"Количество вопросов: {self.batch_size}\n"
+        "Уже есть в банке (не повторять):"
+        +"".join (f"\n- {abbreviate(text, get_prompt_builder().question_words)}"for text in known )
+        )
+        with llm_priority ("background"):
+            raw =call_llm (SYSTEM_PROMPTS ["question_batch"],[{"role":"user","content":user_content }],temperature =0 ,use_cache =False ,kind ="question")
+        try :
+            data =ObserverAgent ._parse_llm_json (raw )
+        except Exception as exc :
+            raise LLMResponseError (f"Failed to parse question batch JSON: {exc}")from exc 
+        items =data .get ("questions",[])if isinstance (data ,dict )else []
+        return [
+        {
+        "topic":topic ,
+        "difficulty":difficulty ,
+        "question":item .get ("question",""),
+        "answer":item .get ("answer",""),
+        }
+        for item in items 
+        if isinstance (item ,dict )
+        ]
+
+    def size (self ,position :str ,topic :str ,difficulty :int )->int :
+        with self ._lock :
+            return len (self ._buckets .get (self .make_key (position ,topic ,difficulty ),()))
+
+    def stats (self )->Dict [str ,Any ]:
+        with self ._lock :
+            lookups =self .hits +self .misses 
+            return {
+            "keys":len (self ._buckets ),
+            "questions":sum (len (b )for b in self ._buckets .values ()),
+            "hits":self .hits ,
+            "misses":self .misses ,
+            "refills":self .refills ,
+            "hit_rate":self .hits /lookups if lookups else 0.0 ,
+            }
+
+
+_QUESTION_BANK :Optional [QuestionBank ]=None 
+_BANK_LOCK =threading .Lock ()
+
+
+def get_question_bank ()->QuestionBank :
+    global _QUESTION_BANK 
+    with _BANK_LOCK :
+        if _QUESTION_BANK is None :
+            _QUESTION_BANK =QuestionBank ()
+        return _QUESTION_BANK 
@@ -0,0 +1,244 @@
+from __future__ import annotations 
+
+import asyncio 
+import contextlib 
+import contextvars 
+import importlib 
+import json 
+import os 
+import threading 
+import time 
+from collections import deque 
+from typing import Any ,Deque ,Dict ,Iterator ,List ,Optional 
+
+from .metrics import gauge ,inc ,observe 
+
+
+PRIORITIES =("interactive","background","batch")
+RESERVES ={"interactive":0.0 ,"background":0.2 ,"batch":0.4 }
+COMPLETION_TOKENS_ESTIMATE =300 
+
+_PRIORITY :contextvars .ContextVar [str ]=contextvars .ContextVar ("llm_priority",default ="interactive")
+
+
+def current_priority ()->str :
+    return _PRIORITY .get ()
+
+
+@contextlib .contextmanager 
+def llm_priority (name :str )->Iterator [None ]:
+    if name not in PRIORITIES :
+        raise ValueError (f"Unknown LLM priority: {name}")
+    token =_PRIORITY .set (name )
+    try :
+        yield 
+    finally :
+        _PRIORITY .reset (token )
+
+
+def _load_fcntl ():
+    try :
+        return importlib .import_module ("fcntl")
+    except ImportError as exc :
+        raise RuntimeError ("A shared rate limit file needs fcntl, which is only available on POSIX systems.")from exc 
+
+
+class _Ticket :
+    __slots__ =("priority","loop","future")
+
+    def __init__ (self ,priority :str ,loop :Optional [asyncio .AbstractEventLoop ]=None )->None :
+        self .priority =priority 
+        self .loop =loop 
+        self .future :Optional [asyncio .Future ]=None 
+
+
+class RateLimiter :
+
+    def __init__ (
+    self ,
+    requests_per_second :float =0.0 ,
+    tokens_per_minute :float =0.0 ,
+    burst_seconds :float =10.0 ,
+    shared_path :Optional [str ]=None ,
+    reserves :Optional [Dict [str ,float ]]=None ,
+    )->None :
+        self .request_rate =requests_per_second 
+        self .token_rate =tokens_per_minute /60.0 
+        self .request_capacity =max (1.0 ,requests_per_second *burst_seconds )
+        self .token_capacity =self .token_rate *burst_seconds 
+        self .shared_path =shared_path 
+        self .reserves =dict (RESERVES ,**(reserves or {}))
+        self ._state ={"requests":self .request_capacity ,"tokens":self .token_capacity ,"updated":time .time ()}
+        self ._lock =threading .Lock ()
+        self ._changed =threading .Condition (self ._lock )
+        self ._queues :Dict [str ,Deque [_Ticket ]]={name :deque ()for name in PRIORITIES }
+        self .counts :Dict [str ,int ]={"acquired":0 ,"waited":0 }
+        self ._fcntl =_load_fcntl ()if shared_path else None 
+
+    @property 
+    def enabled (self )->bool :
+        return self .request_rate >0 or self .token_rate >0 
+
+    @contextlib .contextmanager 
+    def _bucket (self )->Iterator [Dict [str ,float ]]:
+        if self .shared_path is None :
+            yield self ._state 
+            return 
+        with open (self .shared_path ,"a+",encoding ="utf-8")as f :
+            self ._fcntl .flock (f .fileno (),self ._fcntl .LOCK_EX )
+            try :
+                f .seek (0 )
+                try :
+                    state =json .loads (f .read ())
+                except json .JSONDecodeError :
+                    state =dict (self ._state )
+                yield state 
+                f .seek (0 )
+                f .truncate ()
+                f .write (json .dumps (state ))
+                f .flush ()
+            finally :
+                self ._fcntl .flock (f .fileno (),self ._fcntl .LOCK_UN )
+
+    def _try_take (self ,tokens :int ,priority :str )->float :
+        reserve =self .reserves .get (priority ,0.0 )
+        now =time .time ()
+        with self ._bucket ()as state :
+            elapsed =max (0.0 ,now -state ["updated"])
+            state ["requests"]=min (self .request_capacity ,state ["requests"]+elapsed *self .request_rate )
+            state ["tokens"]=min (self .token_capacity ,state ["tokens"]+elapsed *self .token_rate )
+            state ["updated"]=now 
+            requests =1.0 if self .request_rate >0 else 0.0 
+            need =min (float (tokens ),self .token_capacity *(1 -reserve ))if self .token_rate >0 else 0.0 
+            floor =min (reserve *self .request_capacity ,self .request_capacity -requests )
+            waits :List [float ]=[]
+            if requests :
+                waits .append ((requests +floor -state ["requests"])/self .request_rate )
+            if need :
+                waits .append ((need +reserve *self .token_capacity -state ["tokens"])/self .token_rate )
+            wait =max (waits ,default =0.0 )
+            if wait <=0 :
+                state ["requests"]-=requests 
+                state ["tokens"]-=need 
+            return max (0.0 ,wait )
+
+    def _is_next (self ,ticket :_Ticket )->bool :
+        for name in PRIORITIES :
+            queue =self ._queues [name ]
+            if queue :
+                return queue [0 ]is ticket 
+        return False 
+
+    def _enqueue (self ,ticket :_Ticket )->None :
+        self ._queues [ticket .priority ].append (ticket )
+        self ._publish_depth (ticket .priority )
+
+    def _dequeue (self ,ticket :_Ticket )->None :
+        self ._queues [ticket .priority ].remove (ticket )
+        self ._publish_depth (ticket .priority )
+        self ._changed .notify_all ()
+        for other in (t for queue in self ._queues .values ()for t in queue ):
+            if other .loop is not None and other .future is not None :
+                other .loop .call_soon_threadsafe (_wake ,other .future )
+
+    def _publish_depth (self ,priority :str )->None :
+        depth =len (self ._queues [priority ])
+        gauge ("llm_rate_limit_queue_depth",depth ,priority =priority )
+
+    def _poll (self ,ticket :_Ticket ,tokens :int )->float :
+        if not self ._is_next (ticket ):
+            return -1.0 
+        wait =self ._try_take (tokens ,ticket .priority )
+        if wait <=0 :
+            self ._dequeue (ticket )
+        return wait 
+
+    def _finish (self ,priority :str ,started :float )->float :
+        waited =time .monotonic ()-started 
+        with self ._lock :
+            self .counts ["acquired"]+=1 
+            if waited >0.001 :
+                self .counts ["waited"]+=1 
+                inc ("llm_rate_limit_waits_total",priority =priority )
+        observe ("llm_rate_limit_wait_seconds",waited ,priority =priority )
+        return waited 
+
+    def acquire (self ,tokens :int =0 ,priority :Optional [str ]=None )->float :
+        if not self .enabled :
+            return 0.0 
+        ticket =_Ticket (priority or current_priority ())
+        started =time .monotonic ()
+        with self ._changed :
+            self ._enqueue (ticket )
+            try :
+                while True :
+                    wait =self ._poll (ticket ,tokens )
+                    if wait ==0 :
+                        break 
+                    self ._changed .wait (None if wait <0 else wait )
+            except BaseException :
+                if ticket in self ._queues [ticket .priority ]:
+                    self ._dequeue (ticket )
+                raise 
+        return self ._finish (ticket .priority ,started )
+
+    async def aacquire (self ,tokens :int =0 ,priority :Optional [str ]=None )->float :
+        if not self .enabled :
+            return 0.0 
+        loop =asyncio .get_running_loop ()
+        ticket =_Ticket (priority or current_priority (),loop )
+        started =time .monotonic ()
+        with self ._lock :
+            self ._enqueue (ticket )
+        try :
+            while True :
+                with self ._lock :
+                    ticket .future =loop .create_future ()
+                    wait =self ._poll (ticket ,tokens )
+                if wait ==0 :
+                    break 
+                await asyncio .wait ({ticket .future },timeout =None if wait <0 else wait )
+        except BaseException :
+            with self ._lock :
+                if ticket in self ._queues [ticket .priority ]:
+                    self ._dequeue (ticket )
+            raise 
+        return self ._finish (ticket .priority ,started )
+
+    def stats (self )->Dict [str ,Any ]:
+        with self ._lock :
+            report :Dict [str ,Any ]=dict (self .counts )
+            report ["queued"]={name :len (queue )for name ,queue in self ._queues .items ()}
+        return report 
+
+
+def _wake (future :asyncio .Future )->None :
+    if not future .done ():
+        future .set_result (None )
+
+
+def estimate_tokens (prompt_tokens :int )->int :
+    return prompt_tokens +COMPLETION_TOKENS_ESTIMATE 
+
+
+_RATE_LIMITER :Optional [RateLimiter ]=None 
+_RATE_LIMITER_LOCK =threading .Lock ()
+
+
+def configure_rate_limiter (limiter :RateLimiter )->None :
+    global _RATE_LIMITER 
+    with _RATE_LIMITER_LOCK :
+        _RATE_LIMITER =limiter 
+
+
+def get_rate_limiter ()->RateLimiter :
+    global _RATE_LIMITER 
+    with _RATE_LIMITER_LOCK :
+        if _RATE_LIMITER is None :
+            _RATE_LIMITER =RateLimiter (
+            requests_per_second =float (os .getenv ("LLM_RATE_RPS","0")),
+            tokens_per_minute =float (os .getenv ("LLM_RATE_TPM","0")),
+            burst_seconds =float (os .getenv ("LLM_RATE_BURST","10")),
+            shared_path =os .getenv ("LLM_RATE_SHARED_PATH")or None ,
+            )
+        return _RATE_LIMITER 
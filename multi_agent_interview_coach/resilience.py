@@ -0,0 +1,339 @@
+from __future__ import annotations 
+
+import asyncio 
+import concurrent .futures 
+import os 
+import threading 
+import time 
+from collections import deque 
+from typing import Any ,Awaitable ,Callable ,Deque ,Dict ,Optional ,Set 
+
+from tenacity import (
+AsyncRetrying ,
+Retrying ,
+retry_if_exception ,
+stop_after_attempt ,
+stop_after_delay ,
+wait_random_exponential ,
+)
+
+
+RETRYABLE_STATUS ={408 ,409 ,425 ,429 ,500 ,502 ,503 ,504 }
+
+
+class LLMUnavailableError (RuntimeError ):
+    pass 
+
+
+class CircuitOpenError (LLMUnavailableError ):
+    pass 
+
+
+class LLMResponseError (RuntimeError ):
+    pass 
+
+
+def is_retryable (exc :BaseException )->bool :
+    if isinstance (exc ,LLMUnavailableError ):
+        return False 
+    if isinstance (exc ,(TimeoutError ,ConnectionError ,asyncio .TimeoutError ,concurrent .futures .TimeoutError )):
+        return True 
+    status =getattr (exc ,"status_code",None )
+    if status is None :
+        status =getattr (getattr (exc ,"response",None ),"status_code",None )
+    if isinstance (status ,int ):
+        return status in RETRYABLE_STATUS 
+    name =type (exc ).__name__ 
+    return "Timeout"in name or "Connect"in name or "Network"in name 
+
+
+class CircuitBreaker :
+
+    def __init__ (self ,failure_threshold :int =5 ,reset_seconds :float =30.0 )->None :
+        self .failure_threshold =failure_threshold 
+        self .reset_seconds =reset_seconds 
+        self .state ="closed"
+        self .failures =0 
+        self .opened =0 
+        self ._opened_at =0.0 
+        self ._lock =threading .Lock ()
+
+    def allow (self )->bool :
+        with self ._lock :
+            if self .state =="closed":
+                return True 
+            if time .monotonic ()-self ._opened_at <self .reset_seconds :
+                return False 
+            self .state ="half_open"
+            self ._opened_at =time .monotonic ()
+            return True 
+
+    def record_success (self )->None :
+        with self ._lock :
+            self .state ="closed"
+            self .failures =0 
+
+    def record_failure (self )->None :
+        with self ._lock :
+            self .failures +=1 
+            if self .state =="half_open"or self .failures >=self .failure_threshold :
+                if self .state !="open":
+                    self .opened +=1 
+                self .state ="open"
+                self ._opened_at =time .monotonic ()
+
+
+class LatencyWindow :
+
+    def __init__ (self ,size :int =200 )->None :
+        self ._samples :Deque [float ]=deque (maxlen =size )
+        self ._lock =threading .Lock ()
+
+    def add (self ,seconds :float )->None :
+        with self ._lock :
+            self ._samples .append (seconds )
+
+    def __len__ (self )->int :
+        return len (self ._samples )
+
+    def percentile (self ,q :float )->Optional [float ]:
+        with self ._lock :
+            ordered =sorted (self ._samples )
+        if not ordered :
+            return None 
+        return ordered [min (len (ordered )-1 ,int (q *len (ordered )))]
+
+
+_CALL_EXECUTOR :Optional [concurrent .futures .ThreadPoolExecutor ]=None 
+_EXECUTOR_LOCK =threading .Lock ()
+
+
+def get_call_executor ()->concurrent .futures .ThreadPoolExecutor :
+    global _CALL_EXECUTOR 
+    with _EXECUTOR_LOCK :
+        if _CALL_EXECUTOR is None :
+            _CALL_EXECUTOR =concurrent .futures .ThreadPoolExecutor (
+            max_workers =int (os .getenv ("LLM_CALL_WORKERS","16")),
+            thread_name_prefix ="llm-call",
+            )
+        return _CALL_EXECUTOR 
+
+
+class ResilientCaller :
+
+    def __init__ (
+    self ,
+    timeout_seconds :float =30.0 ,
+    deadline_seconds :float =90.0 ,
+    max_attempts :int =3 ,
+    backoff_initial :float =0.5 ,
+    backoff_max :float =8.0 ,
+    hedge :bool =True ,
+    hedge_quantile :float =0.95 ,
+    hedge_min_delay :float =0.5 ,
+    hedge_min_samples :int =20 ,
+    breaker :Optional [CircuitBreaker ]=None ,
+    )->None :
+        self .timeout_seconds =timeout_seconds 
+        self .deadline_seconds =deadline_seconds 
+        self .max_attempts =max_attempts 
+        self .backoff_initial =backoff_initial 
+        self .backoff_max =backoff_max 
+        self .hedge =hedge 
+        self .hedge_quantile =hedge_quantile 
+        self .hedge_min_delay =hedge_min_delay 
+        self .hedge_min_samples =hedge_min_samples 
+        self .breaker =breaker or CircuitBreaker ()
+        self ._latency :Dict [str ,LatencyWindow ]={}
+        self ._lock =threading .Lock ()
+        self .counts :Dict [str ,int ]={
+        "calls":0 ,
+        "retries":0 ,
+        "timeouts":0 ,
+        "hedges":0 ,
+        "hedge_wins":0 ,
+        "failures":0 ,
+        "rejected":0 ,
+        }
+
+    def _count (self ,name :str )->None :
+        with self ._lock :
+            self .counts [name ]+=1 
+
+    def _window (self ,model :str )->LatencyWindow :
+        with self ._lock :
+            return self ._latency .setdefault (model ,LatencyWindow ())
+
+    def hedge_delay (self ,model :str )->Optional [float ]:
+        if not self .hedge :
+            return None 
+        window =self ._window (model )
+        if len (window )<self .hedge_min_samples :
+            return None 
+        delay =window .percentile (self .hedge_quantile )
+        if delay is None :
+            return None 
+        delay =max (self .hedge_min_delay ,delay )
+        return delay if delay <self .timeout_seconds else None 
+
+    def _retrying_kwargs (self )->Dict [str ,Any ]:
+        return {
+        "stop":stop_after_attempt (self .max_attempts )|stop_after_delay (self .deadline_seconds ),
+        "wait":wait_random_exponential (multiplier =self .backoff_initial ,max =self .backoff_max ),
+        "retry":retry_if_exception (is_retryable ),
+        "before_sleep":lambda _state :self ._count ("retries"),
+        "reraise":True ,
+        }
+
+    def guard (self )->None :
+        if not self .breaker .allow ():
+            self ._count ("rejected")
+            raise CircuitOpenError ("LLM circuit breaker is open; skipping the call.")
+        self ._count ("calls")
+
+    def settle (self ,exc :Optional [BaseException ])->None :
+        if exc is None :
+            self .breaker .record_success ()
+            return 
+        if is_retryable (exc ):
+            self ._count ("failures")
+            self .breaker .record_failure ()
+            raise LLMUnavailableError (f"LLM call failed after retries: {exc!r}")from exc 
+        raise exc 
+
+    def call (self ,fn :Callable [[],str ],model :str )->str :
+        self .guard ()
+        try :
+            for attempt in Retrying (**self ._retrying_kwargs ()):
+                with attempt :
+                    result =self ._attempt (fn ,model )
+        except Exception as exc :
+            self .settle (exc )
+        self .settle (None )
+        return result 
+
+    async def acall (self ,fn :Callable [[],Awaitable [str ]],model :str )->str :
+        self .guard ()
+        try :
+            async for attempt in AsyncRetrying (**self ._retrying_kwargs ()):
+                with attempt :
+                    result =await self ._aattempt (fn ,model )
+        except Exception as exc :
+            self .settle (exc )
+        self .settle (None )
+        return result 
+
+    def _attempt (self ,fn :Callable [[],str ],model :str )->str :
+        executor =get_call_executor ()
+        started =time .monotonic ()
+        deadline =started +self .timeout_seconds 
+        delay =self .hedge_delay (model )
+        primary =executor .submit (fn )
+        pending :Set [concurrent .futures .Future ]={primary }
+        error :Optional [BaseException ]=None 
+        while pending :
+            now =time .monotonic ()
+            if now >=deadline :
+                break 
+            hedge_at =None if delay is None or len (pending )>1 or error is not None else started +delay 
+            timeout =deadline -now if hedge_at is None else max (0.0 ,min (deadline ,hedge_at )-now )
+            done ,pending =concurrent .futures .wait (
+            pending ,
+            timeout =timeout ,
+            return_when =concurrent .futures .FIRST_COMPLETED ,
+            )
+            for future in done :
+                exc =future .exception ()
+                if exc is None :
+                    for other in pending :
+                        other .cancel ()
+                    self ._finish (model ,started ,future is not primary )
+                    return future .result ()
+                error =exc 
+            if not pending and error is not None :
+                raise error 
+            if hedge_at is not None and time .monotonic ()>=hedge_at and pending :
+                self ._count ("hedges")
+                pending .add (executor .submit (fn ))
+        for future in pending :
+            future .cancel ()
+        self ._count ("timeouts")
+        raise TimeoutError (f"LLM call exceeded {self.timeout_seconds:.1f}s")
+
+    async def _aattempt (self ,fn :Callable [[],Awaitable [str ]],model :str )->str :
+        loop =asyncio .get_running_loop ()
+        started =loop .time ()
+        deadline =started +self .timeout_seconds 
+        delay =self .hedge_delay (model )
+        primary =asyncio .ensure_future (fn ())
+        pending :Set [asyncio .Future ]={primary }
+        error :Optional [BaseException ]=None 
+        try :
+            while pending :
+                now =loop .time ()
+                if now >=deadline :
+                    break 
+                hedge_at =None if delay is None or len (pending )>1 or error is not None else started +delay 
+                timeout =deadline -now if hedge_at is None else max (0.0 ,min (deadline ,hedge_at )-now )
+                done ,pending =await asyncio .wait (
+                pending ,
+                timeout =timeout ,
+                return_when =asyncio .FIRST_COMPLETED ,
+                )
+                for task in done :
+                    exc =task .exception ()
+                    if exc is None :
+                        self ._finish (model ,started ,task is not primary ,loop .time ())
+                        return task .result ()
+                    error =exc 
+                if not pending and error is not None :
+                    raise error 
+                if hedge_at is not None and loop .time ()>=hedge_at and pending :
+                    self ._count ("hedges")
+                    pending .add (asyncio .ensure_future (fn ()))
+        finally :
+            for task in pending :
+                task .cancel ()
+        self ._count ("timeouts")
+        raise TimeoutError (f"LLM call exceeded {self.timeout_seconds:.1f}s")
+
+    def _finish (self ,model :str ,started :float ,hedge_won :bool ,now :Optional [float ]=None )->None :
+        self ._window (model ).add ((time .monotonic ()if now is None else now )-started )
+        if hedge_won :
+            self ._count ("hedge_wins")
+
+    def stats (self )->Dict [str ,Any ]:
+        with self ._lock :
+            report :Dict [str ,Any ]=dict (self .counts )
+            models =list (self ._latency .items ())
+        report ["breaker_state"]=self .breaker .state 
+        report ["breaker_opened"]=self .breaker .opened 
+        report ["p95_by_model"]={model :window .percentile (0.95 )for model ,window in models }
+        return report 
+
+
+_RESILIENCE :Optional [ResilientCaller ]=None 
+_RESILIENCE_LOCK =threading .Lock ()
+
+
+def configure_resilience (caller :ResilientCaller )->None :
+    global _RESILIENCE 
+    with _RESILIENCE_LOCK :
+        _RESILIENCE =caller 
+
+
+def get_resilience ()->ResilientCaller :
+    global _RESILIENCE 
+    with _RESILIENCE_LOCK :
+        if _RESILIENCE is None :
+            _RESILIENCE =ResilientCaller (
+            timeout_seconds =float (os .getenv ("LLM_TIMEOUT","30")),
+            deadline_seconds =float (os .getenv ("LLM_DEADLINE","90")),
+            max_attempts =int (os .getenv ("LLM_MAX_ATTEMPTS","3")),
+            hedge =os .getenv ("LLM_HEDGE","1")!="0",
+            breaker =CircuitBreaker (
+            failure_threshold =int (os .getenv ("LLM_BREAKER_FAILURES","5")),
+            reset_seconds =float (os .getenv ("LLM_BREAKER_RESET","30")),
+            ),
+            )
+        return _RESILIENCE 
@@ -0,0 +1,114 @@
+from __future__ import annotations 
+
+import os 
+import threading 
+from typing import Any ,Dict ,List ,Optional 
+
+
+CALL_KINDS =("intro","profile","question","evaluation","role_reversal")
+
+
+def _default_model ()->str :
+    return os .getenv ("MISTRAL_MODEL","mistral-medium-latest")
+
+
+def _small_model ()->str :
+    return os .getenv ("MISTRAL_SMALL_MODEL","mistral-small-latest")
+
+
+def _policy_from_env ()->Dict [str ,List [str ]]:
+    defaults ={
+    "intro":[_small_model ()],
+    "profile":[_default_model ()],
+    "question":[_default_model ()],
+    "evaluation":[_small_model (),_default_model ()],
+    "role_reversal":[_small_model ()],
+    }
+    policy :Dict [str ,List [str ]]={}
+    for kind in CALL_KINDS :
+        raw =os .getenv (f"MISTRAL_MODEL_{kind.upper()}")
+        models =[m .strip ()for m in raw .split (",")if m .strip ()]if raw else defaults [kind ]
+        deduped :List [str ]=[]
+        for model in models :
+            if model not in deduped :
+                deduped .append (model )
+        policy [kind ]=deduped 
+    return policy 
+
+
+class ModelRouter :
+
+    def __init__ (
+    self ,
+    policy :Optional [Dict [str ,List [str ]]]=None ,
+    escalation_confidence :int =70 ,
+    )->None :
+        self .policy =policy if policy is not None else _policy_from_env ()
+        self .escalation_confidence =escalation_confidence 
+        self ._lock =threading .Lock ()
+        self ._tiers :Dict [str ,Dict [str ,Dict [str ,float ]]]={}
+
+    def tiers (self ,kind :Optional [str ])->List [str ]:
+        models =self .policy .get (kind or "",[])
+        return list (models )if models else [_default_model ()]
+
+    def model_for (self ,kind :Optional [str ])->str :
+        return self .tiers (kind )[0 ]
+
+    def _entry (self ,kind :Optional [str ],model :str )->Dict [str ,float ]:
+        per_kind =self ._tiers .setdefault (kind or "other",{})
+        return per_kind .setdefault (
+        model ,
+        {"calls":0 ,"graded":0 ,"escalations":0 ,"latency_total":0.0 ,"latency_max":0.0 },
+        )
+
+    def record_call (self ,kind :Optional [str ],model :str ,seconds :float )->None :
+        with self ._lock :
+            entry =self ._entry (kind ,model )
+            entry ["calls"]+=1 
+            entry ["latency_total"]+=seconds 
+            entry ["latency_max"]=max (entry ["latency_max"],seconds )
+
+    def record_grade (self ,kind :Optional [str ],model :str ,escalated :bool )->None :
+        with self ._lock :
+            entry =self ._entry (kind ,model )
+            entry ["graded"]+=1 
+            if escalated :
+                entry ["escalations"]+=1 
+
+    def stats (self )->Dict [str ,Any ]:
+        with self ._lock :
+            report :Dict [str ,Any ]={}
+            for kind ,models in self ._tiers .items ():
+                report [kind ]={
+                model :{
+                "calls":int (entry ["calls"]),
+                "graded":int (entry ["graded"]),
+                "escalations":int (entry ["escalations"]),
+                "escalation_rate":entry ["escalations"]/entry ["graded"]if entry ["graded"]else 0.0 ,
+                "latency_avg":entry ["latency_total"]/entry ["calls"]if entry ["calls"]else 0.0 ,
+                "latency_max":entry ["latency_max"],
+                }
+                for model ,entry in models .items ()
+                }
+            return report 
+
+
+_MODEL_ROUTER :Optional [ModelRouter ]=None 
+_ROUTER_LOCK =threading .Lock ()
+
+
+def configure_model_router (router :ModelRouter )->None :
+    global _MODEL_ROUTER 
+    with _ROUTER_LOCK :
+        _MODEL_ROUTER =router 
+
+
+def get_model_router ()->ModelRouter :
+    global _MODEL_ROUTER 
+    with _ROUTER_LOCK :
+        if _MODEL_ROUTER is None :
+            _MODEL_ROUTER =ModelRouter (
+            escalation_confidence =int (os .getenv ("MISTRAL_ESCALATION_CONFIDENCE","70")),
+            )
+        return _MODEL_ROUTER 
@@ -0,0 +1,117 @@
+from __future__ import annotations 
+
+import json 
+import os 
+import re 
+import threading 
+from pathlib import Path 
+from typing import Any ,Dict ,Iterable ,List ,Optional ,Pattern ,Tuple 
+
+
+DEFAULT_RULES_PATH =Path (__file__ ).with_name ("rules.json")
+
+
+def _trie_pattern (words :Iterable [str ])->str :
+    trie :Dict [str ,Any ]={}
+    for word in words :
+        if not word :
+            continue 
+        node =trie 
+        for ch in word :
+            node =node .setdefault (ch ,{})
+        node [""]={}
+
+    def build (node :Dict [str ,Any ])->str :
+        terminal =""in node 
+        branches =[re .escape (ch )+build (child )for ch ,child in sorted (node .items ())if ch !=""]
+        if not branches :
+            return ""
+        if len (branches )==1 and not terminal :
+            return branches [0 ]
+        body ="(?:"+"|".join (branches )+")"
+        return body +"?"if terminal else body 
+
+    return build (trie )
+
+
+class RuleEngine :
+
+    def __init__ (self ,rules :Dict [str ,Dict [str ,Any ]])->None :
+        self .categories :List [str ]=list (rules )
+        self ._sources :Dict [str ,str ]={}
+        self ._prefixes :Dict [str ,Pattern [str ]]={}
+        for category ,spec in rules .items ():
+            alternatives :List [str ]=[]
+            keywords =[kw .lower ()for kw in spec .get ("keywords",[])]
+            if keywords :
+                trie =_trie_pattern (keywords )
+                alternatives .append (rf"(?<!\w)(?:{trie})(?!\w)"if spec .get ("whole_words")else trie )
+            alternatives .extend (spec .get ("patterns",[]))
+            if alternatives :
+                self ._sources [category ]="|".join (f"(?:{alt})"for alt in alternatives )
+            prefixes =[p .lower ()for p in spec .get ("prefixes",[])]
+            if prefixes :
+                self ._prefixes [category ]=re .compile ("^"+_trie_pattern (prefixes ))
+        self ._compiled :Dict [Tuple [str ,...],Tuple [Pattern [str ],Dict [str ,str ]]]={}
+        self ._lock =threading .Lock ()
+
+    @classmethod 
+    def from_file (cls ,path :str |Path )->"RuleEngine":
+        with open (path ,"r",encoding ="utf-8")as f :
+            return cls (json .load (f ))
+
+    def _combined (self ,categories :Tuple [str ,...])->Tuple [Pattern [str ],Dict [str ,str ]]:
+        compiled =self ._compiled .get (categories )
+        if compiled is not None :
+            return compiled 
+        with self ._lock :
+            compiled =self ._compiled .get (categories )
+            if compiled is None :
+                groups :Dict [str ,str ]={}
+                parts :List [str ]=[]
+                for idx ,category in enumerate (categories ):
+                    source =self ._sources .get (category )
+                    if source is None :
+                        continue 
+                    name =f"r{idx}"
+                    groups [name ]=category 
+                    parts .append (f"(?P<{name}>{source})")
+                pattern =re .compile ("|".join (parts )if parts else r"(?!)")
+                compiled =(pattern ,groups )
+                self ._compiled [categories ]=compiled 
+            return compiled 
+
+    def classify (self ,text :str ,categories :Iterable [str ])->Optional [str ]:
+        ordered =tuple (categories )
+        pattern ,groups =self ._combined (ordered )
+        best :Optional [int ]=None 
+        for match in pattern .finditer (text ):
+            rank =ordered .index (groups [match .lastgroup ])
+            if best is None or rank <best :
+                best =rank 
+                if rank ==0 :
+                    break 
+        return ordered [best ]if best is not None else None 
+
+    def matches (self ,text :str ,category :str )->bool :
+        return self .classify (text ,(category ,))is not None 
+
+    def strip (self ,text :str ,categories :Iterable [str ])->str :
+        pattern ,_ =self ._combined (tuple (categories ))
+        return pattern .sub (" ",text )
+
+    def starts_with (self ,text :str ,category :str )->bool :
+        prefix =self ._prefixes .get (category )
+        return bool (prefix is not None and prefix .match (text ))
+
+
+_RULE_ENGINE :Optional [RuleEngine ]=None 
+_RULES_LOCK =threading .Lock ()
+
+
+def get_rule_engine ()->RuleEngine :
+    global _RULE_ENGINE 
+    with _RULES_LOCK :
+        if _RULE_ENGINE is None :
+            _RULE_ENGINE =RuleEngine .from_file (os .getenv ("INTERVIEW_RULES_PATH")or DEFAULT_RULES_PATH )
+        return _RULE_ENGINE 
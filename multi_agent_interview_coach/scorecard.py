@@ -0,0 +1,155 @@
+from __future__ import annotations 
+
+import math 
+from array import array 
+from typing import Any ,Dict ,Optional 
+
+
+SCORED_RESULTS =("correct","partial","incorrect")
+ADMISSION_PHRASES =("не знаю","затрудняюсь","не уверен")
+
+
+class Scorecard :
+
+    def __init__ (self )->None :
+        self .reset ()
+
+    def reset (self )->None :
+        self .result_counts :Dict [str ,int ]={}
+        self .topics :Dict [str ,Dict [str ,int ]]={}
+        self .scored =0 
+        self .score =0.0 
+        self .difficulty_sum =0 
+        self .confidence_sum =0 
+        self .words_sum =0 
+        self .words_sq_sum =0 
+        self .words_min :Optional [int ]=None 
+        self .words_max =0 
+        self .admitted_gap =False 
+        self .confirmed_rows =array ("i")
+        self .gap_rows =array ("i")
+        self .gap_topics :Dict [str ,int ]={}
+
+    def add (
+    self ,
+    row :int ,
+    topic :str ,
+    result :str ,
+    difficulty :int ,
+    confidence :int ,
+    candidate_answer :str ,
+    )->None :
+        self .result_counts [result ]=self .result_counts .get (result ,0 )+1 
+        per_topic =self .topics .setdefault (topic ,{})
+        per_topic [result ]=per_topic .get (result ,0 )+1 
+        if result not in SCORED_RESULTS :
+            return 
+        self .scored +=1 
+        self .difficulty_sum +=difficulty 
+        self .confidence_sum +=confidence 
+        words =len (candidate_answer .split ())
+        self .words_sum +=words 
+        self .words_sq_sum +=words *words 
+        self .words_min =words if self .words_min is None else min (self .words_min ,words )
+        self .words_max =max (self .words_max ,words )
+        if result =="correct":
+            self .score +=1.0 
+            self .confirmed_rows .append (row )
+            return 
+        if result =="partial":
+            self .score +=0.5 
+        self .gap_rows .append (row )
+        self .gap_topics .setdefault (topic ,row )
+        if not self .admitted_gap :
+            lowered =candidate_answer .lower ()
+            self .admitted_gap =any (phrase in lowered for phrase in ADMISSION_PHRASES )
+
+    def count (self ,result :str )->int :
+        return self .result_counts .get (result ,0 )
+
+    def words (self )->Dict [str ,Any ]:
+        if not self .scored :
+            return {"count":0 ,"mean":0.0 ,"std":0.0 ,"min":0 ,"max":0 }
+        mean =self .words_sum /self .scored 
+        variance =max (0.0 ,self .words_sq_sum /self .scored -mean *mean )
+        return {
+        "count":self .scored ,
+        "mean":mean ,
+        "std":math .sqrt (variance ),
+        "min":self .words_min ,
+        "max":self .words_max ,
+        }
+
+    def clarity_label (self )->str :
+        if not self .scored :
+            return "Недостаточно данных"
+        avg_words =self .words_sum /self .scored 
+        if avg_words >=20 :
+            return "Высокая"
+        if avg_words >=8 :
+            return "Средняя"
+        return "Низкая"
+
+    def honesty_label (self )->str :
+        if self .count ("hallucination"):
+            return "Есть сомнительные/ложные утверждения"
+        if self .admitted_gap :
+            return "Честно признавал незнание"
+        return "Нейтральная"
+
+    def engagement_label (self )->str :
+        return "Задавал встречные вопросы"if self .count ("role_reversal")else "Нейтральная"
+
+    def snapshot (self ,default_grade :str ="Junior",default_difficulty :int =1 )->Dict [str ,Any ]:
+        total =self .scored 
+        hallucinations =self .count ("hallucination")
+        accuracy =self .score /total if total else 0.0 
+        avg_difficulty =self .difficulty_sum /total if total else default_difficulty 
+        avg_confidence =self .confidence_sum /total if total else 0 
+
+        grade =default_grade 
+        if total :
+            if avg_difficulty >=3 and accuracy >=0.8 :
+                grade ="Senior"
+            elif avg_difficulty >=2 and accuracy >=0.65 :
+                grade ="Middle"
+            else :
+                grade ="Junior"
+
+        if total ==0 :
+            hire_reco ="No Hire"
+        elif accuracy >=0.85 and not hallucinations :
+            hire_reco ="Strong Hire"
+        elif accuracy >=0.65 and hallucinations <=1 :
+            hire_reco ="Hire"
+        else :
+            hire_reco ="No Hire"
+
+        confidence =(
+        30 
+        +total *5 
+        +int (accuracy *50 )
+        +int ((avg_difficulty -1 )*10 )
+        +int (avg_confidence *0.2 )
+        )
+        confidence -=hallucinations *10 
+        if total ==0 :
+            confidence =20 
+        confidence =max (20 ,min (90 ,confidence ))
+
+        return {
+        "grade":grade ,
+        "hire_recommendation":hire_reco ,
+        "confidence":confidence ,
+        "accuracy":accuracy ,
+        "scored":total ,
+        "avg_difficulty":avg_difficulty ,
+        "avg_confidence":avg_confidence ,
+        "clarity":self .clarity_label (),
+        "honesty":self .honesty_label (),
+        "engagement":self .engagement_label (),
+        "off_topic":bool (self .count ("off_topic")),
+        "result_counts":dict (self .result_counts ),
+        "topics":{topic :dict (counts )for topic ,counts in self .topics .items ()},
+        "words":self .words (),
+        }
@@ -0,0 +1,220 @@
+from __future__ import annotations 
+
+import json 
+import os 
+import re 
+import sys 
+import threading 
+from typing import Any ,Dict ,Iterable ,List ,Optional ,Set ,Tuple 
+
+from .rules import RuleEngine ,get_rule_engine 
+
+
+_WORD_RE =re .compile (r"\w+",re .UNICODE )
+RULE_PRIORS ={"empty":95 ,"dont_know":90 ,"match":95 }
+PRIOR_WEIGHT =10 
+
+
+def _stems (text :str )->Set [str ]:
+    return {word [:5 ]for word in _WORD_RE .findall (text .lower ())if len (word )>2 }
+
+
+def _char_ngrams (text :str ,n :int )->Set [str ]:
+    compact =" ".join (_WORD_RE .findall (text .lower ()))
+    if len (compact )<n :
+        return {compact }if compact else set ()
+    return {compact [i :i +n ]for i in range (len (compact )-n +1 )}
+
+
+class LexicalScorer :
+
+    def __init__ (
+    self ,
+    correct_threshold :float =0.75 ,
+    ngram :int =3 ,
+    dont_know_max_words :int =8 ,
+    min_confidence :int =70 ,
+    shadow_mode :bool =False ,
+    rules :Optional [RuleEngine ]=None ,
+    )->None :
+        self .correct_threshold =correct_threshold 
+        self .ngram =ngram 
+        self .dont_know_max_words =dont_know_max_words 
+        self .min_confidence =min_confidence 
+        self .shadow_mode =shadow_mode 
+        self .rules =rules or get_rule_engine ()
+        self ._lock =threading .Lock ()
+        self .counts :Dict [str ,int ]={"correct":0 ,"incorrect":0 ,"ambiguous":0 }
+        self .shadow_counts :Dict [str ,int ]={"agree":0 ,"disagree":0 }
+        self .agreement :Dict [str ,Dict [str ,int ]]={rule :{"decided":0 ,"agree":0 }for rule in RULE_PRIORS }
+
+    def similarity (self ,expected :str ,answer :str )->Dict [str ,float ]:
+        expected_stems =_stems (expected )
+        answer_stems =_stems (answer )
+        recall =len (expected_stems &answer_stems )/len (expected_stems )if expected_stems else 0.0 
+        expected_grams =_char_ngrams (expected ,self .ngram )
+        answer_grams =_char_ngrams (answer ,self .ngram )
+        total =len (expected_grams )+len (answer_grams )
+        dice =2 *len (expected_grams &answer_grams )/total if total else 0.0 
+        return {"token_recall":recall ,"char_dice":dice ,"combined":0.5 *recall +0.5 *dice }
+
+    def _bare_admission (self ,answer_norm :str )->bool :
+        if not self .rules .matches (answer_norm ,"dont_know"):
+            return False 
+        residue =self .rules .strip (answer_norm ,("dont_know","filler"))
+        return not any (len (word )>2 for word in _WORD_RE .findall (residue ))
+
+    def _decide (self ,expected :str ,candidate_answer :str )->Optional [Tuple [str ,str ,str ,float ]]:
+        answer_norm =candidate_answer .strip ().lower ()
+        words =_WORD_RE .findall (answer_norm )
+        if not words :
+            return "empty","incorrect","Кандидат не дал ответа.",1.0 
+        if len (words )<=self .dont_know_max_words and self ._bare_admission (answer_norm ):
+            return "dont_know","incorrect","Кандидат признал, что не знает ответа.",1.0 
+        if not expected .strip ():
+            return None 
+        combined =self .similarity (expected ,candidate_answer )["combined"]
+        if combined >=self .correct_threshold :
+            headroom =(combined -self .correct_threshold )/max (1e-9 ,1.0 -self .correct_threshold )
+            return "match","correct","Ответ практически совпадает с ожидаемым.",min (1.0 ,headroom )
+        return None 
+
+    def rule_confidence (self ,rule :str )->int :
+        with self ._lock :
+            bucket =self .agreement [rule ]
+            agree =bucket ["agree"]+PRIOR_WEIGHT *RULE_PRIORS [rule ]/100 
+            return int (round (100 *agree /(bucket ["decided"]+PRIOR_WEIGHT )))
+
+    def load_agreement (self ,report :Dict [str ,Any ])->None :
+        with self ._lock :
+            for rule ,bucket in report .get ("by_rule",{}).items ():
+                if rule in self .agreement :
+                    self .agreement [rule ]={"decided":int (bucket ["decided"]),"agree":int (bucket ["agree"])}
+
+    def predict (self ,expected :str ,candidate_answer :str )->Optional [Dict [str ,Any ]]:
+        decision =self ._decide (expected ,candidate_answer )
+        if decision is None :
+            return None 
+        rule ,result ,reason ,headroom =decision 
+        confidence =self .rule_confidence (rule )-int (round (20 *(1.0 -headroom )))
+        return {"result":result ,"reason":reason ,"confidence":max (0 ,confidence )}
+
+    def fallback_verdict (self ,expected :str ,candidate_answer :str )->Dict [str ,Any ]:
+        verdict =self .predict (expected ,candidate_answer )
+        if verdict is not None :
+            return verdict 
+        combined =self .similarity (expected ,candidate_answer )["combined"]if expected .strip ()else 0.5 
+        return {
+        "result":"partial"if combined >=self .correct_threshold /2 else "incorrect",
+        "reason":"Модель недоступна; ответ оценён локально по совпадению с ожидаемым.",
+        "confidence":30 ,
+        }
+
+    def score (self ,expected :str ,candidate_answer :str )->Optional [Dict [str ,Any ]]:
+        verdict =self .predict (expected ,candidate_answer )
+        if verdict is not None and verdict ["confidence"]<self .min_confidence :
+            verdict =None 
+        with self ._lock :
+            self .counts [verdict ["result"]if verdict else "ambiguous"]+=1 
+        return verdict 
+
+    def record_shadow (self ,expected :str ,candidate_answer :str ,llm_result :str )->None :
+        decision =self ._decide (expected ,candidate_answer )
+        if decision is None :
+            return 
+        rule ,result =decision [0 ],decision [1 ]
+        with self ._lock :
+            self .shadow_counts ["agree"if result ==llm_result else "disagree"]+=1 
+            self .agreement [rule ]["decided"]+=1 
+            self .agreement [rule ]["agree"]+=result ==llm_result 
+
+    def stats (self )->Dict [str ,Any ]:
+        with self ._lock :
+            total =sum (self .counts .values ())
+            compared =self .shadow_counts ["agree"]+self .shadow_counts ["disagree"]
+            return {
+            **self .counts ,
+            "short_circuit_rate":(total -self .counts ["ambiguous"])/total if total else 0.0 ,
+            "shadow_compared":compared ,
+            "shadow_agreement":self .shadow_counts ["agree"]/compared if compared else 0.0 ,
+            "rule_agreement":{rule :dict (bucket )for rule ,bucket in self .agreement .items ()},
+            }
+
+
+def measure_agreement (records :Iterable [Dict [str ,Any ]],scorer :Optional [LexicalScorer ]=None )->Dict [str ,Any ]:
+    scorer =scorer or LexicalScorer ()
+    report :Dict [str ,Any ]={"records":0 ,"decided":0 ,"agree":0 ,"by_verdict":{},"by_rule":{}}
+    disagreements :List [Dict [str ,Any ]]=[]
+    for record in records :
+        llm_result =record .get ("result")
+        if llm_result not in ("correct","partial","incorrect"):
+            continue 
+        report ["records"]+=1 
+        decision =scorer ._decide (record .get ("correct_answer",""),record .get ("candidate_answer",""))
+        if decision is None :
+            continue 
+        rule ,result =decision [0 ],decision [1 ]
+        report ["decided"]+=1 
+        buckets =[
+        report ["by_verdict"].setdefault (result ,{"decided":0 ,"agree":0 }),
+        report ["by_rule"].setdefault (rule ,{"decided":0 ,"agree":0 }),
+        ]
+        for bucket in buckets :
+            bucket ["decided"]+=1 
+        if result ==llm_result :
+            report ["agree"]+=1 
+            for bucket in buckets :
+                bucket ["agree"]+=1 
+        elif len (disagreements )<20 :
+            disagreements .append ({**record ,"lexical_result":result ,"lexical_rule":rule })
+    report ["coverage"]=report ["decided"]/report ["records"]if report ["records"]else 0.0 
+    report ["agreement"]=report ["agree"]/report ["decided"]if report ["decided"]else 0.0 
+    report ["disagreements"]=disagreements 
+    return report 
+
+
+_LEXICAL_SCORER :Optional [LexicalScorer ]=None 
+_SCORER_CONFIGURED =False 
+_SCORER_LOCK =threading .Lock ()
+
+
+def get_lexical_scorer ()->Optional [LexicalScorer ]:
+    global _LEXICAL_SCORER ,_SCORER_CONFIGURED 
+    with _SCORER_LOCK :
+        if not _SCORER_CONFIGURED :
+            if os .getenv ("INTERVIEW_LEXICAL_SCORER","1")!="0":
+                _LEXICAL_SCORER =LexicalScorer (
+                correct_threshold =float (os .getenv ("INTERVIEW_LEXICAL_THRESHOLD","0.75")),
+                min_confidence =int (os .getenv ("INTERVIEW_LEXICAL_MIN_CONFIDENCE","70")),
+                shadow_mode =os .getenv ("INTERVIEW_LEXICAL_SHADOW","0")=="1",
+                )
+                agreement_path =os .getenv ("INTERVIEW_LEXICAL_AGREEMENT")
+                if agreement_path and os .path .exists (agreement_path ):
+                    with open (agreement_path ,"r",encoding ="utf-8")as f :
+                        _LEXICAL_SCORER .load_agreement (json .load (f ))
+            _SCORER_CONFIGURED =True 
+        return _LEXICAL_SCORER 
+
+
+def _read_records (path :str )->Iterable [Dict [str ,Any ]]:
+    with open (path ,"r",encoding ="utf-8")as f :
+        if path .endswith (".jsonl"):
+            for line in f :
+                if line .strip ():
+                    yield json .loads (line )
+        else :
+            data =json .load (f )
+            yield from data .get ("evaluations",[])if isinstance (data ,dict )else data 
+
+
+def main ()->None :
+    if len (sys .argv )<2 :
+        print ("Usage: python -m multi_agent_interview_coach.scoring <evaluations.jsonl|.json> [...]")
+        raise SystemExit (2 )
+    records =(record for path in sys .argv [1 :]for record in _read_records (path ))
+    report =measure_agreement (records )
+    print (json .dumps (report ,ensure_ascii =False ,indent =2 ))
+
+
+if __name__ =="__main__":
+    main ()
@@ -0,0 +1,550 @@
+from __future__ import annotations 
+
+import asyncio 
+import contextlib 
+import json 
+import os 
+import signal 
+import sys 
+import uuid 
+from pathlib import Path 
+from typing import Any ,AsyncIterator ,Dict ,List ,Optional ,Set ,Tuple 
+
+from .estimator import ESTIMATORS 
+from .main import InterviewSession ,run_blocking 
+from .metrics import get_metrics 
+from .question_bank import QuestionBank ,get_question_bank 
+from .ratelimit import get_rate_limiter 
+from .session_store import SessionStore 
+
+
+_STATUS_TEXT ={
+200 :"OK",
+201 :"Created",
+204 :"No Content",
+400 :"Bad Request",
+404 :"Not Found",
+405 :"Method Not Allowed",
+408 :"Request Timeout",
+409 :"Conflict",
+410 :"Gone",
+413 :"Payload Too Large",
+500 :"Internal Server Error",
+503 :"Service Unavailable",
+}
+
+
+class HTTPError (Exception ):
+
+    def __init__ (self ,status :int ,message :str ,headers :Optional [Dict [str ,str ]]=None )->None :
+        super ().__init__ (message )
+        self .status =status 
+        self .message =message 
+        self .headers =headers or {}
+
+
+def _response (
+status :int ,
+payload :Any ,
+content_type :str ="application/json; charset=utf-8",
+headers :Optional [Dict [str ,str ]]=None ,
+)->bytes :
+    if isinstance (payload ,(bytes ,str )):
+        body =payload .encode ("utf-8")if isinstance (payload ,str )else payload 
+    else :
+        body =json .dumps (payload ,ensure_ascii =False ).encode ("utf-8")
+    lines =[
+    f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, 'OK')}",
+    f"Content-Type: {content_type}",
+    f"Content-Length: {len(body)}",
+    "Connection: close",
+    ]
+    lines .extend (f"{k}: {v}"for k ,v in (headers or {}).items ())
+    return ("\r\n".join (lines )+"\r\n\r\n").encode ("latin-1")+body 
+
+
+def _flag (body :Dict [str ,Any ],name :str ,default :bool )->bool :
+    value =body .get (name ,default )
+    if isinstance (value ,bool ):
+        return value 
+    text =str (value ).strip ().lower ()
+    if text in ("1","true","yes","on"):
+        return True 
+    if text in ("0","false","no","off",""):
+        return False 
+    raise HTTPError (400 ,f"Field '{name}' must be a boolean.")
+
+
+def _sse (event :str ,data :Any )->bytes :
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode ("utf-8")
+
+
+class SessionHandle :
+
+    def __init__ (self ,session_id :str ,subscriber_queue :int )->None :
+        self .id =session_id 
+        self .turn_id =1 
+        self .lock =asyncio .Lock ()
+        self .subscriber_queue =subscriber_queue 
+        self .subscribers :Set [asyncio .Queue ]=set ()
+        self .last_active =asyncio .get_running_loop ().time ()
+        self .finished =False 
+        self .final_report :Optional [str ]=None 
+        self .question =""
+
+    def touch (self )->None :
+        self .last_active =asyncio .get_running_loop ().time ()
+
+    def subscribe (self )->asyncio .Queue :
+        queue :asyncio .Queue =asyncio .Queue (maxsize =self .subscriber_queue )
+        self .subscribers .add (queue )
+        return queue 
+
+    def publish (self ,event :str ,data :Any )->None :
+        for queue in list (self .subscribers ):
+            try :
+                queue .put_nowait ((event ,data ))
+            except asyncio .QueueFull :
+                self .subscribers .discard (queue )
+                while not queue .empty ():
+                    queue .get_nowait ()
+                queue .put_nowait (None )
+
+    def close_subscribers (self ,reason :str )->None :
+        self .publish ("closed",{"reason":reason })
+        for queue in list (self .subscribers ):
+            self .subscribers .discard (queue )
+            with contextlib .suppress (asyncio .QueueFull ):
+                queue .put_nowait (None )
+
+
+class InterviewServer :
+
+    def __init__ (
+    self ,
+    host :str ="127.0.0.1",
+    port :int =8080 ,
+    max_sessions :int =1000 ,
+    max_inflight :int =64 ,
+    max_pending :int =256 ,
+    idle_timeout :float =900.0 ,
+    drain_timeout :float =30.0 ,
+    header_timeout :float =10.0 ,
+    max_body :int =64 *1024 ,
+    subscriber_queue :int =256 ,
+    keepalive_seconds :float =15.0 ,
+    write_timeout :float =30.0 ,
+    log_dir :Optional [str ]="interview_logs",
+    checkpoint_dir :Optional [str ]=None ,
+    spill_dir :str ="interview_spill",
+    memory_budget :int =256 *1024 *1024 ,
+    question_bank :Optional [QuestionBank ]=None ,
+    fused :bool =False ,
+    prefetch :bool =False ,
+    estimator :str ="parity",
+    early_stop :bool =False ,
+    )->None :
+        self .host =host 
+        self .port =port 
+        self .max_sessions =max_sessions 
+        self .max_inflight =max_inflight 
+        self .max_pending =max_pending 
+        self .idle_timeout =idle_timeout 
+        self .drain_timeout =drain_timeout 
+        self .header_timeout =header_timeout 
+        self .max_body =max_body 
+        self .subscriber_queue =subscriber_queue 
+        self .keepalive_seconds =keepalive_seconds 
+        self .write_timeout =write_timeout 
+        self .log_dir =log_dir 
+        self .checkpoint_dir =checkpoint_dir 
+        self .question_bank =question_bank 
+        self .fused =fused 
+        self .prefetch =prefetch 
+        self .estimator =estimator 
+        self .early_stop =early_stop 
+        self .sessions :Dict [str ,SessionHandle ]={}
+        self .store =SessionStore (spill_dir ,memory_budget ,question_bank )
+        self .draining =False 
+        self ._server :Optional [asyncio .AbstractServer ]=None 
+        self ._reaper :Optional [asyncio .Task ]=None 
+        self ._resumes :List [asyncio .Task ]=[]
+        self ._inflight :Optional [asyncio .Semaphore ]=None 
+        self ._waiting =0 
+        self ._active =0 
+        self .counts :Dict [str ,int ]={"requests":0 ,"rejected":0 ,"expired":0 ,"finished":0 }
+
+    async def start (self )->None :
+        self ._inflight =asyncio .Semaphore (self .max_inflight )
+        if self .checkpoint_dir :
+            self ._resume_checkpoints ()
+        self ._server =await asyncio .start_server (self ._handle_connection ,self .host ,self .port )
+        self ._reaper =asyncio .create_task (self ._reap_idle ())
+
+    def _resume_checkpoints (self )->None :
+        for path in sorted (Path (self .checkpoint_dir ).glob ("*.ckpt")):
+            session =InterviewSession .resume (str (path ),question_bank =self .question_bank ,resume_question =False )
+            if session is not None :
+                handle =SessionHandle (path .stem ,self .subscriber_queue )
+                handle .question =session .current_visible_message 
+                handle .turn_id =session .turn_id 
+                self .sessions [path .stem ]=handle 
+                self .store .put (path .stem ,session ,pinned =False )
+                if not session .awaiting_answer :
+                    self ._resumes .append (asyncio .create_task (self ._resume_turn (handle )))
+
+    async def _resume_turn (self ,handle :SessionHandle )->None :
+        async with handle .lock :
+            if handle .finished :
+                return 
+            try :
+                async with self ._slot ():
+                    async with self ._session (handle )as session :
+                        settled =session .should_stop ()
+                        if not settled :
+                            await self ._next_question (handle ,session )
+                if settled :
+                    await self ._finish (handle ,"settled",locked =True )
+            except Exception as e :
+                print (f"Could not resume session {handle.id}: {type(e).__name__}: {e}",file =sys .stderr )
+
+    @property 
+    def sockets (self )->List [Any ]:
+        return list (self ._server .sockets )if self ._server is not None else []
+
+    @contextlib .asynccontextmanager 
+    async def _session (self ,handle :SessionHandle )->AsyncIterator [InterviewSession ]:
+        session =await run_blocking (self .store .acquire ,handle .id )
+        try :
+            yield session 
+        finally :
+            handle .turn_id =session .turn_id 
+            await run_blocking (self .store .release ,handle .id )
+
+    @contextlib .asynccontextmanager 
+    async def _slot (self )->AsyncIterator [None ]:
+        if self ._waiting >=self .max_pending :
+            self .counts ["rejected"]+=1 
+            raise HTTPError (503 ,"Server is overloaded, retry later.",{"Retry-After":"1"})
+        self ._waiting +=1 
+        try :
+            await self ._inflight .acquire ()
+        finally :
+            self ._waiting -=1 
+        self ._active +=1 
+        try :
+            yield 
+        finally :
+            self ._active -=1 
+            self ._inflight .release ()
+
+    async def _handle_connection (self ,reader :asyncio .StreamReader ,writer :asyncio .StreamWriter )->None :
+        try :
+            try :
+                method ,path ,body =await asyncio .wait_for (self ._read_request (reader ),self .header_timeout )
+            except asyncio .TimeoutError :
+                raise HTTPError (408 ,"Request timed out.")
+            self .counts ["requests"]+=1 
+            if method =="GET"and path .startswith ("/sessions/")and path .endswith ("/events"):
+                await self ._stream_events (self ._handle (path .split ("/")[2 ]),writer )
+                return 
+            status ,payload ,content_type =await self ._route (method ,path ,body )
+            writer .write (_response (status ,payload ,content_type ))
+        except HTTPError as e :
+            writer .write (_response (e .status ,{"error":e .message },headers =e .headers ))
+        except (ConnectionError ,asyncio .IncompleteReadError ):
+            return 
+        except Exception as e :
+            writer .write (_response (500 ,{"error":f"{type(e).__name__}: {e}"}))
+        finally :
+            with contextlib .suppress (Exception ):
+                await writer .drain ()
+                writer .close ()
+
+    async def _read_request (self ,reader :asyncio .StreamReader )->Tuple [str ,str ,Dict [str ,Any ]]:
+        request_line =(await reader .readline ()).decode ("latin-1").strip ()
+        parts =request_line .split ()
+        if len (parts )<2 :
+            raise HTTPError (400 ,"Malformed request line.")
+        method ,path =parts [0 ].upper (),parts [1 ].split ("?",1 )[0 ]
+        headers :Dict [str ,str ]={}
+        while True :
+            line =(await reader .readline ()).decode ("latin-1")
+            if line in ("\r\n","\n",""):
+                break 
+            name ,_ ,value =line .partition (":")
+            headers [name .strip ().lower ()]=value .strip ()
+        length =int (headers .get ("content-length","0")or 0 )
+        if length >self .max_body :
+            raise HTTPError (413 ,"Request body is too large.")
+        body :Dict [str ,Any ]={}
+        if length :
+            try :
+                body =json .loads ((await reader .readexactly (length )).decode ("utf-8"))
+            except (ValueError ,UnicodeDecodeError ):
+                raise HTTPError (400 ,"Body must be a JSON object.")
+            if not isinstance (body ,dict ):
+                raise HTTPError (400 ,"Body must be a JSON object.")
+        return method ,path ,body 
+
+    async def _route (self ,method :str ,path :str ,body :Dict [str ,Any ])->Tuple [int ,Any ,str ]:
+        json_type ="application/json; charset=utf-8"
+        if path =="/healthz":
+            return (503 if self .draining else 200 ),{"status":"draining"if self .draining else "ok"},json_type 
+        if path =="/stats"and method =="GET":
+            return 200 ,self .stats (),json_type 
+        if path =="/metrics"and method =="GET":
+            metrics =get_metrics ()
+            if metrics is None :
+                raise HTTPError (404 ,"Metrics are disabled (set INTERVIEW_METRICS=1).")
+            return 200 ,metrics .render (),"text/plain; version=0.0.4"
+        if path =="/sessions":
+            if method !="POST":
+                raise HTTPError (405 ,"Use POST to create a session.")
+            return 201 ,await self ._create_session (body ),json_type 
+        parts =[p for p in path .split ("/")if p ]
+        if len (parts )>=2 and parts [0 ]=="sessions":
+            handle =self ._handle (parts [1 ])
+            if len (parts )==2 and method =="GET":
+                return 200 ,self ._describe (handle ),json_type 
+            if len (parts )==2 and method =="DELETE":
+                return 200 ,await self ._finish (handle ,"deleted"),json_type 
+            if len (parts )==3 and parts [2 ]=="report"and method =="GET":
+                async with self ._session (handle )as session :
+                    return 200 ,session .live_verdict (),json_type 
+            if len (parts )==3 and parts [2 ]=="answer"and method =="POST":
+                return 200 ,await self ._answer (handle ,body ),json_type 
+            raise HTTPError (405 ,"Unsupported method for this resource.")
+        raise HTTPError (404 ,"Unknown resource.")
+
+    def _handle (self ,session_id :str )->SessionHandle :
+        handle =self .sessions .get (session_id )
+        if handle is None :
+            raise HTTPError (404 ,"Unknown or expired session.")
+        return handle 
+
+    def _describe (self ,handle :SessionHandle )->Dict [str ,Any ]:
+        return {
+        "session_id":handle .id ,
+        "turn_id":handle .turn_id ,
+        "question":handle .question ,
+        "finished":handle .finished ,
+        "final_report":handle .final_report ,
+        "resident_bytes":self .store .resident_size (handle .id ),
+        }
+
+    async def _create_session (self ,body :Dict [str ,Any ])->Dict [str ,Any ]:
+        if self .draining :
+            raise HTTPError (503 ,"Server is shutting down.",{"Retry-After":"5"})
+        if len (self .sessions )>=self .max_sessions :
+            self .counts ["rejected"]+=1 
+            raise HTTPError (503 ,"Too many active sessions.",{"Retry-After":"5"})
+        estimator =str (body .get ("estimator",self .estimator )).strip ().lower ()
+        if estimator not in ESTIMATORS and estimator not in ("","parity"):
+            raise HTTPError (400 ,f"Unknown estimator: {estimator}")
+        session_id =uuid .uuid4 ().hex 
+        fused =_flag (body ,"fused",self .fused )
+        early_stop =_flag (body ,"early_stop",self .early_stop )
+        session =await run_blocking (
+        InterviewSession ,
+        str (body .get ("candidate_name","")).strip ()or "candidate",
+        str (body .get ("position","")),
+        str (body .get ("grade","")),
+        str (body .get ("experience","")),
+        prefetch =self .prefetch ,
+        question_bank =self .question_bank ,
+        fused =fused ,
+        estimator =estimator ,
+        early_stop =early_stop ,
+        stream =True ,
+        log_dir =self .log_dir ,
+        checkpoint_path =str (Path (self .checkpoint_dir )/f"{session_id}.ckpt")if self .checkpoint_dir else None ,
+        )
+        handle =SessionHandle (session_id ,self .subscriber_queue )
+        self .sessions [session_id ]=handle 
+        await run_blocking (self .store .put ,session_id ,session ,pinned =False )
+        try :
+            async with handle .lock :
+                async with self ._slot ():
+                    async with self ._session (handle )as session :
+                        await self ._next_question (handle ,session )
+        except BaseException :
+            self .sessions .pop (session_id ,None )
+            await run_blocking (self .store .discard ,session_id )
+            raise 
+        return self ._describe (handle )
+
+    async def _next_question (self ,handle :SessionHandle ,session :InterviewSession )->None :
+        announced :List [str ]=[]
+
+        def announce (text :str )->None :
+            announced .append (text )
+            handle .publish ("question",{"turn_id":session .turn_id ,"text":text })
+
+        handle .question =await session .astart_turn (announce )
+        if session .replaced_announcement (announced ):
+            handle .publish ("question",{"turn_id":session .turn_id ,"text":handle .question ,"replaces":announced [-1 ]})
+        elif not announced :
+            handle .publish ("question",{"turn_id":session .turn_id ,"text":handle .question })
+        handle .touch ()
+
+    async def _answer (self ,handle :SessionHandle ,body :Dict [str ,Any ])->Dict [str ,Any ]:
+        answer =body .get ("answer")
+        if not isinstance (answer ,str ):
+            raise HTTPError (400 ,"Field 'answer' (string) is required.")
+        if handle .finished :
+            raise HTTPError (410 ,"Session is already finished.")
+        if handle .lock .locked ():
+            raise HTTPError (409 ,"Previous answer is still being processed.")
+        async with handle .lock :
+            handle .touch ()
+            if InterviewSession .is_stop_command (answer ):
+                return await self ._finish (handle ,"stopped",locked =True )
+            async with self ._slot ():
+                async with self ._session (handle )as session :
+                    reply =await session .asubmit_answer (
+                    answer ,
+                    lambda chunk :handle .publish ("reply_chunk",{"text":chunk }),
+                    )
+                    handle .publish ("reply",{"text":reply })
+                    handle .publish ("verdict",session .live_verdict ())
+                    settled =session .should_stop ()
+                    if not settled :
+                        await self ._next_question (handle ,session )
+            if settled :
+                return {"reply":reply ,**await self ._finish (handle ,"settled",locked =True )}
+        return {"reply":reply ,**self ._describe (handle )}
+
+    async def _finish (self ,handle :SessionHandle ,reason :str ,locked :bool =False )->Dict [str ,Any ]:
+        if not locked :
+            await handle .lock .acquire ()
+        try :
+            if not handle .finished :
+                handle .finished =True 
+                async with self ._session (handle )as session :
+                    session .observer .cancel_prefetch ()
+                    handle .final_report =await run_blocking (
+                    session .finish ,
+                    None if self .log_dir else f"interview_log_{handle.id}.json",
+                    )
+                self .counts ["finished"]+=1 
+                handle .publish ("finished",{"final_report":handle .final_report })
+            handle .close_subscribers (reason )
+            self .sessions .pop (handle .id ,None )
+            await run_blocking (self .store .discard ,handle .id )
+        finally :
+            if not locked :
+                handle .lock .release ()
+        return self ._describe (handle )
+
+    async def _stream_events (self ,handle :SessionHandle ,writer :asyncio .StreamWriter )->None :
+        queue =handle .subscribe ()
+        writer .write (
+        b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+        b"Connection: keep-alive\r\n\r\n"
+        )
+        writer .write (_sse ("question",{"turn_id":handle .turn_id ,"text":handle .question }))
+        try :
+            while True :
+                try :
+                    item =await asyncio .wait_for (queue .get (),self .keepalive_seconds )
+                except asyncio .TimeoutError :
+                    writer .write (b": keepalive\n\n")
+                else :
+                    if item is None :
+                        break 
+                    writer .write (_sse (*item ))
+                await asyncio .wait_for (writer .drain (),self .write_timeout )
+        except (asyncio .TimeoutError ,ConnectionError ):
+            pass 
+        finally :
+            handle .subscribers .discard (queue )
+
+    async def _reap_idle (self )->None :
+        interval =max (0.05 ,min (30.0 ,self .idle_timeout /4 ))
+        while True :
+            await asyncio .sleep (interval )
+            now =asyncio .get_running_loop ().time ()
+            for handle in list (self .sessions .values ()):
+                if not handle .lock .locked ()and now -handle .last_active >self .idle_timeout :
+                    self .counts ["expired"]+=1 
+                    try :
+                        await self ._finish (handle ,"idle_timeout")
+                    except Exception as e :
+                        print (f"Could not finish idle session {handle.id}: {type(e).__name__}: {e}",file =sys .stderr )
+
+    async def drain (self )->None :
+        self .draining =True 
+        if self ._reaper is not None :
+            self ._reaper .cancel ()
+        for task in self ._resumes :
+            task .cancel ()
+        if self ._server is not None :
+            self ._server .close ()
+        deadline =asyncio .get_running_loop ().time ()+self .drain_timeout 
+        while self ._active or self ._waiting :
+            if asyncio .get_running_loop ().time ()>=deadline :
+                break 
+            await asyncio .sleep (0.05 )
+        for handle in list (self .sessions .values ()):
+            if self .checkpoint_dir :
+                async with self ._session (handle )as session :
+                    session .observer .cancel_prefetch ()
+                    await run_blocking (session .log .close )
+                handle .close_subscribers ("shutdown")
+                self .sessions .pop (handle .id ,None )
+                await run_blocking (self .store .discard ,handle .id )
+            else :
+                await self ._finish (handle ,"shutdown")
+        if self ._server is not None :
+            with contextlib .suppress (asyncio .TimeoutError ):
+                await asyncio .wait_for (self ._server .wait_closed (),1.0 )
+
+    def stats (self )->Dict [str ,Any ]:
+        return {
+        **self .counts ,
+        "sessions":len (self .sessions ),
+        "inflight":self ._active ,
+        "waiting":self ._waiting ,
+        "draining":self .draining ,
+        "store":self .store .stats (),
+        "rate_limit":get_rate_limiter ().stats (),
+        }
+
+
+async def serve (server :InterviewServer ,stop :Optional [asyncio .Event ]=None )->None :
+    stop =stop or asyncio .Event ()
+    loop =asyncio .get_running_loop ()
+    for sig in (signal .SIGINT ,signal .SIGTERM ):
+        with contextlib .suppress (NotImplementedError ,RuntimeError ):
+            loop .add_signal_handler (sig ,stop .set )
+    await server .start ()
+    print (f"Interview server listening on http://{server.host}:{server.port}")
+    await stop .wait ()
+    await server .drain ()
+
+
+def main ()->None :
+    server =InterviewServer (
+    host =os .getenv ("INTERVIEW_SERVER_HOST","127.0.0.1"),
+    port =int (os .getenv ("INTERVIEW_SERVER_PORT","8080")),
+    max_sessions =int (os .getenv ("INTERVIEW_SERVER_MAX_SESSIONS","1000")),
+    max_inflight =int (os .getenv ("INTERVIEW_SERVER_MAX_INFLIGHT","64")),
+    max_pending =int (os .getenv ("INTERVIEW_SERVER_MAX_PENDING","256")),
+    idle_timeout =float (os .getenv ("INTERVIEW_SERVER_IDLE_TIMEOUT","900")),
+    drain_timeout =float (os .getenv ("INTERVIEW_SERVER_DRAIN_TIMEOUT","30")),
+    log_dir =os .getenv ("INTERVIEW_LOG_DIR","interview_logs"),
+    checkpoint_dir =os .getenv ("INTERVIEW_CHECKPOINT_DIR")or None ,
+    spill_dir =os .getenv ("INTERVIEW_SPILL_DIR","interview_spill"),
+    memory_budget =int (float (os .getenv ("INTERVIEW_SERVER_MEMORY_MB","256"))*1024 *1024 ),
+    question_bank =get_question_bank ()if os .getenv ("INTERVIEW_QUESTION_BANK","0")=="1"else None ,
+    fused =os .getenv ("INTERVIEW_FUSED","0")=="1",
+    prefetch =os .getenv ("INTERVIEW_PREFETCH","0")=="1",
+    estimator =os .getenv ("INTERVIEW_ESTIMATOR","parity"),
+    early_stop =os .getenv ("INTERVIEW_EARLY_STOP","0")=="1",
+    )
+    asyncio .run (serve (server ))
+
+
+if __name__ =="__main__":
+    main ()
@@ -0,0 +1,186 @@
+from __future__ import annotations 
+
+import json 
+import os 
+import sys 
+import tempfile 
+import threading 
+from collections import OrderedDict 
+from pathlib import Path 
+from typing import Any ,Dict ,List ,Optional ,Set ,Tuple 
+
+from .checkpoint import load_checkpoint 
+from .main import InterviewSession 
+from .question_bank import QuestionBank 
+
+
+def estimate_size (obj :Any )->int :
+    seen :Set [int ]=set ()
+    stack :List [Any ]=[obj ]
+    total =0 
+    while stack :
+        item =stack .pop ()
+        if id (item )in seen :
+            continue 
+        seen .add (id (item ))
+        total +=sys .getsizeof (item )
+        if isinstance (item ,dict ):
+            stack .extend (item .keys ())
+            stack .extend (item .values ())
+        elif isinstance (item ,(list ,tuple ,set ,frozenset )):
+            stack .extend (item )
+    return total 
+
+
+def session_size (session :InterviewSession )->int :
+    index =session .observer .question_index 
+    return session .turns .nbytes ()+(index .nbytes ()if index is not None else 0 )+estimate_size (
+    [
+    session .observer .snapshot (),
+    session .current_question ,
+    session .pending_question ,
+    session .current_visible_message ,
+    session .internal_before ,
+    ]
+    )
+
+
+class SessionStore :
+
+    def __init__ (
+    self ,
+    spill_dir :str ="interview_spill",
+    memory_budget :int =256 *1024 *1024 ,
+    question_bank :Optional [QuestionBank ]=None ,
+    )->None :
+        self .spill_dir =spill_dir 
+        self .memory_budget =memory_budget 
+        self .question_bank =question_bank 
+        self ._resident :"OrderedDict[str, InterviewSession]"=OrderedDict ()
+        self ._sizes :Dict [str ,int ]={}
+        self ._pins :Dict [str ,int ]={}
+        self ._spilled :Dict [str ,Tuple [str ,bool ]]={}
+        self ._lock =threading .Lock ()
+        self .counts :Dict [str ,int ]={"spills":0 ,"reloads":0 ,"spilled_bytes":0 }
+
+    def __contains__ (self ,key :str )->bool :
+        with self ._lock :
+            return key in self ._resident or key in self ._spilled 
+
+    def __len__ (self )->int :
+        with self ._lock :
+            return len (self ._resident )+len (self ._spilled )
+
+    def put (self ,key :str ,session :InterviewSession ,pinned :bool =True )->None :
+        with self ._lock :
+            self ._resident [key ]=session 
+            self ._sizes [key ]=session_size (session )
+            if pinned :
+                self ._pins [key ]=self ._pins .get (key ,0 )+1 
+            self ._enforce_budget ()
+
+    def acquire (self ,key :str )->InterviewSession :
+        with self ._lock :
+            session =self ._resident .get (key )
+            if session is None :
+                session =self ._reload (key )
+            self ._resident .move_to_end (key )
+            self ._pins [key ]=self ._pins .get (key ,0 )+1 
+            return session 
+
+    def release (self ,key :str )->None :
+        with self ._lock :
+            pins =self ._pins .get (key ,0 )-1 
+            if pins >0 :
+                self ._pins [key ]=pins 
+            else :
+                self ._pins .pop (key ,None )
+            session =self ._resident .get (key )
+            if session is not None :
+                self ._sizes [key ]=session_size (session )
+            self ._enforce_budget ()
+
+    def discard (self ,key :str )->None :
+        with self ._lock :
+            self ._resident .pop (key ,None )
+            self ._sizes .pop (key ,None )
+            self ._pins .pop (key ,None )
+            spilled =self ._spilled .pop (key ,None )
+        if spilled is not None and not spilled [1 ]and os .path .exists (spilled [0 ]):
+            os .unlink (spilled [0 ])
+
+    def _enforce_budget (self )->None :
+        total =sum (self ._sizes .values ())
+        for key in list (self ._resident ):
+            if total <=self .memory_budget :
+                break 
+            if self ._pins .get (key ):
+                continue 
+            total -=self ._sizes .get (key ,0 )
+            self ._spill (key )
+
+    def _spill (self ,key :str )->None :
+        session =self ._resident .pop (key )
+        self ._sizes .pop (key ,None )
+        session .observer .cancel_prefetch ()
+        if session .log .sink is not None :
+            session .log .sink .close ()
+        if session .checkpointer is not None :
+            session .checkpoint ()
+            self ._spilled [key ]=(session .checkpointer .path ,True )
+        else :
+            payload =json .dumps (session .snapshot (),ensure_ascii =False )
+            target =Path (self .spill_dir )/f"{key}.json"
+            target .parent .mkdir (parents =True ,exist_ok =True )
+            fd ,tmp_path =tempfile .mkstemp (prefix =target .name +".",suffix =".tmp",dir =str (target .parent ))
+            with os .fdopen (fd ,"w",encoding ="utf-8")as f :
+                f .write (payload )
+            os .replace (tmp_path ,target )
+            self .counts ["spilled_bytes"]+=len (payload )
+            self ._spilled [key ]=(str (target ),False )
+        self .counts ["spills"]+=1 
+
+    def _reload (self ,key :str )->InterviewSession :
+        if key not in self ._spilled :
+            raise KeyError (key )
+        path ,is_checkpoint =self ._spilled .pop (key )
+        if is_checkpoint :
+            state =load_checkpoint (path )
+        else :
+            with open (path ,"r",encoding ="utf-8")as f :
+                state =json .load (f )
+            os .unlink (path )
+        if state is None :
+            raise KeyError (key )
+        session =InterviewSession .from_snapshot (
+        state ,
+        self .question_bank ,
+        checkpoint_path =path if is_checkpoint else None ,
+        resume_question =False ,
+        )
+        self ._resident [key ]=session 
+        self ._sizes [key ]=session_size (session )
+        self .counts ["reloads"]+=1 
+        return session 
+
+    def resident_size (self ,key :str )->Optional [int ]:
+        with self ._lock :
+            return self ._sizes .get (key )
+
+    def resident_sizes (self )->Dict [str ,int ]:
+        with self ._lock :
+            return dict (self ._sizes )
+
+    def stats (self )->Dict [str ,Any ]:
+        with self ._lock :
+            sizes =list (self ._sizes .values ())
+            return {
+            **self .counts ,
+            "resident":len (self ._resident ),
+            "spilled":len (self ._spilled ),
+            "pinned":len (self ._pins ),
+            "resident_bytes":sum (sizes ),
+            "max_session_bytes":max (sizes ,default =0 ),
+            "avg_session_bytes":sum (sizes )/len (sizes )if sizes else 0.0 ,
+            "memory_budget":self .memory_budget ,
+            }
@@ -0,0 +1,129 @@
+from __future__ import annotations 
+
+import asyncio 
+import concurrent .futures 
+import hashlib 
+import json 
+import os 
+import threading 
+from typing import Any ,Awaitable ,Callable ,Dict ,List ,Optional ,Tuple 
+
+
+def _normalize (text :str )->str :
+    return " ".join (text .split ())
+
+
+def make_flight_key (
+model :str ,
+system_prompt :str ,
+messages :List [Dict [str ,str ]],
+temperature :float ,
+)->str :
+    payload =json .dumps (
+    [
+    model ,
+    _normalize (system_prompt ),
+    [[message .get ("role",""),_normalize (message .get ("content",""))]for message in messages ],
+    float (temperature ),
+    ],
+    ensure_ascii =False ,
+    )
+    return hashlib .sha256 (payload .encode ("utf-8")).hexdigest ()
+
+
+class SingleFlight :
+
+    def __init__ (self )->None :
+        self ._flights :Dict [str ,concurrent .futures .Future ]={}
+        self ._lock =threading .Lock ()
+        self .leaders =0 
+        self .followers =0 
+
+    def _join (self ,key :str )->Tuple [concurrent .futures .Future ,bool ]:
+        with self ._lock :
+            flight =self ._flights .get (key )
+            if flight is not None :
+                self .followers +=1 
+                return flight ,False 
+            flight =self ._flights [key ]=concurrent .futures .Future ()
+            self .leaders +=1 
+            return flight ,True 
+
+    def _land (self ,key :str ,flight :concurrent .futures .Future )->None :
+        with self ._lock :
+            if self ._flights .get (key )is flight :
+                del self ._flights [key ]
+
+    def do (self ,key :str ,fn :Callable [[],Any ])->Tuple [Any ,bool ]:
+        while True :
+            flight ,leader =self ._join (key )
+            if not leader :
+                try :
+                    return flight .result (),True 
+                except concurrent .futures .CancelledError :
+                    continue 
+            try :
+                result =fn ()
+            except BaseException as exc :
+                self ._land (key ,flight )
+                if isinstance (exc ,Exception ):
+                    flight .set_exception (exc )
+                else :
+                    flight .cancel ()
+                raise 
+            self ._land (key ,flight )
+            flight .set_result (result )
+            return result ,False 
+
+    async def ado (self ,key :str ,fn :Callable [[],Awaitable [Any ]])->Tuple [Any ,bool ]:
+        while True :
+            flight ,leader =self ._join (key )
+            if not leader :
+                try :
+                    return await asyncio .shield (asyncio .wrap_future (flight )),True 
+                except asyncio .CancelledError :
+                    if flight .cancelled ():
+                        continue 
+                    raise 
+            try :
+                result =await fn ()
+            except BaseException as exc :
+                self ._land (key ,flight )
+                if isinstance (exc ,Exception ):
+                    flight .set_exception (exc )
+                else :
+                    flight .cancel ()
+                raise 
+            self ._land (key ,flight )
+            flight .set_result (result )
+            return result ,False 
+
+    def stats (self )->Dict [str ,Any ]:
+        with self ._lock :
+            return {
+            "in_flight":len (self ._flights ),
+            "leaders":self .leaders ,
+            "followers":self .followers ,
+            }
+
+
+_SINGLE_FLIGHT :Optional [SingleFlight ]=None 
+_FLIGHT_CONFIGURED =False 
+_FLIGHT_LOCK =threading .Lock ()
+
+
+def configure_single_flight (group :Optional [SingleFlight ])->None :
+    global _SINGLE_FLIGHT ,_FLIGHT_CONFIGURED 
+    with _FLIGHT_LOCK :
+        _SINGLE_FLIGHT =group 
+        _FLIGHT_CONFIGURED =True 
+
+
+def get_single_flight ()->Optional [SingleFlight ]:
+    global _SINGLE_FLIGHT ,_FLIGHT_CONFIGURED 
+    with _FLIGHT_LOCK :
+        if not _FLIGHT_CONFIGURED :
+            if os .getenv ("LLM_COALESCE","1")!="0":
+                _SINGLE_FLIGHT =SingleFlight ()
+            _FLIGHT_CONFIGURED =True 
+        return _SINGLE_FLIGHT 
@@ -0,0 +1,205 @@
+from __future__ import annotations 
+
+import sys 
+from array import array 
+from typing import Any ,Callable ,Dict ,Iterable ,Iterator ,List ,Optional ,Sequence ,Set 
+
+from .scorecard import Scorecard 
+
+
+def _as_int (value :Any ,default :int =0 )->int :
+    try :
+        return int (value )
+    except (TypeError ,ValueError ):
+        return default 
+
+
+def _intern (value :Any )->str :
+    return sys .intern (str (value ))
+
+
+class ColumnView (Sequence ):
+
+    __slots__ =("_build","_size","_window")
+
+    def __init__ (self ,build :Callable [[int ],Any ],size :Callable [[],int ],window :Optional [int ]=None )->None :
+        self ._build =build 
+        self ._size =size 
+        self ._window =window 
+
+    def _bounds (self )->range :
+        size =self ._size ()
+        start =max (0 ,size -self ._window )if self ._window else 0 
+        return range (start ,size )
+
+    def __len__ (self )->int :
+        return len (self ._bounds ())
+
+    def __getitem__ (self ,index :Any )->Any :
+        rows =self ._bounds ()[index ]
+        if isinstance (index ,slice ):
+            return [self ._build (row )for row in rows ]
+        return self ._build (rows )
+
+    def __iter__ (self )->Iterator [Any ]:
+        for row in self ._bounds ():
+            yield self ._build (row )
+
+    def __eq__ (self ,other :Any )->bool :
+        if not isinstance (other ,Sequence )or isinstance (other ,str ):
+            return NotImplemented 
+        return list (self )==list (other )
+
+    def __repr__ (self )->str :
+        return f"ColumnView({list(self)!r})"
+
+
+class TurnStore :
+
+    COLUMNS =(
+    "_q_topic",
+    "_q_difficulty",
+    "_q_text",
+    "_q_answer",
+    "_e_question",
+    "_e_topic",
+    "_e_answer",
+    "_e_result",
+    "_e_correct",
+    "_e_reason",
+    "_e_difficulty",
+    "_e_confidence",
+    "_l_turn_id",
+    "_l_visible",
+    "_l_user",
+    "_l_internal",
+    )
+
+    def __init__ (self ,recent_window :int =6 )->None :
+        self .recent_window =recent_window 
+        self ._q_topic :List [str ]=[]
+        self ._q_difficulty =array ("h")
+        self ._q_text :List [str ]=[]
+        self ._q_answer :List [str ]=[]
+        self ._e_question :List [str ]=[]
+        self ._e_topic :List [str ]=[]
+        self ._e_answer :List [str ]=[]
+        self ._e_result :List [str ]=[]
+        self ._e_correct :List [str ]=[]
+        self ._e_reason :List [str ]=[]
+        self ._e_difficulty =array ("h")
+        self ._e_confidence =array ("h")
+        self ._l_turn_id =array ("i")
+        self ._l_visible :List [str ]=[]
+        self ._l_user :List [str ]=[]
+        self ._l_internal :List [str ]=[]
+        self .scorecard =Scorecard ()
+        self .questions =ColumnView (self ._question ,self ._q_text .__len__ )
+        self .evaluations =ColumnView (self ._evaluation ,self ._e_result .__len__ )
+        self .recent_turns =ColumnView (self ._recent ,self ._e_result .__len__ ,recent_window )
+
+    def add_question (self ,question :Dict [str ,Any ])->None :
+        self ._q_topic .append (_intern (question .get ("topic","")))
+        self ._q_difficulty .append (_as_int (question .get ("difficulty"),1 ))
+        self ._q_text .append (question .get ("question",""))
+        self ._q_answer .append (question .get ("answer",""))
+
+    def add_evaluation (
+    self ,
+    question :Dict [str ,Any ],
+    candidate_answer :str ,
+    evaluation :Dict [str ,Any ],
+    difficulty :int ,
+    )->None :
+        row =len (self ._e_result )
+        topic =_intern (question .get ("topic",""))
+        result =_intern (evaluation .get ("result","unknown"))
+        difficulty =_as_int (difficulty ,1 )
+        confidence =_as_int (evaluation .get ("confidence",0 ))
+        self ._e_question .append (question .get ("question",""))
+        self ._e_topic .append (topic )
+        self ._e_answer .append (candidate_answer )
+        self ._e_result .append (result )
+        self ._e_correct .append (evaluation .get ("correct_answer",question .get ("answer","")))
+        self ._e_reason .append (evaluation .get ("reason",""))
+        self ._e_difficulty .append (difficulty )
+        self ._e_confidence .append (confidence )
+        self .scorecard .add (row ,topic ,result ,difficulty ,confidence ,candidate_answer )
+
+    def add_log_turn (self ,turn_id :int ,agent_visible_message :str ,user_message :str ,internal_thoughts :str )->None :
+        self ._l_turn_id .append (turn_id )
+        self ._l_visible .append (agent_visible_message )
+        self ._l_user .append (user_message )
+        self ._l_internal .append (internal_thoughts )
+
+    def _question (self ,row :int )->Dict [str ,Any ]:
+        return {
+        "topic":self ._q_topic [row ],
+        "difficulty":self ._q_difficulty [row ],
+        "question":self ._q_text [row ],
+        "answer":self ._q_answer [row ],
+        }
+
+    def _evaluation (self ,row :int )->Dict [str ,Any ]:
+        return {
+        "question":self ._e_question [row ],
+        "topic":self ._e_topic [row ],
+        "candidate_answer":self ._e_answer [row ],
+        "result":self ._e_result [row ],
+        "correct_answer":self ._e_correct [row ],
+        "reason":self ._e_reason [row ],
+        "difficulty":self ._e_difficulty [row ],
+        "confidence":self ._e_confidence [row ],
+        }
+
+    def _recent (self ,row :int )->Dict [str ,Any ]:
+        return {
+        "question":self ._e_question [row ],
+        "topic":self ._e_topic [row ],
+        "candidate_answer":self ._e_answer [row ],
+        "result":self ._e_result [row ],
+        }
+
+    def log_row (self ,row :int )->List [Any ]:
+        return [self ._l_turn_id [row ],self ._l_visible [row ],self ._l_user [row ],self ._l_internal [row ]]
+
+    def log_view (self ,build :Callable [...,Any ])->ColumnView :
+        return ColumnView (lambda row :build (*self .log_row (row )),self ._l_turn_id .__len__ )
+
+    def log_rows (self )->List [List [Any ]]:
+        return [self .log_row (row )for row in range (len (self ._l_turn_id ))]
+
+    def load_questions (self ,questions :Iterable [Dict [str ,Any ]])->None :
+        for name in self .COLUMNS [:4 ]:
+            del getattr (self ,name )[:]
+        for question in questions :
+            self .add_question (question )
+
+    def load_evaluations (self ,evaluations :Iterable [Dict [str ,Any ]])->None :
+        for name in self .COLUMNS [4 :12 ]:
+            del getattr (self ,name )[:]
+        self .scorecard .reset ()
+        for entry in evaluations :
+            self .add_evaluation (entry ,entry .get ("candidate_answer",""),entry ,entry .get ("difficulty",1 ))
+
+    def load_log (self ,log_turns :Iterable [Sequence [Any ]])->None :
+        for name in self .COLUMNS [12 :]:
+            del getattr (self ,name )[:]
+        for turn in log_turns :
+            self .add_log_turn (*turn )
+
+    def result_counts (self )->Dict [str ,int ]:
+        return dict (self .scorecard .result_counts )
+
+    def nbytes (self )->int :
+        seen :Set [int ]=set ()
+        total =sys .getsizeof (self )
+        for name in self .COLUMNS :
+            column =getattr (self ,name )
+            total +=sys .getsizeof (column )
+            if isinstance (column ,list ):
+                for value in column :
+                    if id (value )not in seen :
+                        seen .add (id (value ))
+                        total +=sys .getsizeof (value )
+        return total 
@@ -0,0 +1,48 @@
+import os
+import unittest
+from types import SimpleNamespace
+
+os.environ.setdefault("MISTRAL_API_KEY", "test")
+
+from multi_agent_interview_coach import agents
+from multi_agent_interview_coach.ratelimit import RateLimiter, configure_rate_limiter, llm_priority
+
+
+class _RecordingLimiter(RateLimiter):
+
+    def __init__(self):
+        super().__init__(requests_per_second=1000.0)
+        self.priorities = []
+
+    def acquire(self, tokens=0, priority=None):
+        self.priorities.append(priority)
+        return super().acquire(tokens, priority)
+
+
+class _Chat:
+
+    def complete(self, model, messages, temperature):
+        message = SimpleNamespace(content="ok")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+class PriorityPropagationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.client = agents._MISTRAL_CLIENT
+        agents._MISTRAL_CLIENT = SimpleNamespace(chat=_Chat())
+        self.limiter = _RecordingLimiter()
+        configure_rate_limiter(self.limiter)
+
+    def tearDown(self):
+        agents._MISTRAL_CLIENT = self.client
+        configure_rate_limiter(None)
+
+    def test_sync_background_call_keeps_its_priority(self):
+        with llm_priority("background"):
+            self.assertEqual(agents.call_llm("system", [{"role": "user", "content": "hi"}], use_cache=False), "ok")
+        self.assertEqual(self.limiter.priorities, ["background"])
+
+
+if __name__ == "__main__":
+    unittest.main()